@@ -1,12 +1,23 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 
-from .storage import RuntimePaths, paginate, read_json, read_jsonl, safe_listdir, sort_by_created_at_then_name
+from agenttalk.router.delivery_segments import segments_dir
+
+from .cache import ResponseCache, etag_matches
+from .stream import PlanStreams, sse_events
+from .storage import (
+    DeliveriesReaders,
+    RuntimePaths,
+    paginate,
+    read_json,
+    safe_listdir,
+    sort_by_created_at_then_name,
+)
 
 
 def _plan_dir(paths: RuntimePaths, plan_id: str) -> Path:
@@ -43,9 +54,50 @@ def _plan_stats_from_status(status: dict) -> dict[str, int]:
     return stats
 
 
-def create_app(*, system_runtime: Path) -> FastAPI:
+def _json_files(dir_path: Path) -> list[Path]:
+    return [p for p in safe_listdir(dir_path) if p.is_file() and p.suffix == ".json"]
+
+
+def _read_json_files(files: list[Path]) -> list[dict]:
+    items = []
+    for p in files:
+        try:
+            items.append(read_json(p))
+        except Exception:
+            continue
+    return items
+
+
+def create_app(
+    *,
+    system_runtime: Path,
+    cache_ttl_seconds: float = 1.0,
+    stream_poll_interval_seconds: float = 0.5,
+) -> FastAPI:
+    """
+    Read-only dashboard API. JSON responses are cached per request URL and revalidated against the stats of the
+    files they are built from (see ResponseCache); clients get strong ETags and 304s for If-None-Match.
+    `/api/plans/{plan_id}/stream` pushes changes as Server-Sent Events, checked every `stream_poll_interval_seconds`.
+    """
     paths = RuntimePaths(system_runtime=system_runtime)
     app = FastAPI(title="AgentTalk Dashboard API", version="0.1.0")
+    deliveries = DeliveriesReaders()
+    app.state.deliveries_readers = deliveries
+    cache = ResponseCache(ttl_seconds=cache_ttl_seconds)
+    app.state.response_cache = cache
+    streams = PlanStreams(paths, poll_interval_seconds=stream_poll_interval_seconds)
+    app.state.plan_streams = streams
+
+    def respond(request: Request, *, sources: Callable[[], list[Path]], build: Callable[[], Any]) -> Response:
+        key = request.url.path + "?" + request.url.query
+        body, etag = cache.get(key, sources=sources, build=build)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def json_dir_sources(dir_path: Path) -> Callable[[], list[Path]]:
+        return lambda: [dir_path, *_json_files(dir_path)]
 
     @app.get("/", response_class=HTMLResponse)
     def index() -> str:
@@ -60,93 +112,143 @@ def create_app(*, system_runtime: Path) -> FastAPI:
 </html>
 """
 
+    def plan_dirs() -> list[Path]:
+        return [p for p in safe_listdir(paths.plans) if p.is_dir()]
+
     @app.get("/api/plans")
-    def list_plans() -> list[dict[str, Any]]:
-        items: list[dict[str, Any]] = []
-        for plan_path in safe_listdir(paths.plans):
-            if not plan_path.is_dir():
-                continue
-            plan_id = plan_path.name
-            status_path = plan_path / "plan_status.json"
-            updated_at = None
-            stats = None
-            if status_path.exists():
-                status = read_json(status_path)
-                updated_at = status.get("updated_at")
-                stats = _plan_stats_from_status(status)
-            items.append({"plan_id": plan_id, "updated_at": updated_at, "stats": stats})
-        return sorted(items, key=lambda x: x["plan_id"])
+    def list_plans(request: Request) -> Response:
+        def build() -> list[dict[str, Any]]:
+            items: list[dict[str, Any]] = []
+            for plan_path in plan_dirs():
+                plan_id = plan_path.name
+                status_path = plan_path / "plan_status.json"
+                updated_at = None
+                stats = None
+                if status_path.exists():
+                    status = read_json(status_path)
+                    updated_at = status.get("updated_at")
+                    stats = _plan_stats_from_status(status)
+                items.append({"plan_id": plan_id, "updated_at": updated_at, "stats": stats})
+            return sorted(items, key=lambda x: x["plan_id"])
+
+        return respond(
+            request,
+            sources=lambda: [paths.plans, *(p / "plan_status.json" for p in plan_dirs())],
+            build=build,
+        )
 
     @app.get("/api/plans/{plan_id}/status")
-    def get_plan_status(plan_id: str) -> dict:
-        return _load_plan_status(paths, plan_id)
+    def get_plan_status(request: Request, plan_id: str) -> Response:
+        return respond(
+            request,
+            sources=lambda: [_plan_dir(paths, plan_id) / "plan_status.json"],
+            build=lambda: _load_plan_status(paths, plan_id),
+        )
 
     @app.get("/api/plans/{plan_id}/deliveries")
     def get_deliveries(
+        request: Request,
         plan_id: str,
         offset: int = Query(0, ge=0),
         limit: int = Query(50, ge=1, le=500),
         message_id: str | None = None,
         task_id: str | None = None,
         include_skipped: bool = False,
-    ) -> dict:
-        p = _plan_dir(paths, plan_id) / "deliveries.jsonl"
-        rows = read_jsonl(p)
-        if message_id:
-            rows = [r for r in rows if r.get("message_id") == message_id]
-        if task_id:
-            rows = [r for r in rows if r.get("task_id") == task_id]
-        if not include_skipped:
-            rows = [r for r in rows if not str(r.get("status", "")).startswith("SKIPPED_")]
-        return paginate(rows, offset=offset, limit=limit)
+    ) -> Response:
+        log_path = _plan_dir(paths, plan_id) / "deliveries.jsonl"
+
+        def build() -> dict:
+            if not log_path.parent.is_dir():
+                # unknown plan: an empty page, without taking a reader slot from the LRU
+                return {"total": 0, "offset": offset, "limit": limit, "items": []}
+            return deliveries.get(plan_id, log_path).page(
+                offset=offset,
+                limit=limit,
+                message_id=message_id,
+                task_id=task_id,
+                include_skipped=include_skipped,
+            )
+
+        # a rotation renames the active file into the segments dir, changing both stats
+        return respond(request, sources=lambda: [log_path, segments_dir(log_path)], build=build)
+
+    @app.get("/api/plans/{plan_id}/stream")
+    async def stream_plan(
+        request: Request,
+        plan_id: str,
+        max_events: int | None = Query(None, ge=1),
+        timeout_seconds: float | None = Query(None, gt=0),
+    ) -> StreamingResponse:
+        if not _plan_dir(paths, plan_id).is_dir():
+            raise HTTPException(status_code=404, detail="plan not found")
+        events = sse_events(
+            streams,
+            plan_id,
+            # EventSource reconnects send the id of the last event received: resume the delivery log from there
+            last_event_id=request.headers.get("last-event-id"),
+            is_disconnected=request.is_disconnected,
+            max_events=max_events,
+            timeout_seconds=timeout_seconds,
+        )
+        # X-Accel-Buffering: stop reverse proxies (nginx) from buffering the event stream
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        return StreamingResponse(events, media_type="text/event-stream", headers=headers)
 
     @app.get("/api/plans/{plan_id}/decisions")
-    def get_decisions(plan_id: str, offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)) -> dict:
+    def get_decisions(
+        request: Request,
+        plan_id: str,
+        offset: int = Query(0, ge=0),
+        limit: int = Query(50, ge=1, le=500),
+    ) -> Response:
         decisions_dir = _plan_dir(paths, plan_id) / "decisions"
-        files = [p for p in safe_listdir(decisions_dir) if p.is_file() and p.suffix == ".json"]
-        ordered = sort_by_created_at_then_name(files)
-        items = []
-        for p in ordered:
-            try:
-                items.append(read_json(p))
-            except Exception:
-                continue
-        return paginate(items, offset=offset, limit=limit)
+
+        def build() -> dict:
+            items = _read_json_files(sort_by_created_at_then_name(_json_files(decisions_dir)))
+            return paginate(items, offset=offset, limit=limit)
+
+        return respond(request, sources=json_dir_sources(decisions_dir), build=build)
 
     @app.get("/api/plans/{plan_id}/acks")
-    def get_acks(plan_id: str, offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)) -> dict:
+    def get_acks(
+        request: Request,
+        plan_id: str,
+        offset: int = Query(0, ge=0),
+        limit: int = Query(50, ge=1, le=500),
+    ) -> Response:
         acks_dir = _plan_dir(paths, plan_id) / "acks"
-        files = [p for p in safe_listdir(acks_dir) if p.is_file() and p.suffix == ".json"]
-        ordered = sort_by_created_at_then_name(files)
-        items = []
-        for p in ordered:
-            try:
-                items.append(read_json(p))
-            except Exception:
-                continue
-        return paginate(items, offset=offset, limit=limit)
+
+        def build() -> dict:
+            items = _read_json_files(sort_by_created_at_then_name(_json_files(acks_dir)))
+            return paginate(items, offset=offset, limit=limit)
+
+        return respond(request, sources=json_dir_sources(acks_dir), build=build)
 
     @app.get("/api/plans/{plan_id}/release_manifest")
-    def get_release_manifest(plan_id: str) -> dict:
-        return _load_release_manifest(paths, plan_id)
+    def get_release_manifest(request: Request, plan_id: str) -> Response:
+        return respond(
+            request,
+            sources=lambda: [_plan_dir(paths, plan_id) / "release_manifest.json"],
+            build=lambda: _load_release_manifest(paths, plan_id),
+        )
 
     @app.get("/api/agents")
-    def list_agents() -> list[dict]:
-        items = []
-        for p in safe_listdir(paths.agent_status):
-            if not p.is_file() or p.suffix != ".json":
-                continue
-            try:
-                items.append(read_json(p))
-            except Exception:
-                continue
-        return sorted(items, key=lambda x: str(x.get("agent_id") or ""))
+    def list_agents(request: Request) -> Response:
+        def build() -> list[dict]:
+            items = _read_json_files(_json_files(paths.agent_status))
+            return sorted(items, key=lambda x: str(x.get("agent_id") or ""))
+
+        return respond(request, sources=json_dir_sources(paths.agent_status), build=build)
 
     @app.get("/api/agents/{agent_id}")
-    def get_agent(agent_id: str) -> dict:
+    def get_agent(request: Request, agent_id: str) -> Response:
         p = paths.agent_status / f"{agent_id}.json"
-        if not p.exists():
-            raise HTTPException(status_code=404, detail="agent not found")
-        return read_json(p)
+
+        def build() -> dict:
+            if not p.exists():
+                raise HTTPException(status_code=404, detail="agent not found")
+            return read_json(p)
+
+        return respond(request, sources=lambda: [p], build=build)
 
     return app
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from pathlib import Path
+from typing import Any, Callable
+
+from agenttalk.heartbeat.hashing import RACY_WINDOW_NS
+
+Fingerprint = tuple[tuple[Any, ...], ...]
+
+
+def fingerprint(paths: list[Path]) -> tuple[Fingerprint, bool]:
+    """
+    `(path, st_ino, st_mtime_ns, st_size)` per source (None fields when missing), and whether every source is older
+    than the racy mtime window, i.e. whether an unchanged fingerprint really means unchanged content.
+    """
+    now_ns = time.time_ns()
+    keys: list[tuple[Any, ...]] = []
+    stable = True
+    for p in paths:
+        try:
+            st = os.stat(p)
+        except FileNotFoundError:
+            keys.append((str(p), None, None, None))
+            continue
+        keys.append((str(p), st.st_ino, st.st_mtime_ns, st.st_size))
+        if now_ns - st.st_mtime_ns < RACY_WINDOW_NS:
+            stable = False
+    return tuple(keys), stable
+
+
+class _Entry:
+    def __init__(self, fp: Fingerprint, stable: bool, body: bytes, etag: str, checked_at: float) -> None:
+        self.fp = fp
+        self.stable = stable
+        self.body = body
+        self.etag = etag
+        self.checked_at = checked_at
+
+
+class ResponseCache:
+    """
+    Rendered JSON responses keyed by request (path + query), validated against the stats of their source files.
+
+    Within `ttl_seconds` of the last validation an entry is served without touching the disk, so clients polling
+    together cost one read. After that the sources are re-stat'ed and the response is rebuilt only when a source
+    changed (or is racily fresh). ETags are strong: the sha256 of the response body. Concurrent misses for the same
+    key wait for a single build.
+    """
+
+    def __init__(self, *, ttl_seconds: float = 1.0, max_entries: int = 1024) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._key_locks: dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, key: str) -> _Entry | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry.checked_at < self.ttl_seconds:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        return None
+
+    def get(self, key: str, *, sources: Callable[[], list[Path]], build: Callable[[], Any]) -> tuple[bytes, str]:
+        """`(body, etag)` for `key`; `build()` runs only when the cached body may be out of date."""
+        entry = self._fresh(key)
+        if entry is not None:
+            return entry.body, entry.etag
+        with self.lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                return self._revalidate(key, sources, build)
+        finally:
+            with self.lock:
+                # build raised (e.g. 404): no entry, so do not keep a lock per failing URL either
+                if key not in self.entries:
+                    self._key_locks.pop(key, None)
+
+    def _revalidate(self, key: str, sources: Callable[[], list[Path]], build: Callable[[], Any]) -> tuple[bytes, str]:
+        # another request may have revalidated this key while we waited
+        entry = self._fresh(key)
+        if entry is not None:
+            return entry.body, entry.etag
+        fp, stable = fingerprint(sources())
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and entry.stable and entry.fp == fp:
+            with self.lock:
+                entry.checked_at = time.monotonic()
+                self.hits += 1
+            return entry.body, entry.etag
+        body = json.dumps(build(), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        etag = '"' + sha256(body).hexdigest()[:32] + '"'
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = _Entry(fp, stable, body, etag, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                old, _ = self.entries.popitem(last=False)
+                self._key_locks.pop(old, None)
+        return body, etag
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or ("W/" + etag) in tags
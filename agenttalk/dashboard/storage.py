@@ -1,29 +1,19 @@
 from __future__ import annotations
 
 import json
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Iterable
 
+from agenttalk.router.delivery_segments import SegmentIndex, load_segment_index, log_segments, read_rows_at
+
 
 def read_json(path: Path) -> dict:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
-def read_jsonl(path: Path) -> list[dict]:
-    if not path.exists():
-        return []
-    rows: list[dict] = []
-    for line in path.read_text(encoding="utf-8").splitlines():
-        if not line.strip():
-            continue
-        try:
-            rows.append(json.loads(line))
-        except Exception:
-            continue
-    return rows
-
-
 def safe_listdir(dir_path: Path) -> list[Path]:
     if not dir_path.exists():
         return []
@@ -50,6 +40,108 @@ def paginate(items: list[Any], *, offset: int, limit: int) -> dict:
     return {"total": total, "offset": offset, "limit": limit, "items": sliced}
 
 
+class DeliveriesReader:
+    """
+    Paged reads of one plan's deliveries log (sealed segments + active deliveries.jsonl) without a full scan.
+
+    Sealed segment indexes come from their sidecars and are kept (segments are immutable); the active file is
+    indexed incrementally. Unfiltered pages seek to the nearest checkpoint before `offset`; message_id/task_id
+    filters read only the rows of the requested page via the postings. Results match filtering every parsable row.
+    """
+
+    def __init__(self, log_path: Path) -> None:
+        self.log_path = log_path
+        self.lock = threading.Lock()
+        self.sealed: dict[Path, SegmentIndex] = {}
+        self.active = SegmentIndex()
+
+    def _segments(self) -> list[tuple[Path, SegmentIndex]]:
+        while True:
+            sealed, st = log_segments(self.log_path)
+            for path in sealed:
+                if path in self.sealed:
+                    continue
+                if self.active.inode is not None and path.stat().st_ino == self.active.inode:
+                    # the active file we already indexed was just sealed: finish it instead of loading the sidecar
+                    idx, self.active = self.active, SegmentIndex()
+                    idx.extend(path)
+                    self.sealed[path] = idx
+                else:
+                    self.sealed[path] = load_segment_index(path)
+            for path in [p for p in self.sealed if p not in sealed]:
+                del self.sealed[path]
+            if st is None:
+                self.active = SegmentIndex()
+            else:
+                self.active.extend(self.log_path)
+            # a rotation while indexing the active file would hide the newly sealed segment; list again
+            if log_segments(self.log_path)[0] == sealed:
+                segments = [(p, self.sealed[p]) for p in sealed]
+                return segments + ([(self.log_path, self.active)] if st is not None else [])
+
+    def page(
+        self,
+        *,
+        offset: int,
+        limit: int,
+        message_id: str | None = None,
+        task_id: str | None = None,
+        include_skipped: bool = False,
+    ) -> dict:
+        offset = max(0, offset)
+        limit = max(1, min(limit, 500))
+        items: list[dict] = []
+        with self.lock:
+            segments = self._segments()
+            if message_id or task_id:
+                hits = [
+                    (path, o)
+                    for path, idx in segments
+                    for o in idx.postings(message_id=message_id, task_id=task_id, include_skipped=include_skipped)
+                ]
+                total = len(hits)
+                by_path: dict[Path, list[int]] = {}
+                for path, o in hits[offset : offset + limit]:
+                    by_path.setdefault(path, []).append(o)
+                for path, offsets in by_path.items():
+                    items.extend(read_rows_at(path, offsets))
+            else:
+                total = sum(idx.count(include_skipped=include_skipped) for _, idx in segments)
+                start = offset
+                for path, idx in segments:
+                    n = idx.count(include_skipped=include_skipped)
+                    if start >= n:
+                        start -= n
+                        continue
+                    items.extend(idx.read_rows(path, start, limit - len(items), include_skipped=include_skipped))
+                    start = 0
+                    if len(items) >= limit:
+                        break
+        return {"total": total, "offset": offset, "limit": limit, "items": items}
+
+
+class DeliveriesReaders:
+    """
+    `DeliveriesReader` per plan, bounded: each reader keeps the postings of every sealed segment in memory, so only
+    the `max_readers` most recently paged plans are kept and older ones are rebuilt from their sidecars on demand.
+    """
+
+    def __init__(self, *, max_readers: int = 64) -> None:
+        self.max_readers = max_readers
+        self.lock = threading.Lock()
+        self.readers: OrderedDict[str, DeliveriesReader] = OrderedDict()
+
+    def get(self, plan_id: str, log_path: Path) -> DeliveriesReader:
+        with self.lock:
+            reader = self.readers.get(plan_id)
+            if reader is None:
+                reader = self.readers[plan_id] = DeliveriesReader(log_path)
+            self.readers.move_to_end(plan_id)
+            while len(self.readers) > self.max_readers:
+                self.readers.popitem(last=False)
+            return reader
+
+
 @dataclass(frozen=True)
 class RuntimePaths:
     system_runtime: Path
@@ -58,6 +150,10 @@ class RuntimePaths:
     def plans(self) -> Path:
         return self.system_runtime / "plans"
 
+    @property
+    def alerts(self) -> Path:
+        return self.system_runtime / "alerts"
+
     @property
     def agent_status(self) -> Path:
         return self.system_runtime / "agent_status"
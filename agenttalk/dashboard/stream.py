@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from agenttalk.router.delivery_log import DeliveryLogIndex
+from agenttalk.router.delivery_segments import log_segments
+
+from .storage import RuntimePaths, read_json, safe_listdir
+
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+class DeliveryTail(DeliveryLogIndex):
+    """
+    Entries (any status) appended to a plan's deliveries log, across segment rotations. Each entry comes with its
+    resumable position `"<sealed_count>:<offset>"` (the segment it was read from and the offset after it; segment
+    numbers only grow, so a position stays valid after that file is sealed). Starts at `resume_from` when it still
+    fits the log, else at the current end.
+    """
+
+    def __init__(self, log_path: Path, *, resume_from: str | None = None) -> None:
+        super().__init__(log_path)
+        self.pending: list[tuple[str, dict]] = []
+        if resume_from is None or not self.seek_to(resume_from):
+            self.seek_end()
+
+    @property
+    def position(self) -> str:
+        return f"{self.sealed_count}:{self.offset}"
+
+    def seek_to(self, position: str) -> bool:
+        """Continue after `position` (an earlier `position`); False when it does not point at a line boundary."""
+        try:
+            sealed_part, offset_part = position.split(":")
+            sealed_count, offset = int(sealed_part), int(offset_part)
+        except ValueError:
+            return False
+        sealed, active = log_segments(self.log_path)
+        files = sealed + ([self.log_path] if active is not None else [])
+        if sealed_count == len(files) and offset == 0 and active is None:
+            # nothing had been written to the next file yet
+            self._checkpoint_checked = True
+            self._reset()
+            self.sealed_count = sealed_count
+            return True
+        if not 0 <= sealed_count < len(files) or offset < 0:
+            return False
+        try:
+            f = files[sealed_count].open("rb")
+        except FileNotFoundError:
+            return False
+        with f:
+            st = os.fstat(f.fileno())
+            if offset > st.st_size:
+                return False
+            if offset > 0:
+                f.seek(offset - 1)
+                if f.read(1) != b"\n":
+                    return False
+            self._checkpoint_checked = True
+            self._reset()
+            self.sealed_count = sealed_count
+            self.inode = st.st_ino
+            self.offset = offset
+            self.fingerprint = self._read_fingerprint(f, offset)
+        return True
+
+    def refresh(self) -> None:
+        sealed, active = log_segments(self.log_path)
+        if not self._advance(sealed, active is not None):
+            # rewritten, truncated or segments removed under us: skip to the new end instead of replaying history
+            self.seek_end()
+
+    def _fold(self, entry: dict) -> None:
+        self.pending.append((self.position, entry))
+
+    def take(self) -> list[tuple[str, dict]]:
+        self.refresh()
+        rows, self.pending = self.pending, []
+        return rows
+
+
+def status_diff(old: dict, new: dict) -> dict | None:
+    """Changed top-level fields and changed/added/removed tasks (by task_id) between two plan_status documents."""
+    changed = {k: v for k, v in new.items() if k != "tasks" and old.get(k) != v}
+    removed_fields = [k for k in old if k != "tasks" and k not in new]
+    old_tasks = {str(t.get("task_id")): t for t in old.get("tasks") or []}
+    new_tasks = {str(t.get("task_id")): t for t in new.get("tasks") or []}
+    tasks = [t for task_id, t in new_tasks.items() if old_tasks.get(task_id) != t]
+    removed_tasks = [task_id for task_id in old_tasks if task_id not in new_tasks]
+    if not (changed or removed_fields or tasks or removed_tasks):
+        return None
+    return {"changed": changed, "removed_fields": removed_fields, "tasks": tasks, "removed_tasks": removed_tasks}
+
+
+def _stat_key(path: Path) -> tuple[int, int, int] | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _json_file_keys(dir_path: Path) -> dict[str, tuple[int, int, int]]:
+    keys = {}
+    for p in safe_listdir(dir_path):
+        if p.suffix == ".json" and (key := _stat_key(p)) is not None:
+            keys[p.name] = key
+    return keys
+
+
+class PlanWatcher:
+    """
+    Change detection for one plan's live stream. `snapshot()` returns the current plan_status; each `poll()` returns
+    what changed since: `status` (first document) / `status_diff`, new `delivery` log entries, new or rewritten
+    `ack` files and new `alert` files. Acks and alerts present when the watcher starts are not replayed.
+
+    Events are `(event, data, event_id)`; the id is the delivery log position reached so far, so a client that
+    reconnects with it can be sent every delivery entry it missed (see PlanFeed; acks/alerts are not replayed).
+    """
+
+    def __init__(self, paths: RuntimePaths, plan_id: str) -> None:
+        plan_dir = paths.plans / plan_id
+        self.status_path = plan_dir / "plan_status.json"
+        self.acks_dir = plan_dir / "acks"
+        self.alerts_dir = paths.alerts / plan_id
+        self.deliveries = DeliveryTail(plan_dir / "deliveries.jsonl")
+        self.event_id = self.deliveries.position
+        self.status: dict | None = None
+        self.status_key: tuple[int, int, int] | None = None
+        self.acks = _json_file_keys(self.acks_dir)
+        self.alerts = set(_json_file_keys(self.alerts_dir))
+
+    def snapshot(self) -> list[tuple[str, Any, str]]:
+        return self._poll_status()
+
+    def poll(self) -> list[tuple[str, Any, str]]:
+        events = self._poll_status()
+        for position, row in self.deliveries.take():
+            self.event_id = position
+            events.append(("delivery", row, position))
+        acks = _json_file_keys(self.acks_dir)
+        for name in sorted(acks):
+            if self.acks.get(name) != acks[name]:
+                obj = self._read(self.acks_dir / name)
+                if obj is None:
+                    acks.pop(name)  # mid-write or broken; retried on the next poll
+                    continue
+                events.append(("ack", obj, self.event_id))
+        self.acks = acks
+        alerts = set(_json_file_keys(self.alerts_dir))
+        for name in sorted(alerts - self.alerts):
+            obj = self._read(self.alerts_dir / name)
+            if obj is None:
+                alerts.discard(name)
+                continue
+            events.append(("alert", obj, self.event_id))
+        self.alerts = alerts
+        return events
+
+    def _poll_status(self) -> list[tuple[str, Any, str]]:
+        key = _stat_key(self.status_path)
+        if key is None or key == self.status_key:
+            return []
+        status = self._read(self.status_path)
+        if status is None:
+            return []
+        self.status_key = key
+        old, self.status = self.status, status
+        if old is None:
+            return [("status", status, self.event_id)]
+        diff = status_diff(old, status)
+        return [("status_diff", diff, self.event_id)] if diff is not None else []
+
+    @staticmethod
+    def _read(path: Path) -> dict | None:
+        try:
+            return read_json(path)
+        except Exception:
+            return None
+
+
+def format_sse(event_id: str, event: str, data: Any) -> bytes:
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+def _position_key(position: str) -> tuple[int, int]:
+    sealed_count, offset = position.split(":")
+    return int(sealed_count), int(offset)
+
+
+class Subscription:
+    """One SSE connection's view of a `PlanFeed`: a bounded event queue, dropped when the client falls behind."""
+
+    def __init__(self, plan_id: str, last_event_id: str | None, *, max_queued: int) -> None:
+        self.plan_id = plan_id
+        self.last_event_id = last_event_id
+        self.queue: asyncio.Queue[tuple[str, Any, str]] = asyncio.Queue(maxsize=max_queued)
+        self.dropped = False
+
+    def put(self, events: list[tuple[str, Any, str]]) -> bool:
+        for event in events:
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # a client this far behind reconnects with its Last-Event-ID instead of buffering without bound
+                self.dropped = True
+                return False
+        return True
+
+
+class PlanFeed:
+    """
+    The single `PlanWatcher` of one plan, polled (in a worker thread) every `poll_interval_seconds` while it has
+    subscribers; each poll's events are fanned out to every subscriber's queue. A new subscriber first gets the
+    current status and, when it resumes from a `last_event_id`, the delivery entries between that position and the
+    shared watcher's, so it continues exactly where the shared stream is.
+    """
+
+    def __init__(self, paths: RuntimePaths, plan_id: str, *, poll_interval_seconds: float) -> None:
+        self.paths = paths
+        self.plan_id = plan_id
+        self.poll_interval_seconds = poll_interval_seconds
+        self.watcher: PlanWatcher | None = None
+        self.subscribers: list[Subscription] = []
+        self.joining: list[Subscription] = []
+        self.wake = asyncio.Event()
+        self.polls = 0
+
+    @staticmethod
+    def _intro(watcher: PlanWatcher, last_event_id: str | None) -> list[tuple[str, Any, str]]:
+        events: list[tuple[str, Any, str]] = []
+        if watcher.status is not None:
+            events.append(("status", watcher.status, watcher.event_id))
+        if last_event_id is not None:
+            shared = _position_key(watcher.deliveries.position)
+            # an unusable id starts at the end, where nothing is older than the shared position
+            catch_up = DeliveryTail(watcher.deliveries.log_path, resume_from=last_event_id)
+            events.extend(("delivery", row, pos) for pos, row in catch_up.take() if _position_key(pos) <= shared)
+        return events
+
+    def _poll(self, joining: list[str | None]) -> tuple[list[list[tuple[str, Any, str]]], list[tuple[str, Any, str]]]:
+        if self.watcher is None:
+            self.watcher = PlanWatcher(self.paths, self.plan_id)
+            self.watcher.snapshot()
+        intros = [self._intro(self.watcher, last_event_id) for last_event_id in joining]
+        self.polls += 1
+        return intros, self.watcher.poll()
+
+    async def run(self) -> None:
+        try:
+            while self.subscribers or self.joining:
+                joining, self.joining = self.joining, []
+                intros, events = await asyncio.to_thread(self._poll, [sub.last_event_id for sub in joining])
+                for sub, intro in zip(joining, intros):
+                    if not sub.dropped and sub.put(intro):
+                        self.subscribers.append(sub)
+                for sub in self.subscribers:
+                    sub.put(events)
+                self.subscribers = [sub for sub in self.subscribers if not sub.dropped]
+                self.wake.clear()
+                try:
+                    await asyncio.wait_for(self.wake.wait(), timeout=self.poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for sub in self.subscribers + self.joining:
+                sub.dropped = True
+            self.subscribers, self.joining = [], []
+
+
+class PlanStreams:
+    """
+    Live feeds by plan_id, shared by every SSE connection to the same plan: the first subscriber starts the plan's
+    feed, the last one to leave stops it, so the disk is polled once per plan however many viewers are open.
+    """
+
+    def __init__(self, paths: RuntimePaths, *, poll_interval_seconds: float, max_queued: int = 1000) -> None:
+        self.paths = paths
+        self.poll_interval_seconds = poll_interval_seconds
+        self.max_queued = max_queued
+        self.feeds: dict[str, PlanFeed] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def subscribe(self, plan_id: str, last_event_id: str | None = None) -> Subscription:
+        sub = Subscription(plan_id, last_event_id, max_queued=self.max_queued)
+        feed = self.feeds.get(plan_id)
+        if feed is None:
+            feed = self.feeds[plan_id] = PlanFeed(self.paths, plan_id, poll_interval_seconds=self.poll_interval_seconds)
+            self._tasks[plan_id] = asyncio.get_running_loop().create_task(self._run(feed))
+        feed.joining.append(sub)
+        feed.wake.set()
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        sub.dropped = True
+        feed = self.feeds.get(sub.plan_id)
+        if feed is not None:
+            feed.subscribers = [s for s in feed.subscribers if s is not sub]
+            feed.joining = [s for s in feed.joining if s is not sub]
+
+    async def _run(self, feed: PlanFeed) -> None:
+        try:
+            await feed.run()
+        finally:
+            # the loop exits only with no subscribers left (or on an error, which drops them all)
+            if self.feeds.get(feed.plan_id) is feed:
+                del self.feeds[feed.plan_id]
+                del self._tasks[feed.plan_id]
+
+
+async def sse_events(
+    streams: PlanStreams,
+    plan_id: str,
+    *,
+    last_event_id: str | None,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    max_events: int | None = None,
+    timeout_seconds: float | None = None,
+    keepalive_seconds: float = SSE_KEEPALIVE_SECONDS,
+) -> AsyncIterator[bytes]:
+    """
+    Server-Sent Events from the plan's shared feed: the current status, then changes as they are polled. Event ids
+    are resumable positions (see PlanWatcher). Ends when the client disconnects, after `max_events` events, after
+    `timeout_seconds` or when the feed drops a client that fell too far behind; idle streams get a keep-alive.
+    """
+    deadline = None if timeout_seconds is None else time.monotonic() + timeout_seconds
+    sent = 0
+    last_write = time.monotonic()
+    sub = streams.subscribe(plan_id, last_event_id)
+    # one pending get at a time, kept across timeouts, so no event is lost or reordered
+    getter: asyncio.Future | None = None
+    try:
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(sub.queue.get())
+            now = time.monotonic()
+            # wake up for the next event, or in time to check the deadline / disconnects / keep-alive
+            wait = min(streams.poll_interval_seconds, keepalive_seconds - (now - last_write))
+            if deadline is not None:
+                wait = min(wait, deadline - now)
+            done, _ = await asyncio.wait({getter}, timeout=max(0.0, wait))
+            if getter in done:
+                event, data, event_id = getter.result()
+                getter = None
+                sent += 1
+                yield format_sse(event_id, event, data)
+                last_write = time.monotonic()
+                if max_events is not None and sent >= max_events:
+                    return
+                if deadline is not None and last_write >= deadline:
+                    return
+                continue
+            now = time.monotonic()
+            if sub.dropped or (deadline is not None and now >= deadline) or await is_disconnected():
+                return
+            if now - last_write >= keepalive_seconds:
+                yield b": keep-alive\n\n"
+                last_write = now
+    finally:
+        if getter is not None:
+            getter.cancel()
+        streams.unsubscribe(sub)
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 import importlib
+import os
 import time
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
+from .blobs import BlobStore
 from .config import HeartbeatConfig, load_config
 from .errors import EnvelopeParseError, UnsafePath
 from .handlers import CommandHandler, DefaultCommandHandler
@@ -35,6 +37,7 @@ from .state import (
     write_task_state,
 )
 from .timeutil import Clock, iso_z
+from .watch import InboxWatcher, inotify_available
 
 from agenttalk.command_runner.pipeline import write_artifacts_to_outbox
 from agenttalk.command_runner.types import artifacts_from_details
@@ -156,9 +159,8 @@ def _finalize_payloads(ctx: AppContext, *, inbox_plan: Path, processed_payload_d
         dst = processed_payload_dir / message_id / rel
         expected_sha = str(f.get("sha256") or "")
         if dst.exists():
-            if expected_sha and file_sha256(dst) == expected_sha:
-                continue
-            if expected_sha and file_sha256(dst) == file_sha256(src):
+            dst_sha = file_sha256(dst) if expected_sha else None
+            if dst_sha is not None and (dst_sha == expected_sha or dst_sha == file_sha256(src)):
                 continue
             _write_alert(
                 ctx,
@@ -191,11 +193,16 @@ def _ingest_artifact(ctx: AppContext, *, plan_id: str, envelope_path: Path, enve
     files_meta = (envelope.get("payload") or {}).get("files") or []
     stored_files: list[InputIndexEntryFile] = []
     now = ctx.clock.now()
+    blobs = BlobStore(ctx.config.blob_store_dir) if ctx.config.blob_store_dir else None
     for f in files_meta:
         rel = safe_relpath(str(f["path"]))
         expected_sha = str(f["sha256"])
         src = inbox_plan / rel
-        if not src.exists():
+        blob = blobs.existing(expected_sha) if blobs is not None else None
+        if blob is not None:
+            # content-addressed: the stored blob is the declared content, link it instead of the inbox copy
+            src = blob
+        elif not src.exists():
             raise EnvelopeParseError(code="MISSING_PAYLOAD", message=f"missing payload file: {rel}")
         dst = workspace_inputs / task_id / output_name / rel
         if dst.exists():
@@ -212,7 +219,20 @@ def _ingest_artifact(ctx: AppContext, *, plan_id: str, envelope_path: Path, enve
                 )
                 return False
         else:
-            atomic_copy(src, dst)
+            if blob is None and ctx.config.payload_delivery_mode == "link" and file_sha256(src) != expected_sha:
+                # the input would share the inbox inode (itself possibly linked from the producer's outbox)
+                atomic_move(envelope_path, inbox_plan / ".deadletter" / envelope_path.name)
+                _write_alert(
+                    ctx,
+                    plan_id=plan_id,
+                    alert_type="PAYLOAD_SHA256_MISMATCH",
+                    severity="HIGH",
+                    message="payload sha256 mismatch before linking into workspace inputs",
+                    source={"task_id": task_id, "output_name": output_name, "message_id": envelope["message_id"]},
+                    details={"path": str(rel), "expected": expected_sha, "actual": file_sha256(src)},
+                )
+                return False
+            atomic_copy(src, dst, mode="link" if blob is not None else ctx.config.payload_delivery_mode)
         stored_files.append(
             InputIndexEntryFile(path=str(rel), sha256=expected_sha, stored_at=str(dst.as_posix()))
         )
@@ -610,7 +630,8 @@ def _resume_pending(ctx: AppContext, *, plan_id: str) -> None:
         count += 1
 
 
-def tick_plan(ctx: AppContext, plan_id: str) -> None:
+def tick_plan(ctx: AppContext, plan_id: str) -> bool:
+    """Returns True when `max_new_messages_per_tick` left ready envelopes for a later tick."""
     inbox_plan = ctx.agent_paths.inbox / plan_id
     outbox_plan = ctx.agent_paths.outbox / plan_id
     outbox_plan.mkdir(parents=True, exist_ok=True)
@@ -619,8 +640,10 @@ def tick_plan(ctx: AppContext, plan_id: str) -> None:
     (inbox_plan / ".deadletter").mkdir(parents=True, exist_ok=True)
 
     processed = 0
+    backlog = False
     for env_path in list_ready_envelopes(inbox_plan):
         if processed >= ctx.config.max_new_messages_per_tick:
+            backlog = True
             break
         try:
             _process_one_envelope(ctx, plan_id=plan_id, src_path=env_path)
@@ -637,6 +660,7 @@ def tick_plan(ctx: AppContext, plan_id: str) -> None:
         processed += 1
 
     _resume_pending(ctx, plan_id=plan_id)
+    return backlog
 
 
 def discover_plans(ctx: AppContext) -> list[str]:
@@ -657,6 +681,80 @@ def run_once(ctx: AppContext) -> list[str]:
     return plans
 
 
+def _has_pending(ctx: AppContext, plan_id: str) -> bool:
+    try:
+        with os.scandir(ctx.agent_paths.inbox / plan_id / ".pending") as it:
+            return any(e.name.endswith(".msg.json") for e in it)
+    except FileNotFoundError:
+        return False
+
+
+def resume_pending_plans(ctx: AppContext, plans: list[str]) -> list[str]:
+    """
+    Resume `.pending` work of every plan that has some. Watch mode calls this every poll interval (as the poll
+    loop does via `tick_plan`), so a quiet plan's pending commands do not wait for the fallback full pass.
+    """
+    resumed = [plan_id for plan_id in plans if _has_pending(ctx, plan_id)]
+    for plan_id in resumed:
+        _resume_pending(ctx, plan_id=plan_id)
+    return resumed
+
+
+def _plan_enabled(ctx: AppContext, plan_id: str) -> bool:
+    return ctx.config.scan_mode != "allowlist_only" or plan_id in (ctx.config.allowlist or [])
+
+
+def _full_pass(ctx: AppContext, watcher: InboxWatcher) -> list[str]:
+    watcher.sync()
+    plans = discover_plans(ctx)
+    _write_status_heartbeat(ctx, current_plan_ids=plans)
+    for plan_id in plans:
+        if tick_plan(ctx, plan_id):
+            watcher.mark(plan_id)
+    return plans
+
+
+def watch_step(ctx: AppContext, watcher: InboxWatcher, *, timeout_seconds: float | None) -> set[str] | None:
+    """
+    Wait for inbox events and tick only the woken plans. Returns the plans ticked, or None when events were
+    lost (inotify queue overflow) and every plan was scanned instead.
+    """
+    woken = watcher.wait(timeout_seconds)
+    if woken is None:
+        _full_pass(ctx, watcher)
+        return None
+    ticked = {plan_id for plan_id in woken if _plan_enabled(ctx, plan_id)}
+    for plan_id in sorted(ticked):
+        if tick_plan(ctx, plan_id):
+            watcher.mark(plan_id)
+    return ticked
+
+
+def run_watch_loop(ctx: AppContext) -> None:
+    cfg = ctx.config
+    with InboxWatcher(ctx.agent_paths.inbox) as watcher:
+        _full_pass(ctx, watcher)
+        last_full = last_status = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if now - last_full >= cfg.watch_fallback_poll_seconds:
+                # recovers from missed events and resumes .pending work
+                _full_pass(ctx, watcher)
+                last_full = last_status = now
+                continue
+            if now - last_status >= cfg.poll_interval_seconds:
+                plans = discover_plans(ctx)
+                _write_status_heartbeat(ctx, current_plan_ids=plans)
+                resume_pending_plans(ctx, plans)
+                last_status = now
+            timeout = min(
+                cfg.watch_fallback_poll_seconds - (now - last_full),
+                cfg.poll_interval_seconds - (now - last_status),
+            )
+            if watch_step(ctx, watcher, timeout_seconds=max(timeout, 0)) is None:
+                last_full = last_status = time.monotonic()
+
+
 def run_forever(
     *,
     agent_root: Path,
@@ -676,6 +774,9 @@ def run_forever(
         ids=IdGenerator(),
         handler=load_handler(handler_module),
     )
+    if cfg.watch_enabled and inotify_available():
+        run_watch_loop(ctx)
+        return
     while True:
         run_once(ctx)
         time.sleep(cfg.poll_interval_seconds)
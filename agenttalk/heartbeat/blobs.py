@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import os
+import re
+import time
+from dataclasses import dataclass
+from hashlib import sha256
+from pathlib import Path
+from uuid import uuid4
+
+from .io import atomic_copy
+
+_DIGEST_RE = re.compile(r"^sha256:([0-9a-f]{64})$")
+
+
+class BlobDigestMismatch(ValueError):
+    def __init__(self, path: Path, expected: str, actual: str):
+        super().__init__(f"sha256 mismatch for {path.name}: declared {expected}, actual {actual}")
+        self.expected = expected
+        self.actual = actual
+
+
+@dataclass(frozen=True)
+class BlobStore:
+    """
+    Content-addressed payload store: `<root>/sha256/<xx>/<hex digest>`.
+
+    Blobs are written once (tmp -> rename), verified against their digest and made read-only (0444); inboxes and
+    workspaces hold hardlinks (or reflinks/copies across filesystems) to them, so linked inputs are read-only too.
+    Blobs are not reclaimed automatically: run `gc()` periodically.
+    """
+
+    root: Path
+
+    def path_for(self, digest: str) -> Path:
+        m = _DIGEST_RE.match(digest)
+        if not m:
+            raise ValueError(f"not a sha256 digest: {digest!r}")
+        hexdigest = m.group(1)
+        return self.root / "sha256" / hexdigest[:2] / hexdigest
+
+    def existing(self, digest: str) -> Path | None:
+        try:
+            path = self.path_for(digest)
+        except ValueError:
+            return None
+        return path if path.is_file() else None
+
+    def ingest(self, src: Path, expected_digest: str | None = None) -> str:
+        """
+        Hash `src` (single read) and store it unless the blob already exists. Raises BlobDigestMismatch when
+        `expected_digest` is given and does not match; nothing is stored in that case. When the declared blob is
+        already stored, `src` is not read at all: inboxes get the stored (verified) content, not `src`.
+        """
+        if expected_digest is not None and (blob := self.existing(expected_digest)) is not None:
+            # refresh the mtime so a concurrent gc() keeps the blob until it is linked
+            try:
+                os.utime(blob)
+            except OSError:
+                pass
+            return expected_digest
+        staging = self.root / "tmp"
+        staging.mkdir(parents=True, exist_ok=True)
+        tmp: Path | None = staging / f"{uuid4().hex}.tmp"
+        h = sha256()
+        try:
+            with src.open("rb") as fsrc, tmp.open("wb") as fdst:
+                for chunk in iter(lambda: fsrc.read(1024 * 1024), b""):
+                    h.update(chunk)
+                    fdst.write(chunk)
+            digest = "sha256:" + h.hexdigest()
+            if expected_digest is not None and digest != expected_digest:
+                raise BlobDigestMismatch(src, expected_digest, digest)
+            dst = self.path_for(digest)
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            os.chmod(tmp, 0o444)
+            tmp.replace(dst)
+            tmp = None
+        finally:
+            if tmp is not None:
+                tmp.unlink(missing_ok=True)
+        return digest
+
+    def materialize(self, digest: str, dst: Path) -> None:
+        """Place blob `digest` at `dst` (hardlink, else reflink, else copy; atomic)."""
+        atomic_copy(self.path_for(digest), dst, mode="link")
+
+    def gc(self, *, min_age_seconds: float = 24 * 3600) -> list[Path]:
+        """
+        Remove blobs no inbox or workspace links to any more (link count 1) whose mtime is older than
+        `min_age_seconds`, and staging files left behind by interrupted ingests; returns the removed paths.
+
+        Copies made across filesystems are independent of the blob, so removing it only costs future dedupe. The
+        age threshold protects blobs that were just ingested (or re-declared, which refreshes the mtime) and are
+        about to be linked; keep it well above the router poll interval.
+        """
+        cutoff = time.time() - min_age_seconds
+        removed: list[Path] = []
+        for pattern in ("sha256/*/*", "tmp/*.tmp"):
+            for path in self.root.glob(pattern):
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                if st.st_mtime >= cutoff or (pattern != "tmp/*.tmp" and st.st_nlink > 1):
+                    continue
+                path.unlink(missing_ok=True)
+                removed.append(path)
+        return removed
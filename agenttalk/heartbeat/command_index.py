@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from .hashing import RACY_WINDOW_NS
+from .io import atomic_write_bytes, read_json
+
+
+@dataclass(frozen=True)
+class CommandIndexEntry:
+    max_seq: int
+    message_id: str
+    command_id: str
+    file_name: str
+
+
+def _command_key(env: dict) -> tuple[str, str, int, dict] | None:
+    if env.get("type") != "command":
+        return None
+    cmd = (env.get("payload") or {}).get("command") or {}
+    # commands without a task_id are never indexed (not keyed as "None")
+    task_id = str(cmd.get("task_id") or "")
+    if not task_id:
+        return None
+    try:
+        seq = int(cmd.get("command_seq"))
+    except Exception:
+        return None
+    return task_id, str((cmd.get("dag_ref") or {}).get("sha256")), seq, cmd
+
+
+class CommandSeqIndex:
+    """
+    Persistent `(task_id, dag_sha) -> (max_seq, message_id, command_id)` index over plans/<plan_id>/commands/.
+    Written by the router, read by the monitor (hence here, next to the other shared helpers).
+
+    The index file records the commands/ directory mtime it was built against; any mismatch (archive written
+    by another process, crash between archive copy and index write, manual edits) or a missing/corrupt index
+    triggers a rebuild from the archived envelopes. Read-only users (monitor) rebuild in memory only. An mtime
+    within the racy window (see hashing) may hide an archive written in the same tick, so it is not trusted unless
+    it came from our own `record()`.
+    """
+
+    def __init__(self, commands_dir: Path, index_path: Path, *, writable: bool = True):
+        self.commands_dir = commands_dir
+        self.index_path = index_path
+        self.writable = writable
+        self.entries: dict[tuple[str, str], CommandIndexEntry] = {}
+        self.commands_mtime_ns: int | None = None
+        # commands_mtime_ns was set by record(), i.e. it is known to account for every archived file
+        self._recorded = False
+        self.rebuilds = 0
+
+    def _current_mtime_ns(self) -> int | None:
+        try:
+            return self.commands_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh(self) -> None:
+        mtime = self._current_mtime_ns()
+        racy = mtime is not None and time.time_ns() - mtime < RACY_WINDOW_NS
+        if mtime is not None and mtime == self.commands_mtime_ns and (self._recorded or not racy):
+            return
+        if mtime is None:
+            self.entries = {}
+            self.commands_mtime_ns = None
+            return
+        if racy or not self._load(mtime):
+            self.rebuild()
+
+    def _load(self, mtime: int) -> bool:
+        try:
+            obj = read_json(self.index_path)
+            if int(obj["commands_mtime_ns"]) != mtime:
+                return False
+            entries: dict[tuple[str, str], CommandIndexEntry] = {}
+            for task_id, by_sha in obj["entries"].items():
+                for dag_sha, e in by_sha.items():
+                    entries[(str(task_id), str(dag_sha))] = CommandIndexEntry(
+                        max_seq=int(e["max_seq"]),
+                        message_id=str(e["message_id"]),
+                        command_id=str(e["command_id"]),
+                        file_name=str(e["file"]),
+                    )
+        except Exception:
+            return False
+        self.entries = entries
+        self.commands_mtime_ns = mtime
+        self._recorded = False
+        return True
+
+    def rebuild(self) -> None:
+        self.rebuilds += 1
+        mtime = self._current_mtime_ns()
+        self.entries = {}
+        if mtime is not None:
+            for p in sorted(self.commands_dir.glob("*.msg.json")):
+                try:
+                    env = read_json(p)
+                except Exception:
+                    continue
+                self._fold(p.name, env)
+        self.commands_mtime_ns = mtime
+        self._recorded = False
+        self._save()
+
+    def _fold(self, file_name: str, env: dict) -> None:
+        key = _command_key(env)
+        if key is None:
+            return
+        task_id, dag_sha, seq, cmd = key
+        cur = self.entries.get((task_id, dag_sha))
+        if cur is None or seq > cur.max_seq:
+            self.entries[(task_id, dag_sha)] = CommandIndexEntry(
+                max_seq=seq,
+                message_id=str(env.get("message_id")),
+                command_id=str(cmd.get("command_id")),
+                file_name=file_name,
+            )
+
+    def record(self, file_name: str, env: dict) -> None:
+        """
+        Fold a freshly archived command envelope into the index. Callers `refresh()` before writing the archive
+        copy so the directory mtime change caused by that copy is attributed to this record, not a rebuild.
+        """
+        self._fold(file_name, env)
+        self.commands_mtime_ns = self._current_mtime_ns()
+        self._recorded = True
+        self._save()
+
+    def _save(self) -> None:
+        if not self.writable or self.commands_mtime_ns is None:
+            return
+        by_task: dict[str, dict[str, dict]] = {}
+        for (task_id, dag_sha), e in self.entries.items():
+            by_task.setdefault(task_id, {})[dag_sha] = {
+                "max_seq": e.max_seq,
+                "message_id": e.message_id,
+                "command_id": e.command_id,
+                "file": e.file_name,
+            }
+        obj = {"schema_version": "1.0", "commands_mtime_ns": self.commands_mtime_ns, "entries": by_task}
+        atomic_write_bytes(self.index_path, json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    def get(self, task_id: str, dag_sha: str) -> CommandIndexEntry | None:
+        self.refresh()
+        return self.entries.get((task_id, dag_sha))
+
+    def latest_for_dag(self, dag_sha: str) -> dict[str, CommandIndexEntry]:
+        self.refresh()
+        return {task_id: e for (task_id, sha), e in self.entries.items() if sha == dag_sha}
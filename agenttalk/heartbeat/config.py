@@ -18,6 +18,13 @@ class HeartbeatConfig:
     allowlist: list[str] | None
     schema_validation_enabled: bool
     schemas_base_dir: Path
+    # watch mode (Linux inotify): tick only plans whose inbox received an envelope; full scan as fallback
+    watch_enabled: bool = False
+    watch_fallback_poll_seconds: int = 30
+    # inbox payload -> workspace/inputs placement: copy | reflink | link
+    payload_delivery_mode: str = "copy"
+    # shared content-addressed store (router's system_runtime/blobs); inputs are linked from it when present
+    blob_store_dir: Path | None = None
 
 
 def load_config(config_path: Path, schemas_base_dir: Path) -> HeartbeatConfig:
@@ -35,6 +42,10 @@ def load_config(config_path: Path, schemas_base_dir: Path) -> HeartbeatConfig:
     if isinstance(base_dir, str) and base_dir.strip():
         schemas_base_dir = (config_path.parent / base_dir).resolve()
 
+    watch = raw.get("watch") or {}
+    payload_delivery = raw.get("payload_delivery") or {}
+    blob_store_dir = payload_delivery.get("blob_store_dir")
+
     return HeartbeatConfig(
         schema_version=str(raw["schema_version"]),
         agent_id=str(raw["agent_id"]),
@@ -45,5 +56,13 @@ def load_config(config_path: Path, schemas_base_dir: Path) -> HeartbeatConfig:
         allowlist=list(allowlist) if isinstance(allowlist, list) else None,
         schema_validation_enabled=bool(enabled),
         schemas_base_dir=schemas_base_dir,
+        watch_enabled=bool(watch.get("enabled", False)),
+        watch_fallback_poll_seconds=int(watch.get("fallback_poll_seconds") or 30),
+        payload_delivery_mode=str(payload_delivery.get("mode") or "copy"),
+        blob_store_dir=(
+            (config_path.parent / blob_store_dir).resolve()
+            if isinstance(blob_store_dir, str) and blob_store_dir.strip()
+            else None
+        ),
     )
 
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from pathlib import Path
+
+StatKey = tuple[int, int, int, int]
+
+# Files modified within this window are hashed but not cached: a same-size rewrite inside the filesystem's
+# mtime granularity would otherwise keep serving the old digest (same idea as git's "racily clean" entries).
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def _hash_file(path: Path) -> str:
+    h = sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return "sha256:" + h.hexdigest()
+
+
+def _stat_key(st: os.stat_result) -> StatKey:
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class Sha256Cache:
+    """
+    LRU of file sha256 digests keyed by `(st_dev, st_ino, st_size, st_mtime_ns)`.
+
+    A hit costs one `stat`. Atomic tmp->rename writes always produce a new inode, so rewritten files miss.
+    With `persist_path`, entries are loaded on construction and written back by `save()` (only when new
+    entries were added); a missing or corrupt file just starts empty.
+    """
+
+    def __init__(self, *, max_entries: int = 8192, persist_path: Path | None = None):
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[StatKey, str] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        if persist_path is not None:
+            self.load()
+
+    def file_sha256(self, path: Path) -> str:
+        key = _stat_key(os.stat(path))
+        with self.lock:
+            digest = self.entries.get(key)
+            if digest is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return digest
+            self.misses += 1
+        digest = _hash_file(path)
+        st = os.stat(path)
+        # only cache if the file did not change while being read and is not "racily" fresh
+        if _stat_key(st) == key and time.time_ns() - st.st_mtime_ns >= RACY_WINDOW_NS:
+            with self.lock:
+                self.entries[key] = digest
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                self.dirty = True
+        return digest
+
+    def stats(self) -> dict[str, float]:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.dirty = False
+
+    def load(self) -> None:
+        if self.persist_path is None:
+            return
+        try:
+            rows = json.loads(self.persist_path.read_text(encoding="utf-8"))["entries"]
+            loaded = OrderedDict((tuple(int(x) for x in row[:4]), str(row[4])) for row in rows)
+        except Exception:
+            return
+        with self.lock:
+            self.entries = loaded
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def save(self) -> None:
+        if self.persist_path is None:
+            return
+        with self.lock:
+            if not self.dirty:
+                return
+            rows = [[*key, digest] for key, digest in self.entries.items()]
+            self.dirty = False
+        data = json.dumps({"schema_version": "1.0", "entries": rows}, separators=(",", ":")).encode("utf-8")
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.persist_path.with_name(self.persist_path.name + ".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(self.persist_path)
+
+
+_DEFAULT_CACHE = Sha256Cache()
+
+
+def default_sha256_cache() -> Sha256Cache:
+    return _DEFAULT_CACHE
+
+
+def set_default_sha256_cache(cache: Sha256Cache) -> None:
+    """Swap the process-wide cache, e.g. for one backed by a persistence file."""
+    global _DEFAULT_CACHE
+    _DEFAULT_CACHE = cache
+
+
+def file_sha256(path: Path) -> str:
+    """`sha256:<hex>` of a file's bytes, memoized in the process-wide cache."""
+    return _DEFAULT_CACHE.file_sha256(path)
@@ -4,10 +4,20 @@ import json
 import os
 import shutil
 from dataclasses import dataclass
-from hashlib import sha256
 from pathlib import Path
 
 from .errors import UnsafePath
+from .hashing import file_sha256  # shared stat-keyed cache; re-exported
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+# copy: full byte copy. reflink: FICLONE (copy-on-write, btrfs/xfs) else copy.
+# link: hardlink (shared inode; payloads must never be modified in place) else reflink else copy.
+FILE_PLACEMENT_MODES = ("copy", "reflink", "link")
+_FICLONE = 0x40049409
 
 
 def is_tmp(path: Path) -> bool:
@@ -23,14 +33,6 @@ def safe_relpath(rel: str) -> Path:
     return rel_path
 
 
-def file_sha256(path: Path) -> str:
-    h = sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return "sha256:" + h.hexdigest()
-
-
 def atomic_write_bytes(path: Path, data: bytes) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     tmp = path.with_name(path.name + ".tmp")
@@ -58,12 +60,47 @@ def atomic_rename(src: Path, dst: Path) -> None:
     atomic_move(src, dst)
 
 
-def atomic_copy(src: Path, dst: Path) -> None:
+def _reflink(src: Path, dst: Path) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        with src.open("rb") as fsrc, dst.open("wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def place_file(src: Path, dst: Path, mode: str = "copy") -> str:
+    """
+    Materialize `src` at `dst` (normally a `.tmp` path, renamed by the caller) using the cheapest method
+    `mode` allows; returns the method used ("link" / "reflink" / "copy"). Cross-filesystem links and
+    filesystems without reflink support fall back to a byte copy.
+    """
+    if mode not in FILE_PLACEMENT_MODES:
+        raise ValueError(f"unknown file placement mode: {mode}")
+    if mode == "link":
+        dst.unlink(missing_ok=True)
+        try:
+            os.link(src, dst)
+            return "link"
+        except OSError:
+            pass
+    if mode in ("link", "reflink") and _reflink(src, dst):
+        return "reflink"
+    shutil.copyfile(src, dst)
+    return "copy"
+
+
+def atomic_copy(src: Path, dst: Path, *, mode: str = "copy") -> None:
     dst.parent.mkdir(parents=True, exist_ok=True)
     tmp = dst.with_name(dst.name + ".tmp")
     tmp.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copyfile(src, tmp)
+    place_file(src, tmp, mode)
     tmp.replace(dst)
+    # rename() is a no-op when tmp and dst are already links to the same inode (re-delivery in link mode)
+    tmp.unlink(missing_ok=True)
 
 
 def list_ready_envelopes(inbox_plan_dir: Path) -> list[Path]:
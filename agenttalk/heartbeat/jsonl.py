@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+def parse_jsonl_line(line: bytes) -> dict | None:
+    """The JSON object on one line, or None for blank, unparsable or non-object lines."""
+    if not line.strip():
+        return None
+    try:
+        row = json.loads(line)
+    except Exception:
+        return None
+    return row if isinstance(row, dict) else None
+
+
+def iter_lines(
+    f: BinaryIO,
+    start: int = 0,
+    end: int | None = None,
+    *,
+    include_partial: bool = False,
+    chunk_bytes: int = READ_CHUNK_BYTES,
+) -> Iterator[tuple[int, bytes]]:
+    """
+    `(offset, line)` for each newline-terminated line of an open binary file between `start` (a line boundary) and
+    `end`, newline stripped. The file is read in chunks, so memory is bounded by the chunk and the longest line.
+    A trailing unterminated line (writer mid-append) is only yielded with `include_partial`.
+    """
+    f.seek(start)
+    pos = start
+    pending = b""
+    while True:
+        n = chunk_bytes if end is None else min(chunk_bytes, end - pos - len(pending))
+        chunk = f.read(n) if n > 0 else b""
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield pos, line
+            pos += len(line) + 1
+    if include_partial and pending:
+        yield pos, pending
+
+
+def iter_jsonl(path: Path, *, offset: int = 0) -> Iterator[dict]:
+    """Rows of a JSONL file from byte `offset`, parsed lazily; a missing file yields nothing."""
+    try:
+        f = path.open("rb")
+    except FileNotFoundError:
+        return
+    with f:
+        for _, line in iter_lines(f, offset, include_partial=True):
+            row = parse_jsonl_line(line)
+            if row is not None:
+                yield row
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
@@ -8,43 +9,134 @@ from .errors import SchemaInvalid
 from .io import read_json
 
 
+class _RequiredKeysValidator:
+    """Fallback used when jsonschema is not installed: only checks top-level `required` keys."""
+
+    def __init__(self, schema: dict):
+        self.required = list(schema.get("required", []))
+
+    def validate(self, document: dict) -> None:
+        missing = [k for k in self.required if k not in document]
+        if missing:
+            raise SchemaInvalid(
+                code="SCHEMA_INVALID",
+                message=f"missing required keys: {missing} (jsonschema not installed)",
+            )
+
+
+class _CompiledSchemaDir:
+    """
+    Compiled validators for one schemas directory.
+
+    The `$id` store is built once from `*.schema.json` and validators are compiled lazily per schema file.
+    Everything is dropped and rebuilt when the directory mtime changes (schema added/removed/replaced).
+    """
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.lock = threading.Lock()
+        self.dir_mtime_ns: int | None = None
+        self.compiler: tuple[Any, Any] | None = None
+        self.validators: dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _dir_mtime_ns(self) -> int | None:
+        try:
+            return self.base_dir.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _load_compiler(self) -> tuple[Any, Any]:
+        from jsonschema.validators import Draft202012Validator  # type: ignore
+        from referencing import Registry, Resource  # type: ignore
+        from referencing.jsonschema import DRAFT202012  # type: ignore
+
+        resources: list[tuple[str, Any]] = []
+        try:
+            for p in sorted(self.base_dir.glob("*.schema.json")):
+                try:
+                    s = read_json(p)
+                    sid = s.get("$id")
+                    if isinstance(sid, str) and sid:
+                        resources.append((sid, Resource.from_contents(s, default_specification=DRAFT202012)))
+                except Exception:
+                    continue
+        except Exception:
+            resources = []
+        return Draft202012Validator, Registry().with_resources(resources)
+
+    def validator_for(self, schema_filename: str) -> Any:
+        mtime = self._dir_mtime_ns()
+        with self.lock:
+            if mtime != self.dir_mtime_ns:
+                if self.dir_mtime_ns is not None:
+                    self.reloads += 1
+                self.dir_mtime_ns = mtime
+                self.compiler = None
+                self.validators = {}
+            validator = self.validators.get(schema_filename)
+            if validator is not None:
+                self.hits += 1
+                return validator
+            self.misses += 1
+            schema = read_json(self.base_dir / schema_filename)
+            try:
+                if self.compiler is None:
+                    self.compiler = self._load_compiler()
+                validator_cls, registry = self.compiler
+                validator = validator_cls(schema, registry=registry)
+            except ImportError:
+                validator = _RequiredKeysValidator(schema)
+            self.validators[schema_filename] = validator
+            return validator
+
+    def stats(self) -> dict[str, int]:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "compiled": len(self.validators),
+            }
+
+
+_COMPILED: dict[Path, _CompiledSchemaDir] = {}
+_COMPILED_LOCK = threading.Lock()
+
+
+def _compiled_dir(schemas_base_dir: Path) -> _CompiledSchemaDir:
+    key = Path(schemas_base_dir)
+    with _COMPILED_LOCK:
+        compiled = _COMPILED.get(key)
+        if compiled is None:
+            compiled = _CompiledSchemaDir(key)
+            _COMPILED[key] = compiled
+        return compiled
+
+
 @dataclass(frozen=True)
 class SchemaRegistry:
+    """
+    Process-wide view of a schemas directory. Instances are cheap: compiled validators are shared by every
+    registry pointing at the same directory (router, heartbeat and monitor in one process reuse them).
+    """
+
     schemas_base_dir: Path
 
     def validate(self, document: dict, schema_filename: str) -> None:
-        schema_path = self.schemas_base_dir / schema_filename
-        schema = read_json(schema_path)
+        validator = _compiled_dir(self.schemas_base_dir).validator_for(schema_filename)
         try:
-            import jsonschema  # type: ignore
-            from jsonschema.validators import Draft202012Validator  # type: ignore
-
-            store: dict[str, Any] = {}
-            try:
-                for p in self.schemas_base_dir.glob("*.schema.json"):
-                    try:
-                        s = read_json(p)
-                        sid = s.get("$id")
-                        if isinstance(sid, str) and sid:
-                            store[sid] = s
-                    except Exception:
-                        continue
-            except Exception:
-                store = {}
-
-            resolver = jsonschema.RefResolver.from_schema(schema, store=store)  # type: ignore[attr-defined]
-            Draft202012Validator(schema, resolver=resolver).validate(document)
-        except ImportError:
-            required = schema.get("required", [])
-            missing = [k for k in required if k not in document]
-            if missing:
-                raise SchemaInvalid(
-                    code="SCHEMA_INVALID",
-                    message=f"missing required keys: {missing} (jsonschema not installed)",
-                )
+            validator.validate(document)
+        except SchemaInvalid:
+            raise
         except Exception as e:
             raise SchemaInvalid(code="SCHEMA_INVALID", message=str(e)) from e
 
+    def cache_stats(self) -> dict[str, int]:
+        return _compiled_dir(self.schemas_base_dir).stats()
+
 
 def infer_schema_filename(envelope: dict) -> str:
     t = envelope.get("type")
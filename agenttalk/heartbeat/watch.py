@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+# "a file is ready to consume": finished writes and tmp->final renames
+FILE_READY_MASK = IN_CLOSE_WRITE | IN_MOVED_TO
+# "a subdirectory appeared": new agent / outbox / plan directories
+DIR_CHANGE_MASK = IN_CREATE | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+@dataclass(frozen=True)
+class WatchEvent:
+    """One inotify event. `path` is None for queue overflow (the caller must fall back to a full rescan)."""
+
+    path: Path | None
+    name: str
+    mask: int
+
+    @property
+    def overflow(self) -> bool:
+        return bool(self.mask & IN_Q_OVERFLOW)
+
+    @property
+    def is_dir(self) -> bool:
+        return bool(self.mask & IN_ISDIR)
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_LIBC = _load_libc()
+
+
+def inotify_available() -> bool:
+    return _LIBC is not None
+
+
+class DirWatcher:
+    """
+    Minimal inotify wrapper (Linux only, via ctypes; no third-party dependency).
+
+    Watches are per directory and not recursive; callers add new subdirectories as they appear (adding an
+    already-watched directory is a no-op). Callers must check `inotify_available()` first and keep a polling
+    fallback for other platforms.
+    """
+
+    def __init__(self) -> None:
+        if _LIBC is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+        fd = _LIBC.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.fd = fd
+        self.paths_by_wd: dict[int, Path] = {}
+        self.wd_by_path: dict[Path, int] = {}
+
+    def add(self, path: Path, mask: int) -> bool:
+        if path in self.wd_by_path:
+            return False
+        wd = _LIBC.inotify_add_watch(self.fd, os.fsencode(str(path)), mask | IN_ONLYDIR)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return False
+            raise OSError(err, os.strerror(err), str(path))
+        self.paths_by_wd[wd] = path
+        self.wd_by_path[path] = wd
+        return True
+
+    def watching(self, path: Path) -> bool:
+        return path in self.wd_by_path
+
+    def read(self, timeout_seconds: float | None) -> list[WatchEvent]:
+        """Block up to `timeout_seconds` for events; returns everything currently queued (possibly [])."""
+        ready, _, _ = select.select([self.fd], [], [], timeout_seconds)
+        if not ready:
+            return []
+        events: list[WatchEvent] = []
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+            events.extend(self._parse(buf))
+        return events
+
+    def _parse(self, buf: bytes) -> list[WatchEvent]:
+        events: list[WatchEvent] = []
+        pos = 0
+        while pos + _EVENT_HEADER.size <= len(buf):
+            wd, mask, _cookie, name_len = _EVENT_HEADER.unpack_from(buf, pos)
+            pos += _EVENT_HEADER.size
+            name = buf[pos : pos + name_len].split(b"\0", 1)[0].decode("utf-8", "surrogateescape")
+            pos += name_len
+            if mask & IN_Q_OVERFLOW:
+                events.append(WatchEvent(path=None, name="", mask=mask))
+                continue
+            path = self.paths_by_wd.get(wd)
+            if mask & IN_IGNORED:
+                if path is not None:
+                    self.paths_by_wd.pop(wd, None)
+                    self.wd_by_path.pop(path, None)
+                continue
+            if path is not None:
+                events.append(WatchEvent(path=path, name=name, mask=mask))
+        return events
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+        self.paths_by_wd.clear()
+        self.wd_by_path.clear()
+
+    def __enter__(self) -> "DirWatcher":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class InboxWatcher:
+    """
+    Watches `agents/<agent_id>/inbox/` (new plan directories) and each `inbox/<plan_id>/` (envelopes landing
+    via rename or finished write). `wait()` returns the plan ids to tick; `None` means events were lost and
+    the caller must scan every plan.
+    """
+
+    def __init__(self, inbox: Path):
+        self.inbox = inbox
+        self.watcher = DirWatcher()
+        self.queued: set[str] = set()
+
+    def sync(self) -> set[str]:
+        """Watch every plan inbox; returns the newly watched ones (they may already hold envelopes)."""
+        added: set[str] = set()
+        if not self.watcher.add(self.inbox, DIR_CHANGE_MASK) and not self.watcher.watching(self.inbox):
+            return added
+        try:
+            with os.scandir(self.inbox) as it:
+                plan_ids = sorted(e.name for e in it if not e.name.startswith(".") and e.is_dir())
+        except (FileNotFoundError, NotADirectoryError):
+            return added
+        for plan_id in plan_ids:
+            if self.watcher.add(self.inbox / plan_id, FILE_READY_MASK):
+                added.add(plan_id)
+        return added
+
+    def mark(self, plan_id: str) -> None:
+        """Queue a plan for the next `wait()` without an event (e.g. it still has a backlog)."""
+        self.queued.add(plan_id)
+
+    def wait(self, timeout_seconds: float | None) -> set[str] | None:
+        events = self.watcher.read(0 if self.queued else timeout_seconds)
+        woken, self.queued = self.queued, set()
+        resync = False
+        for ev in events:
+            if ev.overflow or ev.path is None:
+                return None
+            if ev.path == self.inbox:
+                if ev.is_dir or ev.mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    resync = True
+            elif ev.path.parent == self.inbox:
+                if ev.mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    resync = True
+                elif not ev.is_dir and ev.name.endswith(".msg.json"):
+                    woken.add(ev.path.name)
+        if resync:
+            woken |= self.sync()
+        return woken
+
+    def close(self) -> None:
+        self.watcher.close()
+
+    def __enter__(self) -> "InboxWatcher":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
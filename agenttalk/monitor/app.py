@@ -1,16 +1,21 @@
 from __future__ import annotations
 
-import fnmatch
+import json
+import threading
 import time
-from dataclasses import dataclass
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator
 from uuid import uuid4
 
 from agenttalk.heartbeat.schema import SchemaRegistry as _SchemaRegistry
+from agenttalk.heartbeat.command_index import CommandSeqIndex
+from agenttalk.router.dag import ActiveDagCache, Dag
 
-from .io import atomic_write_json, file_sha256, read_json, read_jsonl
+from .cache import DeliveredArtifactIndex, JsonFileCache, PlanCache, TaskReadiness
+from .io import atomic_write_json, read_json
 
 
 def _iso_z(dt: datetime) -> str:
@@ -79,6 +84,51 @@ def collect_agent_statuses(ctx: MonitorContext) -> list[str]:
 class MonitorConfig:
     poll_interval_seconds: int = 2
     schema_validation_enabled: bool = True
+    # plan aggregation: "serial", "thread" (I/O-heavy) or "process" (CPU-bound parsing/validation)
+    executor: str = "serial"
+    max_workers: int = 4
+
+
+MONITOR_EXECUTORS = ("serial", "thread", "process")
+
+
+class MonitorState:
+    """In-memory state the monitor keeps across ticks; rebuilt from disk on restart."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.dags = ActiveDagCache()
+        self.plans: dict[str, PlanCache] = {}
+        self._executor: Executor | None = None
+
+    def plan(self, system_runtime: Path, plan_id: str) -> PlanCache:
+        with self.lock:
+            cache = self.plans.get(plan_id)
+            if cache is None:
+                cache = PlanCache(system_runtime / "plans" / plan_id)
+                self.plans[plan_id] = cache
+            return cache
+
+    def executor(self, ctx: MonitorContext, kind: str) -> Executor:
+        # kept across cycles: worker processes (and their caches) are reused
+        with self.lock:
+            if self._executor is None:
+                workers = max(1, ctx.config.max_workers)
+                if kind == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=workers,
+                        initializer=_init_process_worker,
+                        initargs=(ctx.agents_root, ctx.system_runtime, ctx.schemas, ctx.config),
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="monitor")
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self.lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
 
 
 @dataclass(frozen=True)
@@ -87,6 +137,7 @@ class MonitorContext:
     system_runtime: Path
     schemas: _SchemaRegistry
     config: MonitorConfig
+    state: MonitorState = field(default_factory=MonitorState, compare=False, repr=False)
 
 
 def _list_plans(system_runtime: Path) -> list[str]:
@@ -96,97 +147,87 @@ def _list_plans(system_runtime: Path) -> list[str]:
     return sorted([p.name for p in plans_dir.iterdir() if p.is_dir() and not p.name.startswith(".")])
 
 
-def _load_current_dag(ctx: MonitorContext, plan_id: str) -> tuple[dict, str]:
+def _load_current_dag(ctx: MonitorContext, plan_id: str) -> tuple[Dag, str]:
     plan_dir = ctx.system_runtime / "plans" / plan_id
     dag_path = plan_dir / "task_dag.json"
     ref_path = plan_dir / "active_dag_ref.json"
-    dag = read_json(dag_path)
-    if ctx.config.schema_validation_enabled:
-        ctx.schemas.validate(dag, "task_dag.schema.json")
-    dag_sha = file_sha256(dag_path)
-    if ref_path.exists():
-        ref = read_json(ref_path)
-        if ctx.config.schema_validation_enabled:
-            ctx.schemas.validate(ref, "active_dag_ref.schema.json")
-        if str(ref.get("task_dag_sha256")) != dag_sha:
-            raise ValueError(f"active_dag_ref mismatch: {ref.get('task_dag_sha256')} != {dag_sha}")
+
+    def validate(obj: dict) -> None:
+        ctx.schemas.validate(obj, "task_dag.schema.json")
+
+    def validate_ref(obj: dict) -> None:
+        ctx.schemas.validate(obj, "active_dag_ref.schema.json")
+
+    enabled = ctx.config.schema_validation_enabled
+    active = ctx.state.dags.load(
+        plan_id,
+        dag_path=dag_path,
+        ref_path=ref_path,
+        validate_dag=validate if enabled else None,
+        validate_ref=validate_ref if enabled else None,
+        # the monitor reports on any DAG it can read, as before the shared cache; the router stays strict
+        strict=False,
+    )
+    dag, dag_sha = active.dag, active.dag_sha
+    if active.ref_sha is not None and active.ref_sha != dag_sha:
+        raise ValueError(f"active_dag_ref mismatch: {active.ref_sha} != {dag_sha}")
     return dag, dag_sha
 
 
-def _agent_outbox_task_state(ctx: MonitorContext, plan_id: str, agent_id: str, task_id: str) -> dict | None:
-    p = ctx.agents_root / agent_id / "outbox" / plan_id / f"task_state_{task_id}.json"
-    if not p.exists():
-        return None
-    try:
-        obj = read_json(p)
-        if ctx.config.schema_validation_enabled:
-            ctx.schemas.validate(obj, "task_state.schema.json")
-        return obj
-    except Exception:
+def _validator(ctx: MonitorContext, schema_name: str) -> Callable[[dict], Any] | None:
+    if not ctx.config.schema_validation_enabled:
         return None
+    return lambda obj: ctx.schemas.validate(obj, schema_name)
+
+
+def _agent_outbox_task_state(
+    ctx: MonitorContext, plan_id: str, agent_id: str, task_id: str, *, files: JsonFileCache
+) -> dict | None:
+    p = ctx.agents_root / agent_id / "outbox" / plan_id / f"task_state_{task_id}.json"
+    return files.get(p, validate=_validator(ctx, "task_state.schema.json"))
 
 
-def _load_acks(ctx: MonitorContext, plan_id: str) -> dict[str, dict]:
+def _load_acks(ctx: MonitorContext, plan_id: str, *, files: JsonFileCache) -> dict[str, dict]:
     plan_dir = ctx.system_runtime / "plans" / plan_id
     acks_dir = plan_dir / "acks"
-    acks: dict[str, dict] = {}
+    ack_paths: list[Path] = []
     if acks_dir.exists():
-        for p in acks_dir.glob("ack_*.json"):
-            try:
-                obj = read_json(p)
-                if ctx.config.schema_validation_enabled:
-                    ctx.schemas.validate(obj, "ack.schema.json")
-                acks[str(obj.get("message_id"))] = obj
-            except Exception:
+        ack_paths = list(acks_dir.glob("ack_*.json"))
+    elif ctx.agents_root.exists():
+        # fallback: scan agent outboxes
+        for agent_dir in ctx.agents_root.iterdir():
+            if not agent_dir.is_dir():
                 continue
-        return acks
+            outbox_plan = agent_dir / "outbox" / plan_id
+            if outbox_plan.exists():
+                ack_paths.extend(outbox_plan.glob("ack_*.json"))
 
-    # fallback: scan agent outboxes
-    if not ctx.agents_root.exists():
-        return {}
-    for agent_dir in ctx.agents_root.iterdir():
-        if not agent_dir.is_dir():
-            continue
-        outbox_plan = agent_dir / "outbox" / plan_id
-        if not outbox_plan.exists():
-            continue
-        for p in outbox_plan.glob("ack_*.json"):
-            try:
-                obj = read_json(p)
-                if ctx.config.schema_validation_enabled:
-                    ctx.schemas.validate(obj, "ack.schema.json")
-                acks[str(obj.get("message_id"))] = obj
-            except Exception:
-                continue
+    # unchanged ack files are neither re-read nor re-validated
+    validate = _validator(ctx, "ack.schema.json")
+    acks: dict[str, dict] = {}
+    for p in ack_paths:
+        obj = files.get(p, validate=validate)
+        if obj is not None:
+            acks[str(obj.get("message_id"))] = obj
+    files.retain(set(ack_paths))
     return acks
 
 
-def _load_latest_commands(ctx: MonitorContext, plan_id: str, dag_sha: str) -> dict[str, dict]:
-    plan_dir = ctx.system_runtime / "plans" / plan_id
-    cmds_dir = plan_dir / "commands"
+def _load_latest_commands(
+    ctx: MonitorContext, plan_id: str, dag_sha: str, *, index: CommandSeqIndex, files: JsonFileCache
+) -> dict[str, dict]:
+    cmds_dir = ctx.system_runtime / "plans" / plan_id / "commands"
     latest: dict[str, dict] = {}
     if not cmds_dir.exists():
         return latest
-    for p in cmds_dir.glob("*.msg.json"):
-        try:
-            env = read_json(p)
-        except Exception:
-            continue
-        if env.get("type") != "command":
-            continue
-        cmd = (env.get("payload") or {}).get("command") or {}
-        if str((cmd.get("dag_ref") or {}).get("sha256")) != dag_sha:
-            continue
-        task_id = str(cmd.get("task_id") or "")
+    # router-maintained (task_id, dag_sha) -> latest command index; rebuilt in memory if missing/stale
+    for task_id, entry in index.latest_for_dag(dag_sha).items():
         if not task_id:
             continue
-        try:
-            seq = int(cmd.get("command_seq"))
-        except Exception:
+        env = files.get(cmds_dir / entry.file_name)
+        if env is None:
             continue
-        cur = latest.get(task_id)
-        if cur is None or int(cur.get("command_seq", -1)) < seq:
-            latest[task_id] = cmd
+        latest[task_id] = (env.get("payload") or {}).get("command") or {}
     return latest
 
 
@@ -195,6 +236,8 @@ def _map_messages_from_command_archive(
     *,
     plan_id: str,
     dag_sha: str,
+    files: JsonFileCache,
+    alerts: list[dict],
 ) -> tuple[dict[str, str], dict[str, dict]]:
     """
     Returns:
@@ -202,7 +245,7 @@ def _map_messages_from_command_archive(
       - message_id -> payload.command (for timeout, etc.)
 
     Consistency rule (08): envelope.task_id/command_id must match payload.command.task_id/command_id.
-    If inconsistent, ignore that envelope for mapping and write an alert.
+    If inconsistent, ignore that envelope for mapping and queue an alert on `alerts`.
     """
     plan_dir = ctx.system_runtime / "plans" / plan_id
     cmds_dir = plan_dir / "commands"
@@ -211,10 +254,11 @@ def _map_messages_from_command_archive(
     if not cmds_dir.exists():
         return msg_to_task, msg_to_cmd
 
-    for p in cmds_dir.glob("*.msg.json"):
-        try:
-            env = read_json(p)
-        except Exception:
+    cmd_paths = list(cmds_dir.glob("*.msg.json"))
+    files.retain(set(cmd_paths))
+    for p in cmd_paths:
+        env = files.get(p)
+        if env is None:
             continue
         if env.get("type") != "command":
             continue
@@ -232,26 +276,31 @@ def _map_messages_from_command_archive(
 
         # If envelope has task/command ids, they must match payload.command.
         if env_task_id and env_task_id != cmd_task_id:
-            _write_alert(
-                ctx,
-                plan_id=plan_id,
-                alert_type="COMMAND_ARCHIVE_INCONSISTENT",
-                message="command envelope.task_id != payload.command.task_id",
-                details={"file": p.name, "message_id": message_id, "envelope_task_id": env_task_id, "command_task_id": cmd_task_id},
+            alerts.append(
+                {
+                    "alert_type": "COMMAND_ARCHIVE_INCONSISTENT",
+                    "message": "command envelope.task_id != payload.command.task_id",
+                    "details": {
+                        "file": p.name,
+                        "message_id": message_id,
+                        "envelope_task_id": env_task_id,
+                        "command_task_id": cmd_task_id,
+                    },
+                }
             )
             continue
         if env_command_id and cmd_command_id and env_command_id != cmd_command_id:
-            _write_alert(
-                ctx,
-                plan_id=plan_id,
-                alert_type="COMMAND_ARCHIVE_INCONSISTENT",
-                message="command envelope.command_id != payload.command.command_id",
-                details={
-                    "file": p.name,
-                    "message_id": message_id,
-                    "envelope_command_id": env_command_id,
-                    "command_command_id": cmd_command_id,
-                },
+            alerts.append(
+                {
+                    "alert_type": "COMMAND_ARCHIVE_INCONSISTENT",
+                    "message": "command envelope.command_id != payload.command.command_id",
+                    "details": {
+                        "file": p.name,
+                        "message_id": message_id,
+                        "envelope_command_id": env_command_id,
+                        "command_command_id": cmd_command_id,
+                    },
+                }
             )
             continue
 
@@ -261,29 +310,10 @@ def _map_messages_from_command_archive(
     return msg_to_task, msg_to_cmd
 
 
-def _delivered_artifacts(deliveries: list[dict]) -> tuple[set[tuple[str, str]], list[dict]]:
-    outputs: set[tuple[str, str]] = set()
-    delivered_files: list[dict] = []
-    for d in deliveries:
-        if d.get("status") != "DELIVERED":
-            continue
-        task_id = d.get("task_id")
-        output_name = d.get("output_name")
-        if isinstance(task_id, str) and isinstance(output_name, str):
-            outputs.add((task_id, output_name))
-        payload = d.get("payload") or {}
-        files = payload.get("files") or []
-        for f in files:
-            if isinstance(f, dict) and isinstance(f.get("path"), str):
-                delivered_files.append(f)
-    return outputs, delivered_files
-
-
 def _inputs_satisfied(
     dag_node: dict,
     *,
-    delivered_outputs: set[tuple[str, str]],
-    delivered_files: list[dict],
+    delivered: DeliveredArtifactIndex,
 ) -> bool:
     inputs = dag_node.get("inputs")
     if isinstance(inputs, list) and inputs:
@@ -295,16 +325,13 @@ def _inputs_satisfied(
             selector = inp.get("selector") or {}
             stype = selector.get("type")
             if stype == "by_output_name":
-                value = selector.get("value")
-                if not any(o == value for _, o in delivered_outputs):
+                if not delivered.has_output_name(selector.get("value")):
                     return False
             elif stype == "by_file_name":
-                value = selector.get("value")
-                if not any(f.get("path") == value for f in delivered_files):
+                if not delivered.has_path(selector.get("value")):
                     return False
             elif stype == "by_glob":
-                pat = selector.get("value")
-                if not any(fnmatch.fnmatch(str(f.get("path")), str(pat)) for f in delivered_files):
+                if not delivered.matches_glob(str(selector.get("value"))):
                     return False
             else:
                 return False
@@ -313,15 +340,14 @@ def _inputs_satisfied(
     required_inputs = dag_node.get("required_inputs")
     if isinstance(required_inputs, list) and required_inputs:
         for name in required_inputs:
-            if not any(f.get("path") == name for f in delivered_files):
+            if not delivered.has_path(name):
                 return False
         return True
     return True
 
 
-def _command_inputs_missing(cmd: dict, delivered_files: list[dict]) -> list[str]:
-    def exists_path(p: str) -> bool:
-        return any(f.get("path") == p for f in delivered_files)
+def _command_inputs_missing(cmd: dict, delivered: DeliveredArtifactIndex) -> list[str]:
+    exists_path = delivered.has_path
 
     resolved = cmd.get("resolved_inputs")
     if isinstance(resolved, list):
@@ -344,64 +370,83 @@ def _command_inputs_missing(cmd: dict, delivered_files: list[dict]) -> list[str]
 
 
 def aggregate_plan_status(ctx: MonitorContext, plan_id: str) -> dict:
-    plan_dir = ctx.system_runtime / "plans" / plan_id
+    alerts: list[dict] = []
+    try:
+        return _collect_plan_status(ctx, plan_id, alerts)
+    finally:
+        for alert in alerts:
+            _write_alert(ctx, plan_id=plan_id, **alert)
+
+
+def _collect_plan_status(ctx: MonitorContext, plan_id: str, alerts: list[dict]) -> dict:
+    """Builds plan_status without writing anything; alerts are queued on `alerts` (`_write_alert` kwargs)."""
+    cache = ctx.state.plan(ctx.system_runtime, plan_id)
     dag, dag_sha = _load_current_dag(ctx, plan_id)
-    deliveries = read_jsonl(plan_dir / "deliveries.jsonl")
-    acks = _load_acks(ctx, plan_id)
-    commands = _load_latest_commands(ctx, plan_id, dag_sha)
-    delivered_outputs, delivered_files = _delivered_artifacts(deliveries)
+    # only delivery lines appended since the previous cycle are parsed
+    cache.deliveries.refresh()
+    delivered = cache.deliveries.artifacts
+    acks = _load_acks(ctx, plan_id, files=cache.acks)
+    commands = _load_latest_commands(ctx, plan_id, dag_sha, index=cache.commands, files=cache.command_files)
 
     # Map message_id -> task_id for commands using deliveries (preferred)
-    msg_to_task: dict[str, str] = {}
-    msg_to_cmd: dict[str, str] = {}
-    for d in deliveries:
-        if d.get("status") == "DELIVERED" and isinstance(d.get("message_id"), str) and isinstance(d.get("task_id"), str):
-            msg_to_task[str(d["message_id"])] = str(d["task_id"])
-            if isinstance(d.get("command_id"), str):
-                msg_to_cmd[str(d["message_id"])] = str(d["command_id"])
+    msg_to_task = dict(cache.deliveries.msg_to_task)
 
     # Fallback mapping: command archive (only fill gaps)
-    cmd_msg_to_task, cmd_msg_to_cmd = _map_messages_from_command_archive(ctx, plan_id=plan_id, dag_sha=dag_sha)
+    cmd_msg_to_task, cmd_msg_to_cmd = _map_messages_from_command_archive(
+        ctx, plan_id=plan_id, dag_sha=dag_sha, files=cache.command_files, alerts=alerts
+    )
     for mid, tid in cmd_msg_to_task.items():
         msg_to_task.setdefault(mid, tid)
 
-    tasks_out: list[dict] = []
-    task_state_by_id: dict[str, str] = {}
-    for node in dag.get("nodes", []):
+    # task_id -> message_ids (in msg_to_task order), built once so per-task ack lookups are O(own messages)
+    msgs_by_task: dict[str, list[str]] = {}
+    for mid, tid in msg_to_task.items():
+        msgs_by_task.setdefault(tid, []).append(mid)
+
+    # dependency readiness is carried over from the previous cycle and only changes along the successor edges of
+    # tasks whose COMPLETED-ness changed (see TaskReadiness)
+    readiness = cache.readiness
+    if readiness is None or readiness.dag_sha != dag_sha:
+        readiness = cache.readiness = TaskReadiness(dag, dag_sha)
+    deliveries_version = (delivered, cache.deliveries.lines_parsed)
+
+    # evaluate in topological order (cached on the compiled DAG) so a completed dependency makes its dependents
+    # READY in the same pass; tasks are still reported in DAG file order
+    nodes = dag.nodes
+    task_entries: list[dict | None] = [None] * len(nodes)
+    for i in dag.topo_order:
+        node = nodes[i]
         task_id = str(node.get("task_id"))
         assigned = str(node.get("assigned_agent_id"))
 
         # priority 1: task_state file
-        ts = _agent_outbox_task_state(ctx, plan_id, assigned, task_id)
+        ts = _agent_outbox_task_state(ctx, plan_id, assigned, task_id, files=cache.task_states)
         if ts and isinstance(ts.get("state"), str):
             state = str(ts["state"])
-            tasks_out.append(
-                {
-                    "task_id": task_id,
-                    "assigned_agent_id": assigned,
-                    "state": state,
-                    "updated_at": ts.get("updated_at"),
-                    "blocking": ts.get("blocking"),
-                }
-            )
-            task_state_by_id[task_id] = state
+            task_entries[i] = {
+                "task_id": task_id,
+                "assigned_agent_id": assigned,
+                "state": state,
+                "updated_at": ts.get("updated_at"),
+                "blocking": ts.get("blocking"),
+            }
+            readiness.set_state(task_id, state)
             continue
 
         # priority 2: ACKs (command messages)
         # pick any ack mapped to this task_id; prefer terminal over consumed
         ack_for_task = None
-        for mid, tid in msg_to_task.items():
-            if tid != task_id:
-                continue
+        ack_mid = None
+        for mid in msgs_by_task.get(task_id, ()):
             a = acks.get(mid)
             if not a:
                 continue
             if ack_for_task is None:
-                ack_for_task = a
+                ack_for_task, ack_mid = a, mid
             else:
                 # prefer terminal
                 if ack_for_task.get("status") == "CONSUMED" and a.get("status") in ("SUCCEEDED", "FAILED"):
-                    ack_for_task = a
+                    ack_for_task, ack_mid = a, mid
         if ack_for_task:
             s = str(ack_for_task.get("status"))
             if s == "SUCCEEDED":
@@ -418,18 +463,10 @@ def aggregate_plan_status(ctx: MonitorContext, plan_id: str) -> dict:
                 else:
                     consumed_dt = None
                 timeout_seconds = None
-                # Try to find timeout from command archive for this message_id.
-                for mid, tid in msg_to_task.items():
-                    if tid != task_id:
-                        continue
-                    a = acks.get(mid)
-                    if not a:
-                        continue
-                    if a is ack_for_task:
-                        cmd_obj = cmd_msg_to_cmd.get(mid)
-                        if cmd_obj and isinstance(cmd_obj.get("timeout"), int):
-                            timeout_seconds = int(cmd_obj["timeout"])
-                        break
+                # Timeout from the command archive for the acked message_id.
+                cmd_obj = cmd_msg_to_cmd.get(ack_mid) if ack_mid is not None else None
+                if cmd_obj and isinstance(cmd_obj.get("timeout"), int):
+                    timeout_seconds = int(cmd_obj["timeout"])
                 if consumed_dt and timeout_seconds is not None:
                     if datetime.now(timezone.utc) - consumed_dt > timedelta(seconds=timeout_seconds * 2):
                         blocking = {
@@ -438,64 +475,42 @@ def aggregate_plan_status(ctx: MonitorContext, plan_id: str) -> dict:
                             "multiplier": 2,
                             "consumed_at": consumed_at,
                         }
-                        _write_alert(
-                            ctx,
-                            plan_id=plan_id,
-                            alert_type="COMMAND_ACK_TIMEOUT",
-                            message="ack is CONSUMED for too long without terminal ack",
-                            details={"task_id": task_id, "timeout_seconds": timeout_seconds, "consumed_at": consumed_at},
+                        alerts.append(
+                            {
+                                "alert_type": "COMMAND_ACK_TIMEOUT",
+                                "message": "ack is CONSUMED for too long without terminal ack",
+                                "details": {
+                                    "task_id": task_id,
+                                    "timeout_seconds": timeout_seconds,
+                                    "consumed_at": consumed_at,
+                                },
+                            }
                         )
-            tasks_out.append(
-                {
-                    "task_id": task_id,
-                    "assigned_agent_id": assigned,
-                    "state": state,
-                    "updated_at": ack_for_task.get("finished_at") or ack_for_task.get("consumed_at"),
-                    "blocking": blocking,
-                }
-            )
-            task_state_by_id[task_id] = state
-            continue
-
-        # derive based on dag deps and inputs
-        deps = [str(x) for x in (node.get("depends_on") or [])]
-        deps_ok = all(task_state_by_id.get(d) == "COMPLETED" for d in deps)
-        inputs_ok = _inputs_satisfied(node, delivered_outputs=delivered_outputs, delivered_files=delivered_files)
-
-        # If a latest command exists and waits for inputs, we can mark blocked
-        latest_cmd = commands.get(task_id)
-        if latest_cmd and bool(latest_cmd.get("wait_for_inputs", False)):
-            missing = _command_inputs_missing(latest_cmd, delivered_files)
-            if missing:
-                state = "BLOCKED_WAITING_INPUT"
-                tasks_out.append(
-                    {
-                        "task_id": task_id,
-                        "assigned_agent_id": assigned,
-                        "state": state,
-                        "updated_at": None,
-                        "blocking": {"reason": "MISSING_INPUTS", "missing": missing},
-                    }
-                )
-                task_state_by_id[task_id] = state
-                continue
-
-        if deps_ok and inputs_ok:
-            state = "READY"
-        else:
-            state = "PENDING"
-        tasks_out.append(
-            {
+            task_entries[i] = {
                 "task_id": task_id,
                 "assigned_agent_id": assigned,
                 "state": state,
-                "updated_at": None,
-                "blocking": None,
+                "updated_at": ack_for_task.get("finished_at") or ack_for_task.get("consumed_at"),
+                "blocking": blocking,
             }
+            readiness.set_state(task_id, state)
+            continue
+
+        # derive based on dag deps and inputs; reused while deps, deliveries and the latest command are unchanged
+        deps_ok = readiness.deps_ok(i)
+        latest_cmd = commands.get(task_id)
+        entry = readiness.derive(
+            i,
+            (deps_ok, deliveries_version, latest_cmd),
+            lambda: _derive_task_entry(
+                node, task_id=task_id, assigned=assigned, deps_ok=deps_ok, delivered=delivered, latest_cmd=latest_cmd
+            ),
         )
-        task_state_by_id[task_id] = state
+        task_entries[i] = entry
+        readiness.set_state(task_id, entry["state"])
 
     blocked_summary: dict[str, int] = {"INPUT": 0, "REVIEW": 0, "HUMAN": 0}
+    tasks_out = [t for t in task_entries if t is not None]
     for t in tasks_out:
         s = t.get("state")
         if s == "BLOCKED_WAITING_INPUT":
@@ -516,33 +531,141 @@ def aggregate_plan_status(ctx: MonitorContext, plan_id: str) -> dict:
     }
 
 
+def _derive_task_entry(
+    node: dict,
+    *,
+    task_id: str,
+    assigned: str,
+    deps_ok: bool,
+    delivered: DeliveredArtifactIndex,
+    latest_cmd: dict | None,
+) -> dict:
+    """plan_status row of a task without task_state/ack: BLOCKED_WAITING_INPUT, READY or PENDING."""
+    # If a latest command exists and waits for inputs, we can mark blocked
+    if latest_cmd and bool(latest_cmd.get("wait_for_inputs", False)):
+        missing = _command_inputs_missing(latest_cmd, delivered)
+        if missing:
+            return {
+                "task_id": task_id,
+                "assigned_agent_id": assigned,
+                "state": "BLOCKED_WAITING_INPUT",
+                "updated_at": None,
+                "blocking": {"reason": "MISSING_INPUTS", "missing": missing},
+            }
+
+    if deps_ok and _inputs_satisfied(node, delivered=delivered):
+        state = "READY"
+    else:
+        state = "PENDING"
+    return {"task_id": task_id, "assigned_agent_id": assigned, "state": state, "updated_at": None, "blocking": None}
+
+
+def _write_plan_status(ctx: MonitorContext, plan_id: str, status: dict) -> bool:
+    """Rewrite plan_status.json only when something other than `updated_at` changed (or the file was touched)."""
+    path = ctx.system_runtime / "plans" / plan_id / "plan_status.json"
+    cache = ctx.state.plan(ctx.system_runtime, plan_id)
+    content = json.dumps({k: v for k, v in status.items() if k != "updated_at"}, ensure_ascii=False, sort_keys=True)
+    if cache.status_unchanged(path, content):
+        return False
+    atomic_write_json(path, status)
+    cache.status_written(path, content)
+    return True
+
+
+@dataclass(frozen=True)
+class PlanAggregation:
+    """Result of aggregating one plan (possibly in a worker); applied to disk by `run_once` only."""
+
+    plan_id: str
+    status: dict | None
+    alerts: list[dict]
+    error: str | None = None
+
+
+def _aggregate_plan(ctx: MonitorContext, plan_id: str) -> PlanAggregation:
+    alerts: list[dict] = []
+    try:
+        status = _collect_plan_status(ctx, plan_id, alerts)
+        if ctx.config.schema_validation_enabled:
+            ctx.schemas.validate(status, "plan_status.schema.json")
+    except Exception as e:
+        return PlanAggregation(plan_id=plan_id, status=None, alerts=alerts, error=str(e))
+    return PlanAggregation(plan_id=plan_id, status=status, alerts=alerts)
+
+
+_WORKER_CTX: MonitorContext | None = None
+
+
+def _init_process_worker(agents_root: Path, system_runtime: Path, schemas: _SchemaRegistry, config: MonitorConfig) -> None:
+    # each worker process keeps its own caches (MonitorState) across cycles
+    global _WORKER_CTX
+    _WORKER_CTX = MonitorContext(agents_root=agents_root, system_runtime=system_runtime, schemas=schemas, config=config)
+
+
+def _aggregate_in_process_worker(plan_id: str) -> PlanAggregation:
+    assert _WORKER_CTX is not None
+    return _aggregate_plan(_WORKER_CTX, plan_id)
+
+
+def _aggregate_plans(ctx: MonitorContext, plan_ids: list[str]) -> Iterator[PlanAggregation]:
+    """Yields results in `plan_ids` order, whichever executor computed them."""
+    kind = ctx.config.executor
+    if kind not in MONITOR_EXECUTORS:
+        raise ValueError(f"unknown monitor executor: {kind!r} (expected one of {MONITOR_EXECUTORS})")
+    if kind == "serial" or len(plan_ids) <= 1:
+        for plan_id in plan_ids:
+            yield _aggregate_plan(ctx, plan_id)
+        return
+    pool = ctx.state.executor(ctx, kind)
+    if kind == "process":
+        futures = [pool.submit(_aggregate_in_process_worker, plan_id) for plan_id in plan_ids]
+    else:
+        futures = [pool.submit(_aggregate_plan, ctx, plan_id) for plan_id in plan_ids]
+    for plan_id, future in zip(plan_ids, futures):
+        try:
+            yield future.result()
+        except Exception as e:
+            if isinstance(e, BrokenExecutor):
+                # a worker died; start a fresh pool next cycle
+                ctx.state.shutdown()
+            yield PlanAggregation(plan_id=plan_id, status=None, alerts=[], error=f"{type(e).__name__}: {e}")
+
+
+def _apply_aggregation(ctx: MonitorContext, result: PlanAggregation) -> None:
+    for alert in result.alerts:
+        _write_alert(ctx, plan_id=result.plan_id, **alert)
+    if result.error is None and result.status is not None:
+        try:
+            _write_plan_status(ctx, result.plan_id, result.status)
+            return
+        except Exception as e:
+            result = PlanAggregation(plan_id=result.plan_id, status=None, alerts=[], error=str(e))
+    _write_alert(
+        ctx,
+        plan_id=result.plan_id,
+        alert_type="PLAN_STATUS_AGGREGATION_FAILED",
+        message=str(result.error),
+        details=None,
+    )
+
+
 def run_once(ctx: MonitorContext) -> list[str]:
     collect_agent_statuses(ctx)
     plans = _list_plans(ctx.system_runtime)
-    for plan_id in plans:
-        try:
-            status = aggregate_plan_status(ctx, plan_id)
-            if ctx.config.schema_validation_enabled:
-                ctx.schemas.validate(status, "plan_status.schema.json")
-            plan_dir = ctx.system_runtime / "plans" / plan_id
-            atomic_write_json(plan_dir / "plan_status.json", status)
-        except Exception as e:
-            _write_alert(
-                ctx,
-                plan_id=plan_id,
-                alert_type="PLAN_STATUS_AGGREGATION_FAILED",
-                message=str(e),
-                details=None,
-            )
+    # plans may be aggregated concurrently, but alerts and plan_status.json are written here only (single writer)
+    for result in _aggregate_plans(ctx, plans):
+        _apply_aggregation(ctx, result)
     return plans
 
 
-def run_forever(*, agents_root: Path, system_runtime: Path, schemas_base_dir: Path) -> None:
+def run_forever(
+    *, agents_root: Path, system_runtime: Path, schemas_base_dir: Path, config: MonitorConfig | None = None
+) -> None:
     ctx = MonitorContext(
         agents_root=agents_root,
         system_runtime=system_runtime,
         schemas=_SchemaRegistry(schemas_base_dir=schemas_base_dir),
-        config=MonitorConfig(),
+        config=config or MonitorConfig(),
     )
     while True:
         run_once(ctx)
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import fnmatch
+import json
+import os
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable
+
+from agenttalk.heartbeat.hashing import RACY_WINDOW_NS
+from agenttalk.heartbeat.command_index import CommandSeqIndex
+from agenttalk.router.dag import Dag
+from agenttalk.router.delivery_log import DeliveryLogIndex
+
+
+def _stat_key(st: os.stat_result) -> tuple[int, int, int, int]:
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class JsonFileCache:
+    """
+    Parsed (and optionally schema-validated) JSON files keyed by `(st_dev, st_ino, st_size, st_mtime_ns)`.
+
+    `get()` returns the parsed object, or None for missing/unparsable/invalid files (invalid results are cached
+    too, so a broken file is not re-validated every cycle). Files modified within the racy mtime window are
+    parsed but not cached. Returned objects are shared and must not be mutated.
+    """
+
+    def __init__(self) -> None:
+        self.entries: dict[Path, tuple[tuple[Any, ...], dict | None]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: Path, *, validate: Callable[[dict], Any] | None = None) -> dict | None:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.entries.pop(path, None)
+            return None
+        key = (*_stat_key(st), validate is not None)
+        cached = self.entries.get(path)
+        if cached is not None and cached[0] == key:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        obj: dict | None
+        try:
+            obj = json.loads(path.read_text(encoding="utf-8"))
+            if validate is not None:
+                validate(obj)
+        except Exception:
+            obj = None
+        try:
+            st2 = os.stat(path)
+        except FileNotFoundError:
+            st2 = None
+        if st2 is not None and _stat_key(st2) == key[:4] and time.time_ns() - st2.st_mtime_ns >= RACY_WINDOW_NS:
+            self.entries[path] = (key, obj)
+        else:
+            self.entries.pop(path, None)
+        return obj
+
+    def retain(self, paths: set[Path]) -> None:
+        """Forget files that are no longer listed."""
+        for p in [p for p in self.entries if p not in paths]:
+            del self.entries[p]
+
+
+@lru_cache(maxsize=1024)
+def _glob_matcher(pattern: str) -> Callable[[str], re.Match | None]:
+    return re.compile(fnmatch.translate(os.path.normcase(pattern))).match
+
+
+class DeliveredArtifactIndex:
+    """
+    Delivered artifact lookups for input-readiness checks: payload path set, output-name set and glob
+    matching (`fnmatch.fnmatch` semantics, compiled regex cached per pattern). Glob results are memoized and
+    only paths added since a pattern was last checked are scanned, so readiness checks are ~O(1) per input.
+    """
+
+    def __init__(self) -> None:
+        self.paths: set[str] = set()
+        self.output_names: set[str] = set()
+        self._path_list: list[str] = []
+        self._globs: dict[str, tuple[bool, int]] = {}
+
+    def add_output(self, output_name: str) -> None:
+        self.output_names.add(output_name)
+
+    def add_path(self, path: str) -> None:
+        if path not in self.paths:
+            self.paths.add(path)
+            self._path_list.append(path)
+
+    def has_path(self, path: object) -> bool:
+        # selector values come from the DAG as-is; lists/dicts are unhashable and never match
+        return isinstance(path, str) and path in self.paths
+
+    def has_output_name(self, output_name: object) -> bool:
+        return isinstance(output_name, str) and output_name in self.output_names
+
+    def matches_glob(self, pattern: str) -> bool:
+        matched, checked = self._globs.get(pattern, (False, 0))
+        if matched or checked == len(self._path_list):
+            return matched
+        match = _glob_matcher(pattern)
+        matched = any(match(os.path.normcase(p)) for p in self._path_list[checked:])
+        self._globs[pattern] = (matched, len(self._path_list))
+        return matched
+
+
+class DeliveredArtifacts(DeliveryLogIndex):
+    """
+    Incremental fold of deliveries.jsonl for plan_status: DELIVERED outputs/paths and the message_id ->
+    task_id/command_id mapping. Only lines appended since the last refresh are parsed (see DeliveryLogIndex).
+    """
+
+    def __init__(self, log_path: Path) -> None:
+        super().__init__(log_path)
+        self.artifacts = DeliveredArtifactIndex()
+        self.msg_to_task: dict[str, str] = {}
+        self.msg_to_cmd: dict[str, str] = {}
+
+    def _reset(self) -> None:
+        super()._reset()
+        self.artifacts = DeliveredArtifactIndex()
+        self.msg_to_task = {}
+        self.msg_to_cmd = {}
+
+    def _fold(self, entry: dict) -> None:
+        if entry.get("status") != "DELIVERED":
+            return
+        task_id = entry.get("task_id")
+        output_name = entry.get("output_name")
+        if isinstance(task_id, str) and isinstance(output_name, str):
+            self.artifacts.add_output(output_name)
+        payload = entry.get("payload") or {}
+        for f in payload.get("files") or []:
+            if isinstance(f, dict) and isinstance(f.get("path"), str):
+                self.artifacts.add_path(f["path"])
+        message_id = entry.get("message_id")
+        if isinstance(message_id, str) and isinstance(task_id, str):
+            self.msg_to_task[message_id] = task_id
+            if isinstance(entry.get("command_id"), str):
+                self.msg_to_cmd[message_id] = str(entry["command_id"])
+
+
+class TaskReadiness:
+    """
+    Dependency readiness of one compiled DAG, kept across monitor cycles. `unmet[i]` counts the distinct
+    `depends_on` task_ids of node i that are not COMPLETED; a task whose COMPLETED-ness changes only updates the
+    nodes that depend on it (`Dag.dependents_of`), so a cycle costs O(changed tasks x their dependents) instead of
+    re-checking every dependency list. Derived (no task_state/ack) entries are memoized per node with the inputs
+    they were derived from and rebuilt only when one of those changes.
+    """
+
+    def __init__(self, dag: Dag, dag_sha: str) -> None:
+        self.dag = dag
+        self.dag_sha = dag_sha
+        self.completed: set[str] = set()
+        self.unmet = [len(dag.dependency_ids(i)) for i in range(len(dag.nodes))]
+        self.derived: list[tuple[tuple[Any, ...], dict] | None] = [None] * len(dag.nodes)
+        self.propagated = 0
+
+    def deps_ok(self, index: int) -> bool:
+        return self.unmet[index] == 0
+
+    def set_state(self, task_id: str, state: str) -> None:
+        done = state == "COMPLETED"
+        if done == (task_id in self.completed):
+            return
+        if done:
+            self.completed.add(task_id)
+        else:
+            self.completed.discard(task_id)
+        for j in self.dag.dependents_of(task_id):
+            self.unmet[j] += -1 if done else 1
+            self.propagated += 1
+
+    def derive(self, index: int, key: tuple[Any, ...], build: Callable[[], dict]) -> dict:
+        """The memoized entry of node `index` if it was derived from `key` (compared with ==), else `build()`."""
+        cached = self.derived[index]
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        entry = build()
+        self.derived[index] = (key, entry)
+        return entry
+
+
+class PlanCache:
+    """Per-plan inputs of `aggregate_plan_status`, refreshed incrementally across monitor cycles."""
+
+    def __init__(self, plan_dir: Path) -> None:
+        self.deliveries = DeliveredArtifacts(plan_dir / "deliveries.jsonl")
+        self.commands = CommandSeqIndex(plan_dir / "commands", plan_dir / "command_index.json", writable=False)
+        self.acks = JsonFileCache()
+        self.command_files = JsonFileCache()
+        self.task_states = JsonFileCache()
+        self.readiness: TaskReadiness | None = None
+        # plan_status content (minus updated_at) last written, and the stat of the file written
+        self.written_status: str | None = None
+        self.written_stat: tuple[int, int, int, int] | None = None
+
+    def status_unchanged(self, path: Path, content: str) -> bool:
+        if self.written_status != content:
+            return False
+        try:
+            return _stat_key(os.stat(path)) == self.written_stat
+        except FileNotFoundError:
+            return False
+
+    def status_written(self, path: Path, content: str) -> None:
+        self.written_status = content
+        self.written_stat = _stat_key(os.stat(path))
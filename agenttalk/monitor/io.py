@@ -2,16 +2,9 @@ from __future__ import annotations
 
 import json
 import os
-from hashlib import sha256
 from pathlib import Path
 
-
-def file_sha256(path: Path) -> str:
-    h = sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return "sha256:" + h.hexdigest()
+from agenttalk.heartbeat.hashing import file_sha256  # shared stat-keyed cache; re-exported
 
 
 def atomic_write_bytes(path: Path, data: bytes) -> None:
@@ -31,17 +24,3 @@ def atomic_write_json(path: Path, obj: object) -> None:
 def read_json(path: Path) -> dict:
     return json.loads(path.read_text(encoding="utf-8"))
 
-
-def read_jsonl(path: Path) -> list[dict]:
-    if not path.exists():
-        return []
-    rows: list[dict] = []
-    for line in path.read_text(encoding="utf-8").splitlines():
-        if not line.strip():
-            continue
-        try:
-            rows.append(json.loads(line))
-        except Exception:
-            continue
-    return rows
-
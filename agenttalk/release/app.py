@@ -3,11 +3,11 @@ from __future__ import annotations
 import json
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from hashlib import sha256
 from pathlib import Path
 from typing import Any
 from uuid import uuid4
 
+from agenttalk.heartbeat.hashing import file_sha256
 from agenttalk.heartbeat.schema import SchemaRegistry
 from agenttalk.heartbeat.state import build_input_lookup
 from agenttalk.heartbeat.io import atomic_write_json
@@ -17,14 +17,6 @@ def _iso_z(dt: datetime) -> str:
     return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
-def _file_sha256(path: Path) -> str:
-    h = sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return "sha256:" + h.hexdigest()
-
-
 def _read_json(path: Path) -> dict:
     return json.loads(path.read_text(encoding="utf-8"))
 
@@ -76,7 +68,7 @@ def evaluate_release_gates(
         if not p.exists():
             missing.append(name)
             continue
-        sha = _file_sha256(p)
+        sha = file_sha256(p)
         evidence_refs.append({"name": name, "sha256": sha})
         schema = EVIDENCE_SCHEMA_BY_FILENAME.get(name)
         try:
@@ -169,7 +161,7 @@ def run_release_coordinator_once(
     atomic_write_json(manifest_path, manifest)
     if schema_validation_enabled:
         schemas.validate(_read_json(manifest_path), "release_manifest.schema.json")
-    manifest_sha = _file_sha256(manifest_path)
+    manifest_sha = file_sha256(manifest_path)
 
     decision_id = f"dec_{now.strftime('%Y%m%dT%H%M%SZ')}_{uuid4().hex[:8]}"
     decision_record: dict[str, Any] = {
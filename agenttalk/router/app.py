@@ -1,18 +1,27 @@
 from __future__ import annotations
 
+import threading
 import time
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable
 from uuid import uuid4
 
-from .dag import Dag, parse_active_dag_ref, parse_dag
-from .delivery_log import DeliveryLog, delivered_index
+from .dag import ActiveDagCache, Dag
+from .delivery_log import STAGED_SUFFIX, DeliveredIndex, DeliveryLogIndex, DeliveryLogWriter
+from .events import OutboxWatcher
 from .errors import DagInvalid, EnvelopeInvalid, RoutingNoTarget, RouterError
 from .io import AgentsPaths, SystemPaths, atomic_copy, atomic_write_json, file_sha256, read_json
+from .outbox import EnvelopeCache, OutboxSnapshot, list_subdirs, scan_outbox_plan
+from .plan_lock import plan_lock
 from .schema import SchemaRegistry
+from agenttalk.heartbeat.blobs import BlobDigestMismatch, BlobStore
+from agenttalk.heartbeat.command_index import CommandSeqIndex
 from agenttalk.heartbeat.errors import SchemaInvalid
+from agenttalk.heartbeat.hashing import Sha256Cache, default_sha256_cache, set_default_sha256_cache
+from agenttalk.heartbeat.watch import inotify_available
 
 
 def _iso_z(dt: datetime) -> str:
@@ -27,6 +36,79 @@ def _delivery_id(now: datetime) -> str:
 class RouterConfig:
     poll_interval_seconds: int = 2
     schema_validation_enabled: bool = True
+    # event mode (Linux inotify): route only the plan/agent that changed; full tick is the safety net
+    event_mode: bool = False
+    full_tick_interval_seconds: int = 60
+    # >1 routes independent plans concurrently on a thread pool
+    max_workers: int = 1
+    # concurrent per-target copies when an artifact fans out to several inboxes
+    fanout_workers: int = 8
+    # payload placement into inboxes: copy | reflink | link (see heartbeat.io.place_file)
+    delivery_mode: str = "copy"
+    # ingest payloads into system_runtime/blobs/sha256/ (verified against the declared sha256) and link from there
+    blob_store_enabled: bool = False
+    # persist the process-wide sha256 cache (stat-keyed) across restarts
+    hash_cache_path: Path | None = None
+    # deliveries.jsonl group commit: always | per_tick | interval_ms (see DeliveryLogWriter)
+    delivery_log_fsync: str = "per_tick"
+    delivery_log_fsync_interval_ms: int = 1000
+    # seal deliveries.jsonl into deliveries.segments/ (with a sidecar index) once it reaches this size; 0 = never
+    delivery_log_segment_bytes: int = 64 * 1024 * 1024
+
+
+class RouterState:
+    """In-memory state the router keeps across ticks (per-plan indexes); rebuilt from disk on restart."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.delivery_indexes: dict[str, DeliveryLogIndex] = {}
+        self.command_indexes: dict[str, CommandSeqIndex] = {}
+        self.delivery_writers: dict[str, DeliveryLogWriter] = {}
+        self.recovered_plans: set[str] = set()
+        self.dags = ActiveDagCache()
+        self._fanout_pool: ThreadPoolExecutor | None = None
+
+    def delivery_index(self, plan_id: str, *, log_path: Path, checkpoint_path: Path) -> DeliveryLogIndex:
+        with self.lock:
+            index = self.delivery_indexes.get(plan_id)
+            if index is None:
+                index = DeliveryLogIndex(log_path, checkpoint_path)
+                self.delivery_indexes[plan_id] = index
+            return index
+
+    def delivery_writer(self, plan_id: str, *, log_path: Path, config: RouterConfig) -> DeliveryLogWriter:
+        with self.lock:
+            writer = self.delivery_writers.get(plan_id)
+            if writer is None:
+                writer = DeliveryLogWriter(
+                    log_path,
+                    fsync_policy=config.delivery_log_fsync,
+                    fsync_interval_ms=config.delivery_log_fsync_interval_ms,
+                    segment_bytes=config.delivery_log_segment_bytes,
+                )
+                self.delivery_writers[plan_id] = writer
+            return writer
+
+    def reset_plan(self, plan_id: str) -> None:
+        """Forget the plan's delivery index and re-arm staged-envelope recovery (after a failed log write)."""
+        with self.lock:
+            self.delivery_indexes.pop(plan_id, None)
+            self.recovered_plans.discard(plan_id)
+
+    def command_index(self, plan_id: str, *, commands_dir: Path, index_path: Path) -> CommandSeqIndex:
+        with self.lock:
+            index = self.command_indexes.get(plan_id)
+            if index is None:
+                index = CommandSeqIndex(commands_dir, index_path)
+                self.command_indexes[plan_id] = index
+            return index
+
+    def fanout_pool(self, max_workers: int) -> ThreadPoolExecutor:
+        # shared by all plan workers; fan-out jobs never submit further work, so this cannot deadlock
+        with self.lock:
+            if self._fanout_pool is None:
+                self._fanout_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="router-fanout")
+            return self._fanout_pool
 
 
 @dataclass(frozen=True)
@@ -35,6 +117,7 @@ class RouterContext:
     system: SystemPaths
     schemas: SchemaRegistry
     config: RouterConfig
+    state: RouterState = field(default_factory=RouterState, compare=False, repr=False)
 
 
 def _alert(ctx: RouterContext, *, plan_id: str, alert_type: str, message: str, details: dict | None = None) -> None:
@@ -82,8 +165,11 @@ def _plan_paths(ctx: RouterContext, plan_id: str) -> dict[str, Path]:
     base = ctx.system.plans / plan_id
     return {
         "base": base,
+        "lock": base / ".router.lock",
         "deliveries": base / "deliveries.jsonl",
+        "deliveries_checkpoint": base / "deliveries.checkpoint.json",
         "commands": base / "commands",
+        "command_index": base / "command_index.json",
         "decisions": base / "decisions",
         "acks": base / "acks",
         "human_requests": base / "human_requests",
@@ -99,78 +185,30 @@ def _load_current_dag(ctx: RouterContext, plan_id: str) -> tuple[Dag, str]:
     paths = _plan_paths(ctx, plan_id)
     if not paths["task_dag"].exists():
         raise DagInvalid(code="DAG_MISSING", message=f"missing task_dag.json for plan {plan_id}")
-    dag_obj = read_json(paths["task_dag"])
-    if ctx.config.schema_validation_enabled:
-        ctx.schemas.validate(dag_obj, "task_dag.schema.json")
-    dag = parse_dag(dag_obj)
-    dag_sha = file_sha256(paths["task_dag"])
-    if paths["active_dag_ref"].exists():
-        ref = read_json(paths["active_dag_ref"])
-        if ctx.config.schema_validation_enabled:
-            ctx.schemas.validate(ref, "active_dag_ref.schema.json")
-        _, ref_sha = parse_active_dag_ref(ref)
-        if ref_sha != dag_sha:
-            raise DagInvalid(code="ACTIVE_DAG_REF_MISMATCH", message=f"{ref_sha} != {dag_sha}")
-    return dag, dag_sha
-
 
-def _discover_agents(agents_root: Path) -> list[str]:
-    if not agents_root.exists():
-        return []
-    return sorted([p.name for p in agents_root.iterdir() if p.is_dir() and not p.name.startswith(".")])
+    def validate(obj: dict) -> None:
+        ctx.schemas.validate(obj, "task_dag.schema.json")
 
+    def validate_ref(obj: dict) -> None:
+        ctx.schemas.validate(obj, "active_dag_ref.schema.json")
 
-def _discover_outbox_envelopes(agent_outbox_plan: Path) -> list[Path]:
-    if not agent_outbox_plan.exists():
-        return []
-    envs = [
-        p
-        for p in agent_outbox_plan.iterdir()
-        if p.is_file() and p.name.endswith(".msg.json") and not p.name.endswith(".tmp")
-    ]
-    return sorted(envs, key=lambda p: p.name)
-
-def _discover_outbox_acks(agent_outbox_plan: Path) -> list[Path]:
-    if not agent_outbox_plan.exists():
-        return []
-    acks = [p for p in agent_outbox_plan.glob("ack_*.json") if p.is_file() and not p.name.endswith(".tmp")]
-    return sorted(acks, key=lambda p: p.name)
-
-
-def _discover_outbox_human_requests(agent_outbox_plan: Path) -> list[Path]:
-    if not agent_outbox_plan.exists():
-        return []
-    reqs = [
-        p
-        for p in agent_outbox_plan.glob("human_intervention_request_*.json")
-        if p.is_file() and not p.name.endswith(".tmp")
-    ]
-    return sorted(reqs, key=lambda p: p.name)
-
-
-def _discover_outbox_human_responses(agent_outbox_plan: Path) -> list[Path]:
-    if not agent_outbox_plan.exists():
-        return []
-    resps = [
-        p
-        for p in agent_outbox_plan.glob("human_intervention_response_*.json")
-        if p.is_file() and not p.name.endswith(".tmp")
-    ]
-    return sorted(resps, key=lambda p: p.name)
-
-
-def _discover_outbox_decision_records(agent_outbox_plan: Path) -> list[Path]:
-    if not agent_outbox_plan.exists():
-        return []
-    items = [p for p in agent_outbox_plan.glob("decision_record_*.json") if p.is_file() and not p.name.endswith(".tmp")]
-    return sorted(items, key=lambda p: p.name)
+    # re-read, hashed and validated only when task_dag.json or active_dag_ref.json changes (stat)
+    enabled = ctx.config.schema_validation_enabled
+    active = ctx.state.dags.load(
+        plan_id,
+        dag_path=paths["task_dag"],
+        ref_path=paths["active_dag_ref"],
+        validate_dag=validate if enabled else None,
+        validate_ref=validate_ref if enabled else None,
+    )
+    dag, dag_sha = active.dag, active.dag_sha
+    if active.ref_sha is not None and active.ref_sha != dag_sha:
+        raise DagInvalid(code="ACTIVE_DAG_REF_MISMATCH", message=f"{active.ref_sha} != {dag_sha}")
+    return dag, dag_sha
 
 
-def _discover_outbox_release_manifests(agent_outbox_plan: Path) -> list[Path]:
-    if not agent_outbox_plan.exists():
-        return []
-    items = [p for p in agent_outbox_plan.glob("release_manifest_*.json") if p.is_file() and not p.name.endswith(".tmp")]
-    return sorted(items, key=lambda p: p.name)
+def _staged(path: Path) -> Path:
+    return path.with_name(path.name + STAGED_SUFFIX)
 
 
 def _safe_relpath(rel: str) -> Path:
@@ -517,8 +555,8 @@ def _deliver_human_provided_file(
     human_gateway_outbox_plan: Path,
     target_agent_id: str,
     file_name: str,
-    log: DeliveryLog,
-    delivered: set[tuple[str, str]],
+    log: DeliveryLogWriter,
+    delivered: DeliveredIndex,
 ) -> None:
     rel = _safe_relpath(file_name)
     src = human_gateway_outbox_plan / rel
@@ -532,7 +570,7 @@ def _deliver_human_provided_file(
 
     sha = file_sha256(src)
     message_id = f"msg_human_{request_id}_{sha.replace('sha256:', '')[:12]}"
-    if any(mid == message_id for mid, _ in delivered):
+    if delivered.has_message_id(message_id):
         return
     envelope_obj: dict[str, Any] = {
         "schema_version": "1.0",
@@ -547,13 +585,13 @@ def _deliver_human_provided_file(
     }
 
     # Dedup for this generated artifact.
-    env_tmp = dst_inbox / f"{message_id}.msg.json.tmp"
     env_path = dst_inbox / f"{message_id}.msg.json"
-    atomic_write_json(env_tmp, envelope_obj)
-    env_tmp.replace(env_path)
-    env_sha = file_sha256(env_path)
+    env_staged = _staged(env_path)
+    atomic_write_json(env_staged, envelope_obj)
+    env_sha = file_sha256(env_staged)
 
-    atomic_copy(src, dst_inbox / rel)
+    atomic_copy(src, dst_inbox / rel, mode=ctx.config.delivery_mode)
+    # the envelope becomes visible only once its DELIVERED entry is written
     log.append(
         _delivery_entry(
             plan_id=plan_id,
@@ -565,9 +603,15 @@ def _deliver_human_provided_file(
             task_id="human_gateway",
             output_name=request_id,
             payload_files=[{"path": rel.as_posix(), "sha256": sha}],
-        )
+        ),
+        publish=[(env_staged, env_path)],
     )
-    delivered.add((message_id, env_sha))
+    delivered.add(message_id, env_sha)
+
+
+def _command_index(ctx: RouterContext, plan_id: str) -> CommandSeqIndex:
+    paths = _plan_paths(ctx, plan_id)
+    return ctx.state.command_index(plan_id, commands_dir=paths["commands"], index_path=paths["command_index"])
 
 
 def _archive_command(ctx: RouterContext, plan_id: str, envelope_path: Path, envelope_obj: dict) -> None:
@@ -575,40 +619,22 @@ def _archive_command(ctx: RouterContext, plan_id: str, envelope_path: Path, enve
     message_id = str(envelope_obj.get("message_id") or envelope_path.stem)
     dst = paths["commands"] / f"{message_id}__{envelope_path.name}"
     dst.parent.mkdir(parents=True, exist_ok=True)
+    index = _command_index(ctx, plan_id)
+    index.refresh()
     if not dst.exists():
         atomic_copy(envelope_path, dst)
+        index.record(dst.name, envelope_obj)
 
 
 def _max_command_seq_in_archive(ctx: RouterContext, plan_id: str, *, task_id: str, dag_sha: str) -> tuple[int | None, dict | None]:
-    paths = _plan_paths(ctx, plan_id)
-    if not paths["commands"].exists():
+    entry = _command_index(ctx, plan_id).get(task_id, dag_sha)
+    if entry is None:
         return None, None
-    max_seq: int | None = None
-    max_meta: dict | None = None
-    for p in paths["commands"].glob("*.msg.json"):
-        try:
-            env = read_json(p)
-        except Exception:
-            continue
-        if env.get("type") != "command":
-            continue
-        cmd = (env.get("payload") or {}).get("command") or {}
-        if str(cmd.get("task_id")) != task_id:
-            continue
-        if str((cmd.get("dag_ref") or {}).get("sha256")) != dag_sha:
-            continue
-        try:
-            seq = int(cmd.get("command_seq"))
-        except Exception:
-            continue
-        if max_seq is None or seq > max_seq:
-            max_seq = seq
-            max_meta = {
-                "message_id": str(env.get("message_id")),
-                "command_id": str(cmd.get("command_id")),
-                "command_seq": seq,
-            }
-    return max_seq, max_meta
+    return entry.max_seq, {
+        "message_id": entry.message_id,
+        "command_id": entry.command_id,
+        "command_seq": entry.max_seq,
+    }
 
 
 def _deliver_one(
@@ -619,13 +645,17 @@ def _deliver_one(
     plan_id: str,
     from_agent_id: str,
     envelope_path: Path,
-    delivered: set[tuple[str, str]],
+    delivered: DeliveredIndex,
+    envelopes: EnvelopeCache | None = None,
+    log: DeliveryLogWriter | None = None,
 ) -> None:
-    paths = _plan_paths(ctx, plan_id)
-    log = DeliveryLog(paths["deliveries"])
-    envelope_sha = file_sha256(envelope_path)
+    if log is None:
+        # standalone call: write (and publish) immediately
+        log = DeliveryLogWriter(_plan_paths(ctx, plan_id)["deliveries"], fsync_policy="always")
+    parsed = (envelopes or EnvelopeCache()).get(envelope_path)
+    envelope_sha = parsed.sha256
     try:
-        env = read_json(envelope_path)
+        env = parsed.require()
     except Exception as e:
         raise EnvelopeInvalid(code="ENVELOPE_PARSE_ERROR", message=str(e)) from e
 
@@ -666,12 +696,11 @@ def _deliver_one(
         )
         return
     # message_id reused with different payload is forbidden
-    for mid, sha in delivered:
-        if mid == message_id and sha != envelope_sha:
-            raise EnvelopeInvalid(
-                code="MESSAGE_ID_REUSED_WITH_DIFFERENT_PAYLOAD",
-                message=f"message_id reused with different envelope sha256: {message_id}",
-            )
+    if delivered.conflicts(message_id, envelope_sha):
+        raise EnvelopeInvalid(
+            code="MESSAGE_ID_REUSED_WITH_DIFFERENT_PAYLOAD",
+            message=f"message_id reused with different envelope sha256: {message_id}",
+        )
 
     if env.get("type") == "command":
         cmd = (env.get("payload") or {}).get("command") or {}
@@ -704,8 +733,9 @@ def _deliver_one(
             raise RoutingNoTarget(code="TARGET_AGENT_NOT_FOUND", message=f"target agent not found: {target}")
         dst_inbox = ctx.agents.agent_inbox(target) / plan_id
         dst_inbox.mkdir(parents=True, exist_ok=True)
-        # deliver envelope file only (commands have no payload files)
-        atomic_copy(envelope_path, dst_inbox / envelope_path.name)
+        # deliver envelope file only (commands have no payload files); published with its log entry
+        staged = _staged(dst_inbox / envelope_path.name)
+        atomic_copy(envelope_path, staged)
         log.append(
             _delivery_entry(
                 plan_id=plan_id,
@@ -716,9 +746,10 @@ def _deliver_one(
                 status="DELIVERED",
                 task_id=task_id,
                 command_id=cmd_id,
-            )
+            ),
+            publish=[(staged, dst_inbox / envelope_path.name)],
         )
-        delivered.add((message_id, envelope_sha))
+        delivered.add(message_id, envelope_sha)
         return
 
     if env.get("type") == "artifact":
@@ -728,22 +759,82 @@ def _deliver_one(
         if not targets:
             raise RoutingNoTarget(code="ROUTING_NO_TARGET", message="deliver_to empty")
 
-        payload_files = (env.get("payload") or {}).get("files") or []
+        # targets before the first missing one are still delivered (then the envelope is deadlettered)
+        ready_targets: list[str] = []
+        missing_target: str | None = None
         for target in targets:
             if not ctx.agents.agent_root(target).exists():
-                raise RoutingNoTarget(code="TARGET_AGENT_NOT_FOUND", message=f"target agent not found: {target}")
+                missing_target = target
+                break
+            ready_targets.append(target)
+        if not ready_targets:
+            raise RoutingNoTarget(code="TARGET_AGENT_NOT_FOUND", message=f"target agent not found: {missing_target}")
+
+        payload_files = (env.get("payload") or {}).get("files") or []
+        payload_rels = [Path(str(f["path"])) for f in payload_files]
+        for rel in payload_rels:
+            if not (envelope_path.parent / rel).exists():
+                raise EnvelopeInvalid(code="MISSING_PAYLOAD", message=f"missing payload file: {rel}")
+
+        # blob store: each payload is read/verified once, then every inbox gets a link to the stored blob
+        blobs = BlobStore(ctx.system.blobs) if ctx.config.blob_store_enabled else None
+        payload_digests: list[str] = []
+        if blobs is not None:
+            for f, rel in zip(payload_files, payload_rels):
+                declared = str(f.get("sha256") or "") or None
+                try:
+                    payload_digests.append(blobs.ingest(envelope_path.parent / rel, declared))
+                except BlobDigestMismatch as e:
+                    raise EnvelopeInvalid(code="PAYLOAD_SHA256_MISMATCH", message=str(e)) from e
+        elif ctx.config.delivery_mode == "link":
+            # inboxes will share the outbox inode: verify the declared sha256 once before linking it anywhere
+            for f, rel in zip(payload_files, payload_rels):
+                declared = str(f.get("sha256") or "")
+                actual = file_sha256(envelope_path.parent / rel)
+                if declared and actual != declared:
+                    raise EnvelopeInvalid(
+                        code="PAYLOAD_SHA256_MISMATCH",
+                        message=f"sha256 mismatch for {rel}: declared {declared}, actual {actual}",
+                    )
+
+        def copy_to(target: str) -> None:
             dst_inbox = ctx.agents.agent_inbox(target) / plan_id
             dst_inbox.mkdir(parents=True, exist_ok=True)
             # payload first
-            for f in payload_files:
-                rel = Path(str(f["path"]))
-                src_payload = envelope_path.parent / rel
-                if not src_payload.exists():
-                    raise EnvelopeInvalid(code="MISSING_PAYLOAD", message=f"missing payload file: {rel}")
-                atomic_copy(src_payload, dst_inbox / rel)
-            # envelope last
-            atomic_copy(envelope_path, dst_inbox / envelope_path.name)
-            log.append(
+            if blobs is not None:
+                for digest, rel in zip(payload_digests, payload_rels):
+                    blobs.materialize(digest, dst_inbox / rel)
+            else:
+                for rel in payload_rels:
+                    atomic_copy(envelope_path.parent / rel, dst_inbox / rel, mode=ctx.config.delivery_mode)
+            # envelope last, staged: it is published together with its DELIVERED entry
+            atomic_copy(envelope_path, _staged(dst_inbox / envelope_path.name))
+
+        errors: list[BaseException | None] = []
+        if len(ready_targets) > 1 and ctx.config.fanout_workers > 1:
+            pool = ctx.state.fanout_pool(ctx.config.fanout_workers)
+            errors = [f.exception() for f in [pool.submit(copy_to, target) for target in ready_targets]]
+        else:
+            for target in ready_targets:
+                try:
+                    copy_to(target)
+                except Exception as e:
+                    errors.append(e)
+                    break
+                errors.append(None)
+
+        entries: list[dict] = []
+        publish: list[tuple[Path, Path]] = []
+        first_error: BaseException | None = None
+        for target, error in zip(ready_targets, errors):
+            final = ctx.agents.agent_inbox(target) / plan_id / envelope_path.name
+            if error is not None:
+                first_error = first_error or error
+                # not logged, so never published
+                _staged(final).unlink(missing_ok=True)
+                continue
+            publish.append((_staged(final), final))
+            entries.append(
                 _delivery_entry(
                     plan_id=plan_id,
                     message_id=message_id,
@@ -756,307 +847,443 @@ def _deliver_one(
                     payload_files=payload_files,
                 )
             )
-        delivered.add((message_id, envelope_sha))
+        log.append_many(entries, publish=publish)
+        if first_error is not None:
+            raise first_error
+        if missing_target is not None:
+            raise RoutingNoTarget(code="TARGET_AGENT_NOT_FOUND", message=f"target agent not found: {missing_target}")
+        delivered.add(message_id, envelope_sha)
         return
 
     raise EnvelopeInvalid(code="UNSUPPORTED_MESSAGE_TYPE", message=str(env.get("type")))
 
 
 def tick(ctx: RouterContext) -> None:
-    agent_ids = _discover_agents(ctx.agents.agents_root)
-    plan_ids: set[str] = set()
-    for agent_id in agent_ids:
-        outbox = ctx.agents.agent_outbox(agent_id)
-        if not outbox.exists():
+    agent_ids = list_subdirs(ctx.agents.agents_root)
+    plans_by_agent = {agent_id: list_subdirs(ctx.agents.agent_outbox(agent_id)) for agent_id in agent_ids}
+    plan_ids = sorted({plan_id for plans in plans_by_agent.values() for plan_id in plans})
+
+    def route(plan_id: str) -> None:
+        # one directory listing per agent/plan; every phase below consumes these snapshots
+        snapshots = [
+            scan_outbox_plan(agent_id, ctx.agents.agent_outbox(agent_id) / plan_id)
+            if plan_id in plans_by_agent[agent_id]
+            else OutboxSnapshot(agent_id=agent_id, plan_dir=ctx.agents.agent_outbox(agent_id) / plan_id)
+            for agent_id in agent_ids
+        ]
+        _route_plan(ctx, plan_id, snapshots)
+
+    try:
+        _route_plans(ctx, plan_ids, route)
+    finally:
+        default_sha256_cache().save()
+
+
+def _route_plans(ctx: RouterContext, plan_ids: list[str], route: Callable[[str], None]) -> None:
+    if ctx.config.max_workers <= 1 or len(plan_ids) <= 1:
+        for plan_id in plan_ids:
+            route(plan_id)
+        return
+    # plans are independent (separate plans/<plan_id>/ state, inbox subdirs and locks); order within a plan is kept
+    workers = min(ctx.config.max_workers, len(plan_ids))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="router") as pool:
+        futures = [pool.submit(route, plan_id) for plan_id in plan_ids]
+    for future in futures:
+        future.result()
+
+
+def _route_plan(ctx: RouterContext, plan_id: str, snapshots: list[OutboxSnapshot]) -> bool:
+    """Route one plan under its lock file; returns False if another router instance holds the plan."""
+    with plan_lock(_plan_paths(ctx, plan_id)["lock"]) as locked:
+        if locked:
+            _route_plan_locked(ctx, plan_id, snapshots)
+    return locked
+
+
+def _route_plan_locked(ctx: RouterContext, plan_id: str, snapshots: list[OutboxSnapshot]) -> None:
+    paths = _plan_paths(ctx, plan_id)
+    paths["base"].mkdir(parents=True, exist_ok=True)
+    log = ctx.state.delivery_writer(plan_id, log_path=paths["deliveries"], config=ctx.config)
+    if log.pending:
+        # entries of a tick whose log write failed: write and publish them before anything reads the log or inboxes
+        log.flush()
+    try:
+        _route_plan_entries(ctx, plan_id, snapshots, log)
+    finally:
+        try:
+            # group commit: one write (+ fsync per policy) for the whole tick, then staged envelopes are published
+            log.flush()
+        finally:
+            if log.pending:
+                # the in-memory dedupe state is now ahead of the log: rebuild it from disk next tick
+                ctx.state.reset_plan(plan_id)
+
+
+def _recover_staged_envelopes(ctx: RouterContext, plan_id: str, delivered: DeliveredIndex) -> None:
+    """
+    Finish what a crashed router left staged in inboxes: envelopes whose DELIVERED entry made it into the log are
+    published, the rest are dropped (their outbox envelope is routed again).
+    """
+    for agent_id in list_subdirs(ctx.agents.agents_root):
+        inbox_plan = ctx.agents.agent_inbox(agent_id) / plan_id
+        if not inbox_plan.is_dir():
             continue
-        for plan_dir in outbox.iterdir():
-            if plan_dir.is_dir() and not plan_dir.name.startswith("."):
-                plan_ids.add(plan_dir.name)
-
-    for plan_id in sorted(plan_ids):
-        paths = _plan_paths(ctx, plan_id)
-        paths["base"].mkdir(parents=True, exist_ok=True)
-        log = DeliveryLog(paths["deliveries"])
-        delivered = delivered_index(log.read_entries())
-
-        # control-plane: human intervention requests/responses (not routed by DAG)
-        paths["human_requests"].mkdir(parents=True, exist_ok=True)
-        paths["human_responses"].mkdir(parents=True, exist_ok=True)
-        paths["decisions"].mkdir(parents=True, exist_ok=True)
-        paths["releases"].mkdir(parents=True, exist_ok=True)
-
-        # Requests: any agent -> agent_human_gateway inbox
-        for from_agent_id in agent_ids:
-            outbox_plan = ctx.agents.agent_outbox(from_agent_id) / plan_id
-            for req_path in _discover_outbox_human_requests(outbox_plan):
-                req = _archive_human_request(ctx, plan_id=plan_id, request_path=req_path)
-                if not req:
-                    continue
-                if not ctx.agents.agent_root("agent_human_gateway").exists():
-                    _alert(
-                        ctx,
-                        plan_id=plan_id,
-                        alert_type="HUMAN_GATEWAY_AGENT_MISSING",
-                        message="agent_human_gateway not found; cannot deliver human requests",
-                        details={"file": req_path.name},
-                    )
-                    continue
-                dst = ctx.agents.agent_inbox("agent_human_gateway") / plan_id / req_path.name
-                if not dst.exists():
-                    atomic_copy(req_path, dst)
-
-        # Responses: agent_human_gateway outbox -> target agent inbox as injected artifact envelopes
-        gw_outbox_plan = ctx.agents.agent_outbox("agent_human_gateway") / plan_id
-        processed_marker_dir = paths["human_responses"] / ".processed"
-        processed_marker_dir.mkdir(parents=True, exist_ok=True)
-        for resp_path in _discover_outbox_human_responses(gw_outbox_plan):
-            resp = _archive_human_response(ctx, plan_id=plan_id, response_path=resp_path)
-            if not resp:
+        for staged in inbox_plan.glob(f"*{STAGED_SUFFIX}"):
+            if not staged.is_file():
                 continue
-            request_id = str(resp.get("request_id") or "")
-            if not request_id:
+            try:
+                message_id = str(read_json(staged)["message_id"])
+                logged = (message_id, file_sha256(staged)) in delivered
+            except Exception:
+                logged = False
+            if logged:
+                staged.replace(staged.with_name(staged.name[: -len(STAGED_SUFFIX)]))
+            else:
+                staged.unlink(missing_ok=True)
+
+
+def _route_plan_entries(ctx: RouterContext, plan_id: str, snapshots: list[OutboxSnapshot], log: DeliveryLogWriter) -> None:
+    paths = _plan_paths(ctx, plan_id)
+    index = ctx.state.delivery_index(
+        plan_id, log_path=paths["deliveries"], checkpoint_path=paths["deliveries_checkpoint"]
+    )
+    index.refresh()
+    delivered = index.delivered
+    if plan_id not in ctx.state.recovered_plans:
+        _recover_staged_envelopes(ctx, plan_id, delivered)
+        ctx.state.recovered_plans.add(plan_id)
+
+    # control-plane: human intervention requests/responses (not routed by DAG)
+    paths["human_requests"].mkdir(parents=True, exist_ok=True)
+    paths["human_responses"].mkdir(parents=True, exist_ok=True)
+    paths["decisions"].mkdir(parents=True, exist_ok=True)
+    paths["releases"].mkdir(parents=True, exist_ok=True)
+
+    # Requests: any agent -> agent_human_gateway inbox
+    for snap in snapshots:
+        for req_path in snap.human_requests:
+            req = _archive_human_request(ctx, plan_id=plan_id, request_path=req_path)
+            if not req:
                 continue
-            marker = processed_marker_dir / f"{request_id}.json"
-            if marker.exists():
+            if not ctx.agents.agent_root("agent_human_gateway").exists():
+                _alert(
+                    ctx,
+                    plan_id=plan_id,
+                    alert_type="HUMAN_GATEWAY_AGENT_MISSING",
+                    message="agent_human_gateway not found; cannot deliver human requests",
+                    details={"file": req_path.name},
+                )
                 continue
+            dst = ctx.agents.agent_inbox("agent_human_gateway") / plan_id / req_path.name
+            if not dst.exists():
+                atomic_copy(req_path, dst)
+
+    # Responses: agent_human_gateway outbox -> target agent inbox as injected artifact envelopes
+    gw_outbox_plan = ctx.agents.agent_outbox("agent_human_gateway") / plan_id
+    gw_snap = next((s for s in snapshots if s.agent_id == "agent_human_gateway"), None)
+    if gw_snap is None:
+        gw_snap = scan_outbox_plan("agent_human_gateway", gw_outbox_plan)
+    processed_marker_dir = paths["human_responses"] / ".processed"
+    processed_marker_dir.mkdir(parents=True, exist_ok=True)
+    for resp_path in gw_snap.human_responses:
+        resp = _archive_human_response(ctx, plan_id=plan_id, response_path=resp_path)
+        if not resp:
+            continue
+        request_id = str(resp.get("request_id") or "")
+        if not request_id:
+            continue
+        marker = processed_marker_dir / f"{request_id}.json"
+        if marker.exists():
+            continue
 
-            decision = str(resp.get("decision") or "")
-            provided_files = resp.get("provided_files") or []
-            if decision != "PROVIDE" or not isinstance(provided_files, list) or not provided_files:
-                atomic_write_json(marker, {"schema_version": "1.0", "plan_id": plan_id, "request_id": request_id, "processed_at": _iso_z(datetime.now(timezone.utc))})
-                continue
+        decision = str(resp.get("decision") or "")
+        provided_files = resp.get("provided_files") or []
+        if decision != "PROVIDE" or not isinstance(provided_files, list) or not provided_files:
+            atomic_write_json(marker, {"schema_version": "1.0", "plan_id": plan_id, "request_id": request_id, "processed_at": _iso_z(datetime.now(timezone.utc))})
+            continue
 
-            ok = True
-            for f in provided_files:
-                if not isinstance(f, dict):
-                    ok = False
-                    break
-                file_name = str(f.get("name") or "")
-                target = str(f.get("deliver_to_agent_id") or "")
-                if not file_name or not target:
-                    ok = False
-                    _deadletter(
-                        ctx,
-                        plan_id=plan_id,
-                        reason_code="HUMAN_RESPONSE_MISSING_DELIVER_TO",
-                        reason="provided_files[] must include name and deliver_to_agent_id",
-                        original_file=resp_path.name,
-                        message_id=None,
-                        producer_agent_id="agent_human_gateway",
-                    )
-                    _alert(
-                        ctx,
-                        plan_id=plan_id,
-                        alert_type="HUMAN_RESPONSE_MISSING_DELIVER_TO",
-                        message="provided_files[] must include name and deliver_to_agent_id",
-                        details={"file": resp_path.name},
-                    )
-                    continue
-                try:
-                    _deliver_human_provided_file(
-                        ctx,
-                        plan_id=plan_id,
-                        request_id=request_id,
-                        human_gateway_outbox_plan=gw_outbox_plan,
-                        target_agent_id=target,
-                        file_name=file_name,
-                        log=log,
-                        delivered=delivered,
-                    )
-                except RouterError as e:
-                    ok = False
-                    _deadletter(
-                        ctx,
-                        plan_id=plan_id,
-                        reason_code=e.code,
-                        reason=str(e),
-                        original_file=resp_path.name,
-                        message_id=None,
-                        producer_agent_id="agent_human_gateway",
-                    )
-                    _alert(ctx, plan_id=plan_id, alert_type=e.code, message=str(e), details={"file": resp_path.name})
-                except Exception as e:
-                    ok = False
-                    _deadletter(
-                        ctx,
-                        plan_id=plan_id,
-                        reason_code="UNHANDLED_EXCEPTION",
-                        reason=str(e),
-                        original_file=resp_path.name,
-                        message_id=None,
-                        producer_agent_id="agent_human_gateway",
-                    )
-                    _alert(
-                        ctx,
-                        plan_id=plan_id,
-                        alert_type="UNHANDLED_EXCEPTION",
-                        message=str(e),
-                        details={"file": resp_path.name},
-                    )
+        ok = True
+        for f in provided_files:
+            if not isinstance(f, dict):
+                ok = False
+                break
+            file_name = str(f.get("name") or "")
+            target = str(f.get("deliver_to_agent_id") or "")
+            if not file_name or not target:
+                ok = False
+                _deadletter(
+                    ctx,
+                    plan_id=plan_id,
+                    reason_code="HUMAN_RESPONSE_MISSING_DELIVER_TO",
+                    reason="provided_files[] must include name and deliver_to_agent_id",
+                    original_file=resp_path.name,
+                    message_id=None,
+                    producer_agent_id="agent_human_gateway",
+                )
+                _alert(
+                    ctx,
+                    plan_id=plan_id,
+                    alert_type="HUMAN_RESPONSE_MISSING_DELIVER_TO",
+                    message="provided_files[] must include name and deliver_to_agent_id",
+                    details={"file": resp_path.name},
+                )
+                continue
+            try:
+                _deliver_human_provided_file(
+                    ctx,
+                    plan_id=plan_id,
+                    request_id=request_id,
+                    human_gateway_outbox_plan=gw_outbox_plan,
+                    target_agent_id=target,
+                    file_name=file_name,
+                    log=log,
+                    delivered=delivered,
+                )
+            except RouterError as e:
+                ok = False
+                _deadletter(
+                    ctx,
+                    plan_id=plan_id,
+                    reason_code=e.code,
+                    reason=str(e),
+                    original_file=resp_path.name,
+                    message_id=None,
+                    producer_agent_id="agent_human_gateway",
+                )
+                _alert(ctx, plan_id=plan_id, alert_type=e.code, message=str(e), details={"file": resp_path.name})
+            except Exception as e:
+                ok = False
+                _deadletter(
+                    ctx,
+                    plan_id=plan_id,
+                    reason_code="UNHANDLED_EXCEPTION",
+                    reason=str(e),
+                    original_file=resp_path.name,
+                    message_id=None,
+                    producer_agent_id="agent_human_gateway",
+                )
+                _alert(
+                    ctx,
+                    plan_id=plan_id,
+                    alert_type="UNHANDLED_EXCEPTION",
+                    message=str(e),
+                    details={"file": resp_path.name},
+                )
 
-            if ok:
-                atomic_write_json(marker, {"schema_version": "1.0", "plan_id": plan_id, "request_id": request_id, "processed_at": _iso_z(datetime.now(timezone.utc))})
-
-        # control-plane: decision records + release manifests (not routed by DAG)
-        for from_agent_id in agent_ids:
-            outbox_plan = ctx.agents.agent_outbox(from_agent_id) / plan_id
-            for decision_path in _discover_outbox_decision_records(outbox_plan):
-                _archive_decision_record(ctx, plan_id=plan_id, decision_path=decision_path)
-            for manifest_path in _discover_outbox_release_manifests(outbox_plan):
-                _archive_release_manifest(ctx, plan_id=plan_id, manifest_path=manifest_path)
-        _refresh_latest_release_manifest(ctx, plan_id=plan_id)
-
-        # archive ACKs (control-plane collection; not routed by DAG)
-        for from_agent_id in agent_ids:
-            outbox_plan = ctx.agents.agent_outbox(from_agent_id) / plan_id
-            for ack in _discover_outbox_acks(outbox_plan):
-                _archive_ack(ctx, plan_id=plan_id, ack_path=ack)
-        try:
-            dag, dag_sha = _load_current_dag(ctx, plan_id)
-        except RouterError as e:
-            _alert(ctx, plan_id=plan_id, alert_type=e.code, message=str(e))
-            continue
+        if ok:
+            # the marker stops retries, so the deliveries above must be committed first
+            log.flush()
+            atomic_write_json(marker, {"schema_version": "1.0", "plan_id": plan_id, "request_id": request_id, "processed_at": _iso_z(datetime.now(timezone.utc))})
+
+    # control-plane: decision records + release manifests (not routed by DAG)
+    for snap in snapshots:
+        for decision_path in snap.decision_records:
+            _archive_decision_record(ctx, plan_id=plan_id, decision_path=decision_path)
+        for manifest_path in snap.release_manifests:
+            _archive_release_manifest(ctx, plan_id=plan_id, manifest_path=manifest_path)
+    _refresh_latest_release_manifest(ctx, plan_id=plan_id)
+
+    # archive ACKs (control-plane collection; not routed by DAG)
+    for snap in snapshots:
+        for ack in snap.acks:
+            _archive_ack(ctx, plan_id=plan_id, ack_path=ack)
+    try:
+        dag, dag_sha = _load_current_dag(ctx, plan_id)
+    except RouterError as e:
+        _alert(ctx, plan_id=plan_id, alert_type=e.code, message=str(e))
+        return
 
-        # Collect command envelopes for supersede comparisons within this tick (same task_id)
-        cmd_candidates: dict[str, tuple[int, Path]] = {}
-        cmd_all: list[tuple[str, int, Path]] = []
-        for from_agent_id in agent_ids:
-            outbox_plan = ctx.agents.agent_outbox(from_agent_id) / plan_id
-            for env_path in _discover_outbox_envelopes(outbox_plan):
-                try:
-                    env = read_json(env_path)
-                except Exception:
-                    continue
-                if env.get("type") != "command":
-                    continue
-                cmd = (env.get("payload") or {}).get("command") or {}
-                if str((cmd.get("dag_ref") or {}).get("sha256")) != dag_sha:
-                    continue
-                try:
+    # Collect command envelopes for supersede comparisons within this tick (same task_id)
+    envelopes = EnvelopeCache()
+    cmd_candidates: dict[str, tuple[int, Path]] = {}
+    cmd_all: list[tuple[str, int, Path]] = []
+    for snap in snapshots:
+        for env_path in snap.envelopes:
+            try:
+                env = envelopes.get(env_path).require()
+            except Exception:
+                continue
+            if env.get("type") != "command":
+                continue
+            cmd = (env.get("payload") or {}).get("command") or {}
+            if str((cmd.get("dag_ref") or {}).get("sha256")) != dag_sha:
+                continue
+            try:
+                task_id = str(cmd.get("task_id"))
+                seq = int(cmd.get("command_seq"))
+            except Exception:
+                continue
+            cmd_all.append((task_id, seq, env_path))
+            cur = cmd_candidates.get(task_id)
+            if cur is None or seq > cur[0]:
+                cmd_candidates[task_id] = (seq, env_path)
+
+    for snap in snapshots:
+        from_agent_id = snap.agent_id
+        for env_path in snap.envelopes:
+            try:
+                parsed = envelopes.get(env_path)
+                env_obj = parsed.require()
+                if env_obj.get("type") == "command":
+                    cmd = (env_obj.get("payload") or {}).get("command") or {}
                     task_id = str(cmd.get("task_id"))
                     seq = int(cmd.get("command_seq"))
-                except Exception:
-                    continue
-                cmd_all.append((task_id, seq, env_path))
-                cur = cmd_candidates.get(task_id)
-                if cur is None or seq > cur[0]:
-                    cmd_candidates[task_id] = (seq, env_path)
-
-        for from_agent_id in agent_ids:
-            outbox_plan = ctx.agents.agent_outbox(from_agent_id) / plan_id
-            for env_path in _discover_outbox_envelopes(outbox_plan):
-                try:
-                    env_obj = read_json(env_path)
-                    if env_obj.get("type") == "command":
-                        cmd = (env_obj.get("payload") or {}).get("command") or {}
-                        task_id = str(cmd.get("task_id"))
-                        seq = int(cmd.get("command_seq"))
-                        best = cmd_candidates.get(task_id)
-                        if best and best[0] > seq:
-                            _archive_command(ctx, plan_id, env_path, env_obj)
-                            # skip early: superseded by newer in same tick
-                            log.append(
-                                _delivery_entry(
-                                    plan_id=plan_id,
-                                    message_id=str(env_obj.get("message_id")),
-                                    envelope_sha=file_sha256(env_path),
-                                    from_agent_id=from_agent_id,
-                                    to_agent_id="*",
-                                    status="SKIPPED_SUPERSEDED",
-                                    skip_reason="SUPERSEDED_BY_NEWER_COMMAND",
-                                    superseded=True,
-                                    superseded_by={
-                                        "message_id": str(read_json(best[1]).get("message_id")),
-                                        "command_id": str(
-                                            ((read_json(best[1]).get("payload") or {}).get("command") or {}).get("command_id")
-                                        ),
-                                        "command_seq": best[0],
-                                    },
-                                    task_id=task_id,
-                                    command_id=str(cmd.get("command_id")),
-                                )
+                    best = cmd_candidates.get(task_id)
+                    if best and best[0] > seq:
+                        best_env = envelopes.get(best[1]).require()
+                        _archive_command(ctx, plan_id, env_path, env_obj)
+                        # skip early: superseded by newer in same tick
+                        log.append(
+                            _delivery_entry(
+                                plan_id=plan_id,
+                                message_id=str(env_obj.get("message_id")),
+                                envelope_sha=parsed.sha256,
+                                from_agent_id=from_agent_id,
+                                to_agent_id="*",
+                                status="SKIPPED_SUPERSEDED",
+                                skip_reason="SUPERSEDED_BY_NEWER_COMMAND",
+                                superseded=True,
+                                superseded_by={
+                                    "message_id": str(best_env.get("message_id")),
+                                    "command_id": str(((best_env.get("payload") or {}).get("command") or {}).get("command_id")),
+                                    "command_seq": best[0],
+                                },
+                                task_id=task_id,
+                                command_id=str(cmd.get("command_id")),
                             )
-                            continue
+                        )
+                        continue
+            except Exception:
+                pass
+
+            try:
+                _deliver_one(
+                    ctx,
+                    dag=dag,
+                    dag_sha=dag_sha,
+                    plan_id=plan_id,
+                    from_agent_id=from_agent_id,
+                    envelope_path=env_path,
+                    delivered=delivered,
+                    envelopes=envelopes,
+                    log=log,
+                )
+            except RouterError as e:
+                # Best-effort extraction for deadletter triage.
+                try:
+                    env_obj = envelopes.get(env_path).require()
+                    message_id = str(env_obj.get("message_id") or env_path.stem)
+                    producer_agent_id = str(env_obj.get("producer_agent_id") or from_agent_id)
                 except Exception:
-                    pass
+                    message_id = env_path.stem
+                    producer_agent_id = from_agent_id
 
-                try:
-                    _deliver_one(
-                        ctx,
-                        dag=dag,
-                        dag_sha=dag_sha,
-                        plan_id=plan_id,
-                        from_agent_id=from_agent_id,
-                        envelope_path=env_path,
-                        delivered=delivered,
-                    )
-                except RouterError as e:
-                    # Best-effort extraction for deadletter triage.
-                    try:
-                        env_obj = read_json(env_path)
-                        message_id = str(env_obj.get("message_id") or env_path.stem)
-                        producer_agent_id = str(env_obj.get("producer_agent_id") or from_agent_id)
-                    except Exception:
-                        message_id = env_path.stem
-                        producer_agent_id = from_agent_id
-
-                    _deadletter(
-                        ctx,
+                _deadletter(
+                    ctx,
+                    plan_id=plan_id,
+                    reason_code=e.code,
+                    reason=str(e),
+                    original_file=env_path.name,
+                    message_id=message_id,
+                    producer_agent_id=producer_agent_id,
+                )
+                _alert(ctx, plan_id=plan_id, alert_type=e.code, message=str(e), details={"file": env_path.name})
+
+                # Write a delivery log record for traceability even when deadlettered.
+                log.append(
+                    _delivery_entry(
                         plan_id=plan_id,
-                        reason_code=e.code,
-                        reason=str(e),
-                        original_file=env_path.name,
                         message_id=message_id,
-                        producer_agent_id=producer_agent_id,
-                    )
-                    _alert(ctx, plan_id=plan_id, alert_type=e.code, message=str(e), details={"file": env_path.name})
-
-                    # Write a delivery log record for traceability even when deadlettered.
-                    log.append(
-                        _delivery_entry(
-                            plan_id=plan_id,
-                            message_id=message_id,
-                            envelope_sha=file_sha256(env_path),
-                            from_agent_id=from_agent_id,
-                            to_agent_id="*",
-                            status="DEADLETTERED",
-                            skip_reason=None,
-                            task_id=None,
-                            command_id=None,
-                            output_name=None,
-                            error={"code": e.code, "message": str(e), "file": env_path.name},
-                        )
-                    )
-                except Exception as e:
-                    _deadletter(
-                        ctx,
-                        plan_id=plan_id,
-                        reason_code="UNHANDLED_EXCEPTION",
-                        reason=str(e),
-                        original_file=env_path.name,
-                        message_id=env_path.stem,
-                        producer_agent_id=from_agent_id,
-                    )
-                    _alert(
-                        ctx,
-                        plan_id=plan_id,
-                        alert_type="UNHANDLED_EXCEPTION",
-                        message=str(e),
-                        details={"file": env_path.name},
+                        envelope_sha=envelopes.get(env_path).sha256,
+                        from_agent_id=from_agent_id,
+                        to_agent_id="*",
+                        status="DEADLETTERED",
+                        skip_reason=None,
+                        task_id=None,
+                        command_id=None,
+                        output_name=None,
+                        error={"code": e.code, "message": str(e), "file": env_path.name},
                     )
+                )
+            except Exception as e:
+                _deadletter(
+                    ctx,
+                    plan_id=plan_id,
+                    reason_code="UNHANDLED_EXCEPTION",
+                    reason=str(e),
+                    original_file=env_path.name,
+                    message_id=env_path.stem,
+                    producer_agent_id=from_agent_id,
+                )
+                _alert(
+                    ctx,
+                    plan_id=plan_id,
+                    alert_type="UNHANDLED_EXCEPTION",
+                    message=str(e),
+                    details={"file": env_path.name},
+                )
+
+
+def route_agents(ctx: RouterContext, plan_id: str, agent_ids: Iterable[str]) -> None:
+    """Route one plan looking only at the given agents' outboxes (event mode)."""
+    snapshots = [
+        scan_outbox_plan(agent_id, ctx.agents.agent_outbox(agent_id) / plan_id) for agent_id in sorted(set(agent_ids))
+    ]
+    _route_plan(ctx, plan_id, snapshots)
 
 
 def run_once(ctx: RouterContext) -> None:
     tick(ctx)
 
 
-def run_forever(*, agents_root: Path, system_runtime: Path, schemas_base_dir: Path) -> None:
+def event_step(
+    ctx: RouterContext, watcher: OutboxWatcher, *, timeout_seconds: float | None
+) -> dict[str, set[str]] | None:
+    """
+    Wait for outbox events and route only the affected plan/agents. Returns what was routed, or None when
+    events were lost (queue overflow) and a full tick ran instead.
+    """
+    dirty = watcher.wait(timeout_seconds)
+    if dirty is None:
+        watcher.sync()
+        tick(ctx)
+        return None
+    for plan_id in sorted(dirty):
+        route_agents(ctx, plan_id, dirty[plan_id])
+    default_sha256_cache().save()
+    return dirty
+
+
+def run_event_loop(ctx: RouterContext) -> None:
+    with OutboxWatcher(ctx.agents) as watcher:
+        last_full = 0.0
+        while True:
+            remaining = ctx.config.full_tick_interval_seconds - (time.monotonic() - last_full)
+            if last_full == 0.0 or remaining <= 0:
+                # watches first, so files landing during the full tick still produce events
+                watcher.sync()
+                tick(ctx)
+                last_full = time.monotonic()
+                continue
+            if event_step(ctx, watcher, timeout_seconds=remaining) is None:
+                last_full = time.monotonic()
+
+
+def run_forever(
+    *, agents_root: Path, system_runtime: Path, schemas_base_dir: Path, config: RouterConfig | None = None
+) -> None:
     ctx = RouterContext(
         agents=AgentsPaths(agents_root=agents_root),
         system=SystemPaths(system_runtime=system_runtime),
         schemas=SchemaRegistry(schemas_base_dir=schemas_base_dir),
-        config=RouterConfig(),
+        config=config or RouterConfig(),
     )
+    if ctx.config.hash_cache_path is not None:
+        set_default_sha256_cache(Sha256Cache(persist_path=ctx.config.hash_cache_path))
+    if ctx.config.event_mode and inotify_available():
+        run_event_loop(ctx)
+        return
+    # polling (default, and the fallback where inotify is unavailable)
     while True:
         tick(ctx)
         time.sleep(ctx.config.poll_interval_seconds)
@@ -1,59 +1,143 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any
+import heapq
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from hashlib import sha256
+from pathlib import Path
+from typing import Any, Callable
+
+from agenttalk.heartbeat.hashing import RACY_WINDOW_NS, file_sha256
 
 from .errors import DagInvalid
 
 
 @dataclass(frozen=True)
 class Dag:
+    """
+    Compiled, read-only view of a task_dag.json. Lookup tables are built once by `parse_dag` (first
+    occurrence wins, matching the former linear scans); node dicts are shared and must not be mutated.
+    """
+
     raw: dict
+    _nodes: tuple[dict, ...] = field(default=(), repr=False, compare=False)
+    _by_task: dict[str, dict] = field(default_factory=dict, repr=False, compare=False)
+    _assignee: dict[str, str] = field(default_factory=dict, repr=False, compare=False)
+    _deliver_to: dict[tuple[str, str], tuple[str, ...]] = field(default_factory=dict, repr=False, compare=False)
+    _topo_order: tuple[int, ...] = field(default=(), repr=False, compare=False)
+    _dependency_ids: tuple[tuple[str, ...], ...] = field(default=(), repr=False, compare=False)
+    _dependents: dict[str, tuple[int, ...]] = field(default_factory=dict, repr=False, compare=False)
 
     @property
     def plan_id(self) -> str:
         return str(self.raw["plan_id"])
 
     @property
-    def nodes(self) -> list[dict]:
-        return list(self.raw.get("nodes") or [])
+    def nodes(self) -> tuple[dict, ...]:
+        return self._nodes
+
+    @property
+    def topo_order(self) -> tuple[int, ...]:
+        """Indexes into `nodes`, dependencies (`depends_on`) before dependents; cycle members last, in file order."""
+        return self._topo_order
+
+    def dependency_ids(self, index: int) -> tuple[str, ...]:
+        """Distinct `depends_on` task_ids of `nodes[index]`, in file order (unknown task_ids included)."""
+        return self._dependency_ids[index]
+
+    def dependents_of(self, task_id: str) -> tuple[int, ...]:
+        """Indexes of the nodes listing `task_id` in `depends_on` (the successor edges of that task)."""
+        return self._dependents.get(task_id, ())
 
     def node_by_task_id(self, task_id: str) -> dict | None:
-        for n in self.nodes:
-            if str(n.get("task_id")) == task_id:
-                return n
-        return None
+        return self._by_task.get(task_id)
 
     def assigned_agent_for_task(self, task_id: str) -> str:
-        node = self.node_by_task_id(task_id)
-        if not node:
+        if task_id not in self._by_task:
             raise DagInvalid(code="DAG_TASK_NOT_FOUND", message=f"task_id not found in DAG: {task_id}")
-        agent_id = node.get("assigned_agent_id")
+        agent_id = self._assignee.get(task_id)
         if not agent_id:
             raise DagInvalid(code="DAG_TASK_NO_ASSIGNEE", message=f"task_id has no assigned_agent_id: {task_id}")
-        return str(agent_id)
+        return agent_id
 
     def deliver_to_for_output(self, task_id: str, output_name: str) -> list[str]:
-        node = self.node_by_task_id(task_id)
-        if not node:
+        if task_id not in self._by_task:
             raise DagInvalid(code="DAG_TASK_NOT_FOUND", message=f"task_id not found in DAG: {task_id}")
-        outputs = node.get("outputs") or []
-        for o in outputs:
-            if str(o.get("name")) == output_name:
-                dt = o.get("deliver_to") or []
-                return [str(x) for x in dt]
-        raise DagInvalid(
-            code="DAG_OUTPUT_NOT_FOUND",
-            message=f"output not found in DAG: task_id={task_id} output_name={output_name}",
-        )
+        targets = self._deliver_to.get((task_id, output_name))
+        if targets is None:
+            raise DagInvalid(
+                code="DAG_OUTPUT_NOT_FOUND",
+                message=f"output not found in DAG: task_id={task_id} output_name={output_name}",
+            )
+        return list(targets)
 
 
-def parse_dag(obj: dict) -> Dag:
-    if str(obj.get("schema_version")) != "1.1":
+def parse_dag(obj: dict, *, strict: bool = True) -> Dag:
+    """`strict=False` skips the schema_version and plan_id/nodes checks (the monitor reports any DAG it can read)."""
+    if strict and str(obj.get("schema_version")) != "1.1":
         raise DagInvalid(code="DAG_SCHEMA_VERSION_UNSUPPORTED", message=str(obj.get("schema_version")))
-    if "plan_id" not in obj or "nodes" not in obj:
+    if strict and ("plan_id" not in obj or "nodes" not in obj):
         raise DagInvalid(code="DAG_INVALID", message="missing plan_id/nodes")
-    return Dag(raw=obj)
+    nodes = tuple(obj.get("nodes") or [])
+    by_task: dict[str, dict] = {}
+    assignee: dict[str, str] = {}
+    deliver_to: dict[tuple[str, str], tuple[str, ...]] = {}
+    for node in nodes:
+        task_id = str(node.get("task_id"))
+        if task_id in by_task:
+            continue
+        by_task[task_id] = node
+        if node.get("assigned_agent_id"):
+            assignee[task_id] = str(node["assigned_agent_id"])
+        for o in node.get("outputs") or []:
+            deliver_to.setdefault((task_id, str(o.get("name"))), tuple(str(x) for x in o.get("deliver_to") or []))
+    dependency_ids = tuple(tuple(dict.fromkeys(str(x) for x in (node.get("depends_on") or []))) for node in nodes)
+    dependents: dict[str, list[int]] = {}
+    for i, deps in enumerate(dependency_ids):
+        for dep in deps:
+            dependents.setdefault(dep, []).append(i)
+    return Dag(
+        raw=obj,
+        _nodes=nodes,
+        _by_task=by_task,
+        _assignee=assignee,
+        _deliver_to=deliver_to,
+        _topo_order=_topological_order(nodes),
+        _dependency_ids=dependency_ids,
+        _dependents={k: tuple(v) for k, v in dependents.items()},
+    )
+
+
+def _topological_order(nodes: tuple[dict, ...]) -> tuple[int, ...]:
+    # Kahn's algorithm over node indexes, ties broken by file order; unknown dependencies are ignored.
+    indexes_by_task: dict[str, list[int]] = {}
+    for i, node in enumerate(nodes):
+        indexes_by_task.setdefault(str(node.get("task_id")), []).append(i)
+    dependents: list[list[int]] = [[] for _ in nodes]
+    indegree = [0] * len(nodes)
+    for i, node in enumerate(nodes):
+        for dep in {str(x) for x in (node.get("depends_on") or [])}:
+            for j in indexes_by_task.get(dep, ()):
+                if j != i:
+                    dependents[j].append(i)
+                    indegree[i] += 1
+    ready = [i for i in range(len(nodes)) if indegree[i] == 0]
+    heapq.heapify(ready)
+    order: list[int] = []
+    while ready:
+        i = heapq.heappop(ready)
+        order.append(i)
+        for k in dependents[i]:
+            indegree[k] -= 1
+            if indegree[k] == 0:
+                heapq.heappush(ready, k)
+    if len(order) < len(nodes):
+        placed = set(order)
+        order.extend(i for i in range(len(nodes)) if i not in placed)
+    return tuple(order)
 
 
 def parse_active_dag_ref(obj: dict) -> tuple[str, str]:
@@ -64,3 +148,118 @@ def parse_active_dag_ref(obj: dict) -> tuple[str, str]:
     except Exception as e:
         raise DagInvalid(code="ACTIVE_DAG_REF_INVALID", message=str(e)) from e
 
+
+class DagCache:
+    """
+    Compiled DAGs keyed by the sha256 of task_dag.json (plus whether it was schema-validated and strictly parsed).
+    Entries are content-addressed, so they never go stale; an unchanged file costs one stat (via the sha256 cache).
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[tuple[str, bool, bool], Dag] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def load(
+        self, path: Path, *, validate: Callable[[dict], Any] | None = None, strict: bool = True
+    ) -> tuple[Dag, str]:
+        digest = file_sha256(path)
+        key = (digest, validate is not None, strict)
+        with self.lock:
+            dag = self.entries.get(key)
+            if dag is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return dag, digest
+            self.misses += 1
+        # hash the exact bytes that get parsed, so the cached DAG always matches its key
+        data = path.read_bytes()
+        digest = "sha256:" + sha256(data).hexdigest()
+        obj = json.loads(data.decode("utf-8"))
+        if validate is not None:
+            validate(obj)
+        dag = parse_dag(obj, strict=strict)
+        with self.lock:
+            self.entries[(digest, validate is not None, strict)] = dag
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return dag, digest
+
+
+_DAG_CACHE = DagCache()
+
+
+def load_dag(
+    path: Path, *, validate: Callable[[dict], Any] | None = None, strict: bool = True
+) -> tuple[Dag, str]:
+    """Compiled DAG and sha256 of `path`, shared by router and monitor in one process."""
+    return _DAG_CACHE.load(path, validate=validate, strict=strict)
+
+
+@dataclass(frozen=True)
+class ActiveDag:
+    dag: Dag
+    dag_sha: str
+    # task_dag_sha256 from active_dag_ref.json; None when the pointer file is absent
+    ref_sha: str | None
+
+
+def _stat_key(path: Path) -> tuple[int, int, int, int] | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class ActiveDagCache:
+    """
+    Per-plan cache of (task_dag.json, active_dag_ref.json), invalidated by a stat change of either file.
+    While both are unchanged a tick costs two stats: no read, hash or schema validation. Failures are not
+    cached, and a cached ref/dag sha mismatch is handed back every time so callers keep raising on it.
+    `strict=False` parses the DAG leniently (see `parse_dag`) and takes the ref's task_dag_sha256 as is, so a
+    missing one reads as "None" and surfaces as a sha mismatch instead of ACTIVE_DAG_REF_INVALID.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.entries: dict[str, tuple[tuple[Any, ...], ActiveDag]] = {}
+
+    def load(
+        self,
+        plan_id: str,
+        *,
+        dag_path: Path,
+        ref_path: Path,
+        validate_dag: Callable[[dict], Any] | None = None,
+        validate_ref: Callable[[dict], Any] | None = None,
+        strict: bool = True,
+    ) -> ActiveDag:
+        key = (_stat_key(dag_path), _stat_key(ref_path), validate_dag is not None, validate_ref is not None, strict)
+        with self.lock:
+            cached = self.entries.get(plan_id)
+        if cached is not None and cached[0] == key and key[0] is not None:
+            return cached[1]
+
+        dag, dag_sha = load_dag(dag_path, validate=validate_dag, strict=strict)
+        ref_sha: str | None = None
+        if key[1] is not None:
+            ref = json.loads(ref_path.read_text(encoding="utf-8"))
+            if validate_ref is not None:
+                validate_ref(ref)
+            ref_sha = parse_active_dag_ref(ref)[1] if strict else str(ref.get("task_dag_sha256"))
+        active = ActiveDag(dag=dag, dag_sha=dag_sha, ref_sha=ref_sha)
+
+        # cache only if neither file moved underneath us and neither is "racily" fresh (see hashing)
+        now_ns = time.time_ns()
+        stable = (_stat_key(dag_path), _stat_key(ref_path)) == key[:2] and all(
+            k is None or now_ns - k[3] >= RACY_WINDOW_NS for k in key[:2]
+        )
+        with self.lock:
+            if stable:
+                self.entries[plan_id] = (key, active)
+            else:
+                self.entries.pop(plan_id, None)
+        return active
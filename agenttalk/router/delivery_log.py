@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 import json
+import os
+import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
-from .io import atomic_write_bytes
+from agenttalk.heartbeat.jsonl import iter_jsonl, iter_lines, parse_jsonl_line
+
+from .delivery_segments import iter_log_files, log_segments, rotate_segment, sealed_segments
+from .io import atomic_write_bytes, fsync_dir
 
 
 @dataclass(frozen=True)
@@ -13,36 +18,401 @@ class DeliveryLog:
     path: Path
 
     def append(self, entry: dict) -> None:
+        self.append_many([entry])
+
+    def append_many(self, entries: list[dict]) -> None:
+        """Append entries in order with a single write."""
+        if not entries:
+            return
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode("utf-8")
         if not self.path.exists():
-            atomic_write_bytes(self.path, line.encode("utf-8"))
+            atomic_write_bytes(self.path, data)
             return
         with self.path.open("ab") as f:
-            f.write(line.encode("utf-8"))
+            f.write(data)
+
+    def iter_entries(self) -> Iterator[dict]:
+        """Entries of all sealed segments, then of the active file, parsed lazily in chunks."""
+        for path in iter_log_files(self.path):
+            yield from iter_jsonl(path)
 
     def read_entries(self) -> list[dict]:
-        if not self.path.exists():
-            return []
-        entries: list[dict] = []
-        for line in self.path.read_text(encoding="utf-8").splitlines():
-            if not line.strip():
-                continue
-            try:
-                entries.append(json.loads(line))
-            except Exception:
-                continue
-        return entries
-
-
-def delivered_index(entries: list[dict]) -> set[tuple[str, str]]:
-    idx: set[tuple[str, str]] = set()
+        return list(self.iter_entries())
+
+
+DELIVERY_LOG_FSYNC_POLICIES = ("always", "per_tick", "interval_ms")
+
+# inbox envelopes are staged under this suffix (invisible to `*.msg.json` scans) until their log entries are written
+STAGED_SUFFIX = ".staged"
+
+
+class DeliveryLogWriter:
+    """
+    Group-commit writer for deliveries.jsonl.
+
+    Entries appended during a plan tick are buffered and written by `flush()` with a single write and, depending
+    on `fsync_policy`, a single fsync: "always" (no buffering, write + fsync per append), "per_tick" (fsync every
+    flush) or "interval_ms" (fsync at most every `fsync_interval_ms`; a process crash loses nothing, a power loss
+    may lose the last interval). Staged inbox envelopes passed as `publish=[(staged, final), ...]` are renamed into
+    place only after the entries that describe them were written and fsynced, so an envelope never becomes visible in
+    an inbox without its DELIVERED line, even after a power loss; with "interval_ms" they wait for the next flush that
+    fsyncs. A failed write (ENOSPC, EIO) keeps everything buffered for the next `flush()`.
+
+    With `segment_bytes` > 0, a flush that leaves the active file at or above that size seals it into
+    deliveries.segments/ with a sidecar index (see delivery_segments.rotate_segment).
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        fsync_policy: str = "per_tick",
+        fsync_interval_ms: int = 1000,
+        segment_bytes: int = 0,
+    ):
+        if fsync_policy not in DELIVERY_LOG_FSYNC_POLICIES:
+            raise ValueError(f"unknown fsync policy: {fsync_policy!r} (expected one of {DELIVERY_LOG_FSYNC_POLICIES})")
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.fsync_interval_ms = fsync_interval_ms
+        self.segment_bytes = segment_bytes
+        self.entries: list[dict] = []
+        self.publish: list[tuple[Path, Path]] = []
+        self.flushes = 0
+        self.fsyncs = 0
+        self.rotations = 0
+        self._last_fsync = float("-inf")
+        # whether everything written so far has been fsynced
+        self._synced = True
+
+    def append(self, entry: dict, *, publish: Iterable[tuple[Path, Path]] = ()) -> None:
+        self.append_many([entry], publish=publish)
+
+    def append_many(self, entries: list[dict], *, publish: Iterable[tuple[Path, Path]] = ()) -> None:
+        self.entries.extend(entries)
+        self.publish.extend(publish)
+        if self.fsync_policy == "always":
+            self.flush()
+
+    @property
+    def pending(self) -> bool:
+        """Entries not written yet (a previous write failed); staged envelopes waiting for an fsync do not count."""
+        return bool(self.entries)
+
+    def flush(self) -> None:
+        size = 0
+        if self.entries:
+            data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in self.entries).encode("utf-8")
+            size = self._write(data)
+            # cleared only once written: a failed write is retried by the next flush
+            self.entries = []
+            self.flushes += 1
+        elif self.publish and not self._synced and self._want_fsync():
+            self._sync()
+        rotate = self.segment_bytes > 0 and size >= self.segment_bytes
+        if rotate and not self._synced:
+            # the sealed segment keeps no writer handle: make it durable before it leaves the active path
+            self._sync()
+        if self._synced:
+            while self.publish:
+                staged, final = self.publish[0]
+                staged.replace(final)
+                del self.publish[0]
+        if rotate:
+            rotate_segment(self.path)
+            self.rotations += 1
+
+    def _want_fsync(self) -> bool:
+        if self.fsync_policy != "interval_ms":
+            return True
+        return (time.monotonic() - self._last_fsync) * 1000 >= self.fsync_interval_ms
+
+    def _write(self, data: bytes) -> int:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        created = not self.path.exists()
+        with self.path.open("a+b") as f:
+            if f.tell() > 0:
+                # a crash mid-append can leave a torn last line; never glue new entries onto it
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data
+            f.write(data)
+            f.flush()
+            self._synced = False
+            if self._want_fsync():
+                self._fsync(f.fileno())
+            if created:
+                # the new file's directory entry must be durable before anything it describes is published
+                fsync_dir(self.path.parent)
+            return f.tell()
+
+    def _sync(self) -> None:
+        with self.path.open("rb") as f:
+            self._fsync(f.fileno())
+
+    def _fsync(self, fd: int) -> None:
+        os.fsync(fd)
+        self._last_fsync = time.monotonic()
+        self.fsyncs += 1
+        self._synced = True
+
+
+class DeliveredIndex:
+    """DELIVERED envelope sha256s keyed by message_id, so duplicate and reuse checks are O(1)."""
+
+    def __init__(self) -> None:
+        self.shas_by_message_id: dict[str, set[str]] = {}
+
+    def add(self, message_id: str, envelope_sha: str) -> None:
+        shas = self.shas_by_message_id.get(message_id)
+        if shas is None:
+            self.shas_by_message_id[message_id] = {envelope_sha}
+        else:
+            shas.add(envelope_sha)
+
+    def has_message_id(self, message_id: str) -> bool:
+        return message_id in self.shas_by_message_id
+
+    def conflicts(self, message_id: str, envelope_sha: str) -> bool:
+        """True when message_id was delivered with a different envelope sha256 (and never with this one)."""
+        shas = self.shas_by_message_id.get(message_id)
+        return bool(shas) and envelope_sha not in shas
+
+    def __contains__(self, item: object) -> bool:
+        if not isinstance(item, tuple) or len(item) != 2:
+            return False
+        shas = self.shas_by_message_id.get(item[0])
+        return shas is not None and item[1] in shas
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        for mid, shas in self.shas_by_message_id.items():
+            for sha in shas:
+                yield mid, sha
+
+    def __len__(self) -> int:
+        return sum(len(shas) for shas in self.shas_by_message_id.values())
+
+
+def delivered_index(entries: Iterable[dict]) -> DeliveredIndex:
+    """Fold an entry stream (e.g. `DeliveryLog.iter_entries()`) without materializing it."""
+    idx = DeliveredIndex()
     for e in entries:
         if e.get("status") != "DELIVERED":
             continue
         mid = e.get("message_id")
         sha = e.get("envelope_sha256")
         if isinstance(mid, str) and isinstance(sha, str):
-            idx.add((mid, sha))
+            idx.add(mid, sha)
     return idx
 
+
+_FINGERPRINT_BYTES = 64
+
+
+class DeliveryLogIndex:
+    """
+    Incremental `DeliveredIndex` over the DELIVERED entries of deliveries.jsonl (sealed segments, then the active file).
+
+    The index remembers how many sealed segments it has folded plus the inode and byte offset it has parsed up to in
+    the current file; `refresh()` only parses lines appended since. A rotation keeps the inode, so the segment being
+    read is finished from the saved offset before newer ones are folded. A short fingerprint of the bytes before the
+    offset detects in-place rewrites; an unknown inode, a shrink or a vanished segment triggers a full rescan.
+    `save_checkpoint()` persists the state so a restarted router resumes from the recorded offset instead of
+    re-reading the whole log. A checkpoint rewrites the whole delivered map, so `refresh()` saves one only after the
+    log grew by `checkpoint_every_bytes` and by `checkpoint_growth` times the log size the last checkpoint covered;
+    the checkpoints written stay linear in the log size instead of quadratic.
+    """
+
+    def __init__(
+        self,
+        log_path: Path,
+        checkpoint_path: Path | None = None,
+        *,
+        checkpoint_every_bytes: int = 1024 * 1024,
+        checkpoint_growth: float = 0.25,
+    ):
+        self.log_path = log_path
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every_bytes = checkpoint_every_bytes
+        self.checkpoint_growth = checkpoint_growth
+        self.delivered = DeliveredIndex()
+        self.sealed_count = 0
+        self.inode: int | None = None
+        self.offset = 0
+        self.fingerprint = ""
+        self.lines_parsed = 0
+        self.checkpoints_saved = 0
+        self._log_bytes = 0  # bytes of the log folded into `delivered`
+        self._saved_log_bytes = 0
+        self._unsaved_bytes = 0
+        self._checkpoint_checked = False
+
+    def _reset(self) -> None:
+        self.delivered = DeliveredIndex()
+        self.sealed_count = 0
+        self.inode = None
+        self.offset = 0
+        self.fingerprint = ""
+        self._log_bytes = 0
+        self._saved_log_bytes = 0
+
+    def _fold(self, entry: dict) -> None:
+        if entry.get("status") != "DELIVERED":
+            return
+        mid = entry.get("message_id")
+        sha = entry.get("envelope_sha256")
+        if isinstance(mid, str) and isinstance(sha, str):
+            self.delivered.add(mid, sha)
+
+    @staticmethod
+    def _read_fingerprint(f: Any, offset: int) -> str:
+        start = max(0, offset - _FINGERPRINT_BYTES)
+        f.seek(start)
+        return f.read(offset - start).hex()
+
+    def refresh(self) -> None:
+        if not self._checkpoint_checked:
+            self._checkpoint_checked = True
+            self.load_checkpoint()
+        sealed, active = log_segments(self.log_path)
+        if not self._advance(sealed, active is not None):
+            self._reset()
+            self._advance(sealed, active is not None)
+        if self.checkpoint_path is not None and self._unsaved_bytes >= max(
+            self.checkpoint_every_bytes, self._saved_log_bytes * self.checkpoint_growth
+        ):
+            self.save_checkpoint()
+
+    def seek_end(self) -> None:
+        """Start from the current end of the log without parsing it (for tails that only want new entries)."""
+        self._checkpoint_checked = True
+        sealed, active = log_segments(self.log_path)
+        self._reset()
+        self.sealed_count = len(sealed)
+        if active is None:
+            return
+        try:
+            f = self.log_path.open("rb")
+        except FileNotFoundError:
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            # stop at the last complete line; a line being appended is read by the next refresh
+            offset = st.st_size
+            while offset > 0:
+                start = max(0, offset - _FINGERPRINT_BYTES)
+                f.seek(start)
+                end = f.read(offset - start).rfind(b"\n")
+                if end >= 0:
+                    offset = start + end + 1
+                    break
+                offset = start
+            self.inode = st.st_ino
+            self.offset = offset
+            self.fingerprint = self._read_fingerprint(f, offset)
+
+    def _advance(self, sealed: list[Path], active_exists: bool) -> bool:
+        if len(sealed) < self.sealed_count:
+            return False
+        for path in sealed[self.sealed_count :]:
+            if not self._consume(path):
+                return False
+            self.sealed_count += 1
+            self.inode, self.offset, self.fingerprint = None, 0, ""
+        if not active_exists:
+            return self.inode is None
+        return self._consume(self.log_path)
+
+    def _consume(self, path: Path) -> bool:
+        """Parse `path` from the saved offset; False when it is not the file the saved state belongs to."""
+        try:
+            f = path.open("rb")
+        except FileNotFoundError:
+            return self.inode is None
+        with f:
+            st = os.fstat(f.fileno())
+            if self.inode is None:
+                self.inode = st.st_ino
+            elif (
+                st.st_ino != self.inode
+                or st.st_size < self.offset
+                or self._read_fingerprint(f, self.offset) != self.fingerprint
+            ):
+                return False
+            if st.st_size == self.offset:
+                return True
+            for pos, line in iter_lines(f, self.offset):
+                end = pos + len(line) + 1
+                self._unsaved_bytes += end - self.offset
+                self._log_bytes += end - self.offset
+                self.offset = end
+                entry = parse_jsonl_line(line)
+                if entry is None:
+                    continue
+                try:
+                    self._fold(entry)
+                except Exception:
+                    continue
+                self.lines_parsed += 1
+            # a trailing partial line (writer mid-append) is picked up on the next refresh
+            self.fingerprint = self._read_fingerprint(f, self.offset)
+        return True
+
+    def load_checkpoint(self) -> bool:
+        if self.checkpoint_path is None or not self.checkpoint_path.exists():
+            return False
+        try:
+            obj = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+            sealed_count = int(obj.get("sealed_count", 0))
+            inode = None if obj["inode"] is None else int(obj["inode"])
+            offset = int(obj["offset"])
+            fingerprint = str(obj["fingerprint"])
+            delivered = obj["delivered"]
+            log_bytes = int(obj.get("log_bytes", 0))
+            sealed = sealed_segments(self.log_path)
+            if len(sealed) < sealed_count:
+                return False
+            # the file the checkpoint was reading may have been sealed since; it keeps its inode
+            current = sealed[sealed_count] if len(sealed) > sealed_count else self.log_path
+            if inode is None:
+                if offset:
+                    return False
+            else:
+                st = current.stat()
+                if st.st_ino != inode or st.st_size < offset:
+                    return False
+                with current.open("rb") as f:
+                    if self._read_fingerprint(f, offset) != fingerprint:
+                        return False
+        except Exception:
+            return False
+        self._reset()
+        for mid, shas in delivered.items():
+            for sha in shas:
+                self.delivered.add(str(mid), str(sha))
+        self.sealed_count = sealed_count
+        self.inode = inode
+        self.offset = offset
+        self.fingerprint = fingerprint
+        self._log_bytes = self._saved_log_bytes = log_bytes
+        self._unsaved_bytes = 0
+        return True
+
+    def save_checkpoint(self) -> None:
+        if self.checkpoint_path is None or (self.inode is None and not self.sealed_count):
+            return
+        delivered = {mid: sorted(shas) for mid, shas in self.delivered.shas_by_message_id.items()}
+        obj = {
+            "schema_version": "1.0",
+            "sealed_count": self.sealed_count,
+            "inode": self.inode,
+            "offset": self.offset,
+            "fingerprint": self.fingerprint,
+            "log_bytes": self._log_bytes,
+            "delivered": delivered,
+        }
+        atomic_write_bytes(self.checkpoint_path, json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        self._saved_log_bytes = self._log_bytes
+        self._unsaved_bytes = 0
+        self.checkpoints_saved += 1
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import json
+import os
+from bisect import bisect_right
+from pathlib import Path
+from typing import Iterable
+
+from agenttalk.heartbeat.jsonl import iter_lines, parse_jsonl_line
+
+from .io import atomic_write_bytes, fsync_dir
+
+# deliveries.jsonl is the active segment; full segments are renamed to deliveries.segments/<seq>.jsonl (seq from 1,
+# zero-padded) next to a <seq>.idx.json sidecar. Sealed segments are never modified again.
+SEGMENTS_DIR_SUFFIX = ".segments"
+SEGMENT_SUFFIX = ".jsonl"
+SEGMENT_INDEX_SUFFIX = ".idx.json"
+SEGMENT_CHECKPOINT_ROWS = 256
+
+# pages are small: read around the seek target in small chunks rather than the default 1 MiB
+_PAGE_CHUNK_BYTES = 64 * 1024
+
+
+def segments_dir(log_path: Path) -> Path:
+    return log_path.with_name(log_path.stem + SEGMENTS_DIR_SUFFIX)
+
+
+def segment_index_path(segment: Path) -> Path:
+    return segment.with_name(segment.name[: -len(SEGMENT_SUFFIX)] + SEGMENT_INDEX_SUFFIX)
+
+
+def _segment_seq(name: str) -> int | None:
+    stem = name[: -len(SEGMENT_SUFFIX)] if name.endswith(SEGMENT_SUFFIX) else ""
+    return int(stem) if stem.isdigit() else None
+
+
+def sealed_segments(log_path: Path) -> list[Path]:
+    """Sealed segments of `log_path`, oldest first."""
+    try:
+        names = os.listdir(segments_dir(log_path))
+    except FileNotFoundError:
+        return []
+    seqs = sorted((seq, name) for name in names if (seq := _segment_seq(name)) is not None)
+    return [segments_dir(log_path) / name for _, name in seqs]
+
+
+def log_segments(log_path: Path) -> tuple[list[Path], os.stat_result | None]:
+    """
+    Sealed segments plus the stat of the active file (None when absent), listed consistently: a rotation that
+    lands between the directory listing and the stat would otherwise hide the segment it just sealed.
+    """
+    sealed = sealed_segments(log_path)
+    while True:
+        try:
+            st: os.stat_result | None = log_path.stat()
+        except FileNotFoundError:
+            st = None
+        again = sealed_segments(log_path)
+        if again == sealed:
+            return sealed, st
+        sealed = again
+
+
+def iter_log_files(log_path: Path) -> list[Path]:
+    """All segments in append order: sealed ones, then the active file if it exists."""
+    sealed, st = log_segments(log_path)
+    return sealed + ([log_path] if st is not None else [])
+
+
+def rotate_segment(log_path: Path) -> Path:
+    """
+    Seal the active file: rename it (same inode, so incremental readers finish it from their saved offset) to the
+    next segment number and write its sidecar index. The next append creates a fresh active file.
+    """
+    seg_dir = segments_dir(log_path)
+    seg_dir.mkdir(parents=True, exist_ok=True)
+    sealed = sealed_segments(log_path)
+    seq = (_segment_seq(sealed[-1].name) or 0) + 1 if sealed else 1
+    segment = seg_dir / f"{seq:06d}{SEGMENT_SUFFIX}"
+    os.replace(log_path, segment)
+    fsync_dir(seg_dir)
+    fsync_dir(log_path.parent)
+    write_segment_index(segment)
+    return segment
+
+
+def is_skipped(row: dict) -> bool:
+    return str(row.get("status", "")).startswith("SKIPPED_")
+
+
+class SegmentIndex:
+    """
+    Row index of one deliveries segment for paging without a scan.
+
+    Rows are the lines that parse to JSON objects; "visible" rows are the ones the dashboard lists by default
+    (status not SKIPPED_*). Every `checkpoint_rows` rows a `(row, visible_row, byte_offset)` checkpoint is kept, and
+    message_id/task_id map to `(byte_offset, skipped)` postings. `extend()` indexes complete lines appended since the
+    last call, so the same class serves sealed segments (persisted as a sidecar) and the growing active file.
+    """
+
+    def __init__(self, *, checkpoint_rows: int = SEGMENT_CHECKPOINT_ROWS) -> None:
+        self.checkpoint_rows = checkpoint_rows
+        self._clear()
+
+    def _clear(self) -> None:
+        self.inode: int | None = None
+        # bytes indexed so far; always at a line boundary
+        self.size = 0
+        self.rows = 0
+        self.visible = 0
+        self.checkpoints: list[tuple[int, int, int]] = []
+        self.message_ids: dict[str, list[tuple[int, bool]]] = {}
+        self.task_ids: dict[str, list[tuple[int, bool]]] = {}
+
+    def count(self, *, include_skipped: bool) -> int:
+        return self.rows if include_skipped else self.visible
+
+    def extend(self, path: Path) -> None:
+        """Index lines appended to `path` since the last call; a new inode or a shrink re-indexes from scratch."""
+        try:
+            f = path.open("rb")
+        except FileNotFoundError:
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != self.inode or st.st_size < self.size:
+                self._clear()
+                self.inode = st.st_ino
+            for pos, line in iter_lines(f, self.size):
+                self._add(line, pos)
+                self.size = pos + len(line) + 1
+
+    def _add(self, line: bytes, offset: int) -> None:
+        row = parse_jsonl_line(line)
+        if row is None:
+            return
+        skipped = is_skipped(row)
+        if self.rows % self.checkpoint_rows == 0:
+            self.checkpoints.append((self.rows, self.visible, offset))
+        self.rows += 1
+        if not skipped:
+            self.visible += 1
+        for key, postings in (("message_id", self.message_ids), ("task_id", self.task_ids)):
+            value = row.get(key)
+            if isinstance(value, str):
+                postings.setdefault(value, []).append((offset, skipped))
+
+    def postings(self, *, message_id: str | None, task_id: str | None, include_skipped: bool) -> list[int]:
+        """Byte offsets of the rows matching every given filter, in file order."""
+        lists = []
+        if message_id:
+            lists.append(self.message_ids.get(message_id, []))
+        if task_id:
+            lists.append(self.task_ids.get(task_id, []))
+        if not lists:
+            return []
+        base = min(lists, key=len)
+        others = [{o for o, _ in p} for p in lists if p is not base]
+        return [o for o, skipped in base if (include_skipped or not skipped) and all(o in s for s in others)]
+
+    def read_rows(self, path: Path, start: int, limit: int, *, include_skipped: bool) -> list[dict]:
+        """Up to `limit` rows from row number `start` (counting visible rows only unless `include_skipped`)."""
+        keys = [c[0] if include_skipped else c[1] for c in self.checkpoints]
+        i = bisect_right(keys, start) - 1
+        if i < 0 or limit <= 0:
+            return []
+        n = keys[i]
+        rows: list[dict] = []
+        with path.open("rb") as f:
+            for _, line in iter_lines(f, self.checkpoints[i][2], self.size, chunk_bytes=_PAGE_CHUNK_BYTES):
+                row = parse_jsonl_line(line)
+                if row is None or (not include_skipped and is_skipped(row)):
+                    continue
+                if n >= start:
+                    rows.append(row)
+                    if len(rows) >= limit:
+                        break
+                n += 1
+        return rows
+
+    def to_json(self) -> dict:
+        return {
+            "schema_version": "1.0",
+            "size": self.size,
+            "rows": self.rows,
+            "visible": self.visible,
+            "checkpoint_rows": self.checkpoint_rows,
+            "checkpoints": [list(c) for c in self.checkpoints],
+            "message_ids": {k: [[o, int(s)] for o, s in v] for k, v in self.message_ids.items()},
+            "task_ids": {k: [[o, int(s)] for o, s in v] for k, v in self.task_ids.items()},
+        }
+
+    @classmethod
+    def from_json(cls, obj: dict) -> SegmentIndex:
+        idx = cls(checkpoint_rows=int(obj["checkpoint_rows"]))
+        idx.size = int(obj["size"])
+        idx.rows = int(obj["rows"])
+        idx.visible = int(obj["visible"])
+        idx.checkpoints = [(int(a), int(b), int(c)) for a, b, c in obj["checkpoints"]]
+        idx.message_ids = {str(k): [(int(o), bool(s)) for o, s in v] for k, v in obj["message_ids"].items()}
+        idx.task_ids = {str(k): [(int(o), bool(s)) for o, s in v] for k, v in obj["task_ids"].items()}
+        return idx
+
+
+def write_segment_index(segment: Path) -> SegmentIndex:
+    idx = SegmentIndex()
+    idx.extend(segment)
+    data = json.dumps(idx.to_json(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    atomic_write_bytes(segment_index_path(segment), data)
+    return idx
+
+
+def load_segment_index(segment: Path) -> SegmentIndex:
+    """Sidecar index of a sealed segment; rebuilt in memory when the sidecar is missing, corrupt or stale."""
+    st = segment.stat()
+    try:
+        idx = SegmentIndex.from_json(json.loads(segment_index_path(segment).read_text(encoding="utf-8")))
+        if idx.size == st.st_size:
+            idx.inode = st.st_ino
+            return idx
+    except Exception:
+        pass
+    idx = SegmentIndex()
+    idx.extend(segment)
+    return idx
+
+
+def read_rows_at(path: Path, offsets: Iterable[int]) -> list[dict]:
+    """Rows starting at the given byte offsets (postings from `SegmentIndex`)."""
+    rows: list[dict] = []
+    with path.open("rb") as f:
+        for offset in offsets:
+            f.seek(offset)
+            row = parse_jsonl_line(f.readline())
+            if row is not None:
+                rows.append(row)
+    return rows
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from agenttalk.heartbeat.watch import DIR_CHANGE_MASK, FILE_READY_MASK, DirWatcher, IN_DELETE_SELF, IN_MOVE_SELF
+
+from .io import AgentsPaths
+from .outbox import list_subdirs
+
+
+class OutboxWatcher:
+    """
+    inotify watches over `agents/`, `agents/<agent_id>/`, `agents/<agent_id>/outbox/` (new directories) and
+    `agents/<agent_id>/outbox/<plan_id>/` (close-write / moved-to of files).
+
+    `wait()` turns events into `plan_id -> {agent_id}` so the router can route only what changed. `None`
+    means the kernel queue overflowed and events were lost: the caller must run a full tick.
+    """
+
+    def __init__(self, agents: AgentsPaths):
+        self.agents = agents
+        self.watcher = DirWatcher()
+
+    def sync(self) -> dict[str, set[str]]:
+        """Watch every outbox plan directory; returns newly watched ones (they may already hold files)."""
+        added: dict[str, set[str]] = {}
+        root = self.agents.agents_root
+        self.watcher.add(root, DIR_CHANGE_MASK)
+        for agent_id in list_subdirs(root):
+            self.watcher.add(self.agents.agent_root(agent_id), DIR_CHANGE_MASK)
+            outbox = self.agents.agent_outbox(agent_id)
+            self.watcher.add(outbox, DIR_CHANGE_MASK)
+            for plan_id in list_subdirs(outbox):
+                if self.watcher.add(outbox / plan_id, FILE_READY_MASK):
+                    added.setdefault(plan_id, set()).add(agent_id)
+        return added
+
+    def wait(self, timeout_seconds: float | None) -> dict[str, set[str]] | None:
+        dirty: dict[str, set[str]] = {}
+        resync = False
+        for ev in self.watcher.read(timeout_seconds):
+            if ev.overflow or ev.path is None:
+                return None
+            parts = _relative_parts(self.agents.agents_root, ev.path)
+            watched_dir_gone = bool(ev.mask & (IN_DELETE_SELF | IN_MOVE_SELF))
+            if parts is not None and len(parts) == 3 and parts[1] == "outbox" and not watched_dir_gone:
+                if ev.is_dir or ev.name.startswith(".") or ev.name.endswith(".tmp"):
+                    continue
+                dirty.setdefault(parts[2], set()).add(parts[0])
+            elif ev.is_dir or watched_dir_gone:
+                resync = True
+        if resync:
+            for plan_id, agent_ids in self.sync().items():
+                dirty.setdefault(plan_id, set()).update(agent_ids)
+        return dirty
+
+    def close(self) -> None:
+        self.watcher.close()
+
+    def __enter__(self) -> "OutboxWatcher":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def _relative_parts(root: Path, path: Path) -> tuple[str, ...] | None:
+    try:
+        return path.relative_to(root).parts
+    except ValueError:
+        return None
@@ -2,18 +2,11 @@ from __future__ import annotations
 
 import json
 import os
-import shutil
 from dataclasses import dataclass
-from hashlib import sha256
 from pathlib import Path
 
-
-def file_sha256(path: Path) -> str:
-    h = sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return "sha256:" + h.hexdigest()
+from agenttalk.heartbeat.hashing import file_sha256  # shared stat-keyed cache; re-exported
+from agenttalk.heartbeat.io import place_file
 
 
 def atomic_write_bytes(path: Path, data: bytes) -> None:
@@ -26,6 +19,20 @@ def atomic_write_bytes(path: Path, data: bytes) -> None:
     tmp.replace(path)
 
 
+def fsync_dir(path: Path) -> None:
+    """Persist renames/creations inside `path` (best effort; directories cannot be opened on Windows)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # pragma: no cover - e.g. Windows
+        return
+    try:
+        os.fsync(fd)
+    except OSError:  # pragma: no cover
+        pass
+    finally:
+        os.close(fd)
+
+
 def atomic_write_json(path: Path, obj: object) -> None:
     atomic_write_bytes(path, json.dumps(obj, ensure_ascii=False).encode("utf-8"))
 
@@ -34,12 +41,15 @@ def read_json(path: Path) -> dict:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
-def atomic_copy(src: Path, dst: Path) -> None:
+def atomic_copy(src: Path, dst: Path, *, mode: str = "copy") -> None:
+    """tmp -> rename copy; `mode` is a FILE_PLACEMENT_MODES value (link/reflink used for immutable payloads)."""
     dst.parent.mkdir(parents=True, exist_ok=True)
     tmp = dst.with_name(dst.name + ".tmp")
     tmp.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copyfile(src, tmp)
+    place_file(src, tmp, mode)
     tmp.replace(dst)
+    # rename() is a no-op when tmp and dst are already links to the same inode (re-delivery in link mode)
+    tmp.unlink(missing_ok=True)
 
 
 @dataclass(frozen=True)
@@ -58,6 +68,10 @@ class SystemPaths:
     def alerts(self) -> Path:
         return self.system_runtime / "alerts"
 
+    @property
+    def blobs(self) -> Path:
+        return self.system_runtime / "blobs"
+
 
 @dataclass(frozen=True)
 class AgentsPaths:
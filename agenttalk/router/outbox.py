@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from hashlib import sha256
+from pathlib import Path
+from typing import Any
+
+
+def list_subdirs(root: Path) -> list[str]:
+    """Sorted names of non-hidden subdirectories, from a single scandir (no per-entry stat on most filesystems)."""
+    try:
+        with os.scandir(root) as it:
+            return sorted(e.name for e in it if not e.name.startswith(".") and e.is_dir())
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+@dataclass(frozen=True)
+class OutboxSnapshot:
+    """
+    One listing of `agents/<agent_id>/outbox/<plan_id>/`, classified by kind.
+
+    Every routing phase of a tick consumes the same snapshot instead of re-globbing the directory. A file may
+    land in more than one list (e.g. `ack_x.msg.json` is both an ack and an envelope), matching the per-kind
+    globs this replaces. Each list is sorted by file name.
+    """
+
+    agent_id: str
+    plan_dir: Path
+    envelopes: list[Path] = field(default_factory=list)
+    acks: list[Path] = field(default_factory=list)
+    human_requests: list[Path] = field(default_factory=list)
+    human_responses: list[Path] = field(default_factory=list)
+    decision_records: list[Path] = field(default_factory=list)
+    release_manifests: list[Path] = field(default_factory=list)
+
+
+def scan_outbox_plan(agent_id: str, plan_dir: Path) -> OutboxSnapshot:
+    snap = OutboxSnapshot(agent_id=agent_id, plan_dir=plan_dir)
+    try:
+        with os.scandir(plan_dir) as it:
+            entries = sorted((e for e in it if e.is_file()), key=lambda e: e.name)
+    except (FileNotFoundError, NotADirectoryError):
+        return snap
+
+    for e in entries:
+        name = e.name
+        if name.endswith(".tmp"):
+            continue
+        path = plan_dir / name
+        if name.endswith(".msg.json"):
+            snap.envelopes.append(path)
+        if not name.endswith(".json"):
+            continue
+        if name.startswith("ack_"):
+            snap.acks.append(path)
+        if name.startswith("human_intervention_request_"):
+            snap.human_requests.append(path)
+        if name.startswith("human_intervention_response_"):
+            snap.human_responses.append(path)
+        if name.startswith("decision_record_"):
+            snap.decision_records.append(path)
+        if name.startswith("release_manifest_"):
+            snap.release_manifests.append(path)
+    return snap
+
+
+@dataclass(frozen=True)
+class ParsedEnvelope:
+    path: Path
+    sha256: str
+    obj: Any = None
+    error: Exception | None = None
+
+    def require(self) -> Any:
+        if self.error is not None:
+            raise self.error
+        return self.obj
+
+
+class EnvelopeCache:
+    """
+    Per-tick cache of outbox envelopes keyed by (path, mtime_ns, size).
+
+    Each envelope is read once; the same bytes give both its sha256 and its decoded object, which every
+    routing stage (supersede pre-pass, delivery, deadletter triage) shares. A file rewritten during the tick
+    gets a new key and is read again. Decoded objects are shared and must not be mutated.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple[Path, int, int], ParsedEnvelope] = {}
+        self.reads = 0
+
+    def get(self, path: Path) -> ParsedEnvelope:
+        st = path.stat()
+        key = (path, st.st_mtime_ns, st.st_size)
+        parsed = self._entries.get(key)
+        if parsed is not None:
+            return parsed
+        data = path.read_bytes()
+        self.reads += 1
+        digest = "sha256:" + sha256(data).hexdigest()
+        try:
+            obj = json.loads(data.decode("utf-8"))
+            parsed = ParsedEnvelope(path=path, sha256=digest, obj=obj)
+        except Exception as e:
+            parsed = ParsedEnvelope(path=path, sha256=digest, error=e)
+        self._entries[key] = parsed
+        return parsed
@@ -13,9 +13,25 @@ def main(argv: list[str] | None = None) -> None:
     p.add_argument("--system-runtime", required=True, type=Path, help="Path to system_runtime/")
     p.add_argument("--host", default="127.0.0.1")
     p.add_argument("--port", default=8000, type=int)
+    p.add_argument(
+        "--cache-ttl-seconds",
+        default=1.0,
+        type=float,
+        help="Serve cached responses without re-checking source files for this long (0 = stat on every request)",
+    )
+    p.add_argument(
+        "--stream-poll-interval-seconds",
+        default=0.5,
+        type=float,
+        help="How often /api/plans/{plan_id}/stream checks the plan's files for changes",
+    )
     args = p.parse_args(argv)
 
-    app = create_app(system_runtime=args.system_runtime)
+    app = create_app(
+        system_runtime=args.system_runtime,
+        cache_ttl_seconds=args.cache_ttl_seconds,
+        stream_poll_interval_seconds=args.stream_poll_interval_seconds,
+    )
     uvicorn.run(app, host=args.host, port=args.port)
 
 
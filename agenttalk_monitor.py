@@ -3,7 +3,7 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 
-from agenttalk.monitor.app import run_forever
+from agenttalk.monitor.app import MONITOR_EXECUTORS, MonitorConfig, run_forever
 
 
 def main(argv: list[str] | None = None, *, runner=run_forever) -> None:
@@ -16,8 +16,26 @@ def main(argv: list[str] | None = None, *, runner=run_forever) -> None:
         type=Path,
         help="Directory containing *.schema.json",
     )
+    p.add_argument("--poll-interval-seconds", default=2, type=int, help="Polling interval")
+    p.add_argument(
+        "--executor",
+        default="serial",
+        choices=list(MONITOR_EXECUTORS),
+        help="Aggregate plans serially, on a thread pool (I/O-heavy) or on a process pool (CPU-bound)",
+    )
+    p.add_argument("--max-workers", default=4, type=int, help="Pool size for --executor thread/process")
     args = p.parse_args(argv)
-    runner(agents_root=args.agents_root, system_runtime=args.system_runtime, schemas_base_dir=args.schemas_base_dir)
+    config = MonitorConfig(
+        poll_interval_seconds=args.poll_interval_seconds,
+        executor=args.executor,
+        max_workers=args.max_workers,
+    )
+    runner(
+        agents_root=args.agents_root,
+        system_runtime=args.system_runtime,
+        schemas_base_dir=args.schemas_base_dir,
+        config=config,
+    )
 
 
 if __name__ == "__main__":
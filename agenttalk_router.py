@@ -3,7 +3,7 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 
-from agenttalk.router.app import run_forever
+from agenttalk.router.app import RouterConfig, run_forever
 
 
 def main(argv: list[str] | None = None, *, runner=run_forever) -> None:
@@ -16,10 +16,78 @@ def main(argv: list[str] | None = None, *, runner=run_forever) -> None:
         type=Path,
         help="Directory containing *.schema.json",
     )
+    p.add_argument("--poll-interval-seconds", default=2, type=int, help="Polling interval (polling mode)")
+    p.add_argument(
+        "--event-mode",
+        action="store_true",
+        help="Route on inotify outbox events (Linux); falls back to polling where unavailable",
+    )
+    p.add_argument(
+        "--full-tick-interval-seconds",
+        default=60,
+        type=int,
+        help="Event mode: interval of the full safety-net tick",
+    )
+    p.add_argument("--max-workers", default=1, type=int, help="Route up to N plans concurrently (default: 1)")
+    p.add_argument(
+        "--delivery-mode",
+        default="copy",
+        choices=["copy", "reflink", "link"],
+        help=(
+            "Payload placement into inboxes: byte copy, FICLONE reflink, or hardlink (falls back to copy). "
+            "WARNING: link shares one inode between the producer outbox, every inbox and the consumers' workspace "
+            "inputs, so an in-place edit anywhere changes them all; payloads are sha256-verified before linking"
+        ),
+    )
+    p.add_argument(
+        "--blob-store",
+        action="store_true",
+        help="Store payloads once under system_runtime/blobs/sha256/ (sha256-verified) and link them into inboxes",
+    )
+    p.add_argument(
+        "--hash-cache",
+        default=None,
+        type=Path,
+        help="Persist the stat-keyed sha256 cache to this file across restarts",
+    )
+    p.add_argument(
+        "--delivery-log-fsync",
+        default="per_tick",
+        choices=["always", "per_tick", "interval_ms"],
+        help="deliveries.jsonl durability: fsync every append, once per plan tick, or at most every interval",
+    )
+    p.add_argument(
+        "--delivery-log-fsync-interval-ms",
+        default=1000,
+        type=int,
+        help="Minimum interval between fsyncs with --delivery-log-fsync interval_ms",
+    )
+    p.add_argument(
+        "--delivery-log-segment-bytes",
+        default=64 * 1024 * 1024,
+        type=int,
+        help="Seal deliveries.jsonl into deliveries.segments/ once it reaches this size (0 disables rotation)",
+    )
     args = p.parse_args(argv)
-    runner(agents_root=args.agents_root, system_runtime=args.system_runtime, schemas_base_dir=args.schemas_base_dir)
+    config = RouterConfig(
+        poll_interval_seconds=args.poll_interval_seconds,
+        event_mode=args.event_mode,
+        full_tick_interval_seconds=args.full_tick_interval_seconds,
+        max_workers=args.max_workers,
+        delivery_mode=args.delivery_mode,
+        blob_store_enabled=args.blob_store,
+        hash_cache_path=args.hash_cache,
+        delivery_log_fsync=args.delivery_log_fsync,
+        delivery_log_fsync_interval_ms=args.delivery_log_fsync_interval_ms,
+        delivery_log_segment_bytes=args.delivery_log_segment_bytes,
+    )
+    runner(
+        agents_root=args.agents_root,
+        system_runtime=args.system_runtime,
+        schemas_base_dir=args.schemas_base_dir,
+        config=config,
+    )
 
 
 if __name__ == "__main__":
     main()
-
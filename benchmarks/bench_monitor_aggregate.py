@@ -0,0 +1,94 @@
+"""
+Micro-benchmark: `aggregate_plan_status` cost vs. plan size (tasks x command messages).
+
+Builds a plan with T tasks and M DELIVERED command messages spread evenly over the tasks (one archived ACK
+per task, every other one CONSUMED so the timeout lookup runs) and times a cold and a warm aggregation. With
+the task_id -> message_ids multimap the per-message cost should stay flat as T and M grow together (the old
+per-node scan over all messages was O(T x M)).
+
+Usage:
+  python benchmarks/bench_monitor_aggregate.py [--sizes 500:10000,1000:20000,2500:50000,5000:100000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from agenttalk.heartbeat.hashing import file_sha256  # noqa: E402
+from agenttalk.heartbeat.schema import SchemaRegistry  # noqa: E402
+from agenttalk.monitor.app import MonitorConfig, MonitorContext, aggregate_plan_status  # noqa: E402
+
+
+def _write_json(path: Path, obj: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(obj), encoding="utf-8")
+
+
+def _bench_size(root: Path, tasks: int, messages: int) -> tuple[float, float]:
+    plan_id = "plan_bench"
+    plan_dir = root / "system_runtime" / "plans" / plan_id
+    nodes = [
+        {"task_id": f"task_{t}", "assigned_agent_id": "agent_exec", "depends_on": [], "outputs": []}
+        for t in range(tasks)
+    ]
+    _write_json(plan_dir / "task_dag.json", {"schema_version": "1.1", "plan_id": plan_id, "nodes": nodes})
+    dag_sha = file_sha256(plan_dir / "task_dag.json")
+    _write_json(
+        plan_dir / "active_dag_ref.json",
+        {"schema_version": "1.0", "plan_id": plan_id, "task_dag_sha256": dag_sha, "updated_at": None},
+    )
+
+    with (plan_dir / "deliveries.jsonl").open("w", encoding="utf-8") as f:
+        for i in range(messages):
+            row = {
+                "message_id": f"msg_{i}",
+                "task_id": f"task_{i % tasks}",
+                "command_id": f"cmd_{i}",
+                "status": "DELIVERED",
+                "payload": {"files": []},
+            }
+            f.write(json.dumps(row) + "\n")
+    for t in range(tasks):
+        status = "CONSUMED" if t % 2 else "SUCCEEDED"
+        _write_json(
+            plan_dir / "acks" / f"ack_msg_{t}.json",
+            {"message_id": f"msg_{t}", "status": status, "consumed_at": "2026-01-01T00:00:00Z"},
+        )
+
+    ctx = MonitorContext(
+        agents_root=root / "agents",
+        system_runtime=root / "system_runtime",
+        schemas=SchemaRegistry(Path("doc/rule/templates/schemas")),
+        config=MonitorConfig(schema_validation_enabled=False),
+    )
+    t0 = time.perf_counter()
+    aggregate_plan_status(ctx, plan_id)
+    cold = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    aggregate_plan_status(ctx, plan_id)
+    warm = time.perf_counter() - t0
+    return cold, warm
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1] if __doc__ else None)
+    p.add_argument("--sizes", default="500:10000,1000:20000,2500:50000,5000:100000", help="tasks:messages,...")
+    args = p.parse_args()
+
+    print(f"{'tasks':>7}  {'messages':>9}  {'cold (ms)':>10}  {'warm (ms)':>10}  {'warm per message (us)':>22}")
+    for spec in [x for x in args.sizes.split(",") if x]:
+        tasks, messages = (int(v) for v in spec.split(":"))
+        with tempfile.TemporaryDirectory() as tmp:
+            cold, warm = _bench_size(Path(tmp), tasks, messages)
+        print(f"{tasks:>7}  {messages:>9}  {cold * 1e3:>10.1f}  {warm * 1e3:>10.1f}  {warm / messages * 1e6:>22.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Micro-benchmark: per-envelope routing cost vs. delivery history size.
+
+Pre-populates the plan's DeliveredIndex with N synthetic deliveries and then routes a fixed batch of new
+artifact envelopes through `_deliver_one`. With message_id-keyed conflict detection the per-envelope cost
+should stay flat from 1k to 1M deliveries (the old set scan grew linearly). Like the router's default config, the
+delivery log is group-committed with fsync_policy="per_tick": one flush (one fsync) per `--per-tick` envelopes.
+
+Usage:
+  python benchmarks/bench_router_delivered_index.py [--sizes 1000,10000,100000,1000000] [--envelopes 200] [--per-tick 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from agenttalk.router.app import RouterConfig, RouterContext, _deliver_one, _plan_paths  # noqa: E402
+from agenttalk.router.dag import parse_dag  # noqa: E402
+from agenttalk.router.delivery_log import DeliveredIndex, DeliveryLogWriter  # noqa: E402
+from agenttalk.router.io import AgentsPaths, SystemPaths  # noqa: E402
+from agenttalk.router.schema import SchemaRegistry  # noqa: E402
+
+
+def _bench_size(root: Path, history: int, envelopes: int, per_tick: int) -> tuple[float, float]:
+    plan_id = "plan_bench"
+    agents_root = root / "agents"
+    for agent_id in ("agent_prod", "agent_consumer"):
+        (agents_root / agent_id / "inbox").mkdir(parents=True, exist_ok=True)
+    outbox_plan = agents_root / "agent_prod" / "outbox" / plan_id
+    outbox_plan.mkdir(parents=True, exist_ok=True)
+    ctx = RouterContext(
+        agents=AgentsPaths(agents_root=agents_root),
+        system=SystemPaths(system_runtime=root / "system_runtime"),
+        schemas=SchemaRegistry(schemas_base_dir=Path("doc/rule/templates/schemas")),
+        config=RouterConfig(schema_validation_enabled=False),
+    )
+    dag = parse_dag(
+        {
+            "schema_version": "1.1",
+            "plan_id": plan_id,
+            "nodes": [
+                {
+                    "task_id": "task_src",
+                    "assigned_agent_id": "agent_prod",
+                    "depends_on": [],
+                    "outputs": [{"name": "o", "deliver_to": ["agent_consumer"], "idempotency_key": "k"}],
+                }
+            ],
+        }
+    )
+
+    delivered = DeliveredIndex()
+    for i in range(history):
+        delivered.add(f"msg_hist_{i}", f"sha256:{i:064x}")
+
+    paths = []
+    for i in range(envelopes):
+        env = {
+            "schema_version": "1.0",
+            "message_id": f"msg_new_{i}",
+            "plan_id": plan_id,
+            "producer_agent_id": "agent_prod",
+            "type": "artifact",
+            "created_at": "2026-01-01T00:00:00Z",
+            "task_id": "task_src",
+            "output_name": "o",
+            "payload": {"files": []},
+        }
+        p = outbox_plan / f"new_{i}.msg.json"
+        p.write_text(json.dumps(env), encoding="utf-8")
+        paths.append(p)
+
+    log = DeliveryLogWriter(_plan_paths(ctx, plan_id)["deliveries"], fsync_policy="per_tick")
+    t0 = time.perf_counter()
+    for n, p in enumerate(paths, 1):
+        _deliver_one(
+            ctx,
+            dag=dag,
+            dag_sha="sha256:bench",
+            plan_id=plan_id,
+            from_agent_id="agent_prod",
+            envelope_path=p,
+            delivered=delivered,
+            log=log,
+        )
+        if n % per_tick == 0:
+            log.flush()  # end of a simulated router tick
+    log.flush()
+    per_envelope = (time.perf_counter() - t0) / envelopes
+
+    lookups = 100_000
+    t0 = time.perf_counter()
+    for i in range(lookups):
+        delivered.conflicts(f"msg_hist_{i % max(history, 1)}", "sha256:other")
+    per_lookup = (time.perf_counter() - t0) / lookups
+    return per_envelope, per_lookup
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1] if __doc__ else None)
+    p.add_argument("--sizes", default="1000,10000,100000,1000000")
+    p.add_argument("--envelopes", default=200, type=int)
+    p.add_argument("--per-tick", default=50, type=int, help="envelopes routed per simulated tick (one fsync each)")
+    args = p.parse_args()
+
+    print(f"{'history':>10}  {'per envelope (us)':>18}  {'conflict check (ns)':>20}")
+    for size in [int(x) for x in args.sizes.split(",") if x]:
+        with tempfile.TemporaryDirectory() as tmp:
+            per_envelope, per_lookup = _bench_size(Path(tmp), size, args.envelopes, max(args.per_tick, 1))
+        print(f"{size:>10}  {per_envelope * 1e6:>18.1f}  {per_lookup * 1e9:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -154,3 +154,302 @@ def test_dashboard_deliveries_filter_and_release_manifest_404(tmp_path: Path):
     assert deliveries_all["total"] == 2
 
     assert client.get(f"/api/plans/{plan_id}/release_manifest").status_code == 404
+
+
+def test_dashboard_deliveries_pages_across_segments_match_full_scan(tmp_path: Path):
+    from fastapi.testclient import TestClient
+
+    from agenttalk.dashboard.app import create_app
+    from agenttalk.router.delivery_log import DeliveryLogWriter
+    from agenttalk.router.delivery_segments import SEGMENT_CHECKPOINT_ROWS, sealed_segments
+
+    system_runtime = tmp_path / "system_runtime"
+    plan_id = "plan_1"
+    log_path = system_runtime / "plans" / plan_id / "deliveries.jsonl"
+    writer = DeliveryLogWriter(log_path, segment_bytes=40_000)
+    rows: list[dict] = []
+
+    def append(n: int) -> None:
+        status = "SKIPPED_DUPLICATE" if n % 7 == 0 else "DELIVERED"
+        rows.append({"delivery_id": f"del_{n}", "message_id": f"msg_{n % 50}", "task_id": f"task_{n % 3}", "status": status})
+        writer.append(rows[-1])
+
+    for n in range(1500):
+        append(n)
+        if n % 100 == 99:
+            writer.flush()
+    writer.flush()
+    with log_path.open("ab") as f:
+        f.write(b"not json\n")
+    assert len(sealed_segments(log_path)) >= 2 and 1500 > 2 * SEGMENT_CHECKPOINT_ROWS
+
+    client = TestClient(create_app(system_runtime=system_runtime))
+
+    def check(query: dict, offset: int, limit: int) -> None:
+        expected = [
+            r
+            for r in rows
+            if all(r[k] == v for k, v in query.items() if k != "include_skipped")
+            and (query.get("include_skipped") or r["status"] != "SKIPPED_DUPLICATE")
+        ]
+        params = {**query, "offset": offset, "limit": limit}
+        got = client.get(f"/api/plans/{plan_id}/deliveries", params=params).json()
+        assert got["total"] == len(expected)
+        assert got["items"] == expected[offset : offset + limit]
+
+    for query in ({}, {"include_skipped": True}, {"task_id": "task_1"}, {"message_id": "msg_7", "include_skipped": True}):
+        for offset in (0, 255, 256, 700, 1283, 1400, 5000):
+            check(query, offset, 50)
+    check({"message_id": "msg_7", "task_id": "task_1"}, 0, 500)
+
+    # appends (and a further rotation) after the first request are picked up incrementally
+    for n in range(1500, 2000):
+        append(n)
+    writer.flush()
+    check({}, 1450, 100)
+    check({"task_id": "task_2", "include_skipped": True}, 600, 50)
+
+    # unknown plans page as empty (no reader is kept for them); readers are bounded LRU
+    resp = client.get("/api/plans/plan_nope/deliveries?limit=20")
+    assert resp.status_code == 200
+    assert resp.json() == {"total": 0, "offset": 0, "limit": 20, "items": []}
+    readers = client.app.state.deliveries_readers
+    assert list(readers.readers) == [plan_id]
+    readers.max_readers = 2
+    for other in ["plan_2", "plan_3"]:
+        (system_runtime / "plans" / other).mkdir()
+        assert client.get(f"/api/plans/{other}/deliveries").json()["total"] == 0
+    assert list(readers.readers) == ["plan_2", "plan_3"]
+    check({}, 1900, 100)  # not cached yet: the evicted reader is rebuilt
+    assert list(readers.readers) == ["plan_3", plan_id]
+
+
+def test_dashboard_caches_responses_with_etags_and_ttl(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    import os
+    import time
+
+    from fastapi.testclient import TestClient
+
+    from agenttalk.dashboard import app as dashboard_app
+
+    system_runtime = tmp_path / "system_runtime"
+    status_path = system_runtime / "plans" / "plan_1" / "plan_status.json"
+    status = {"plan_id": "plan_1", "updated_at": "2026-01-01T00:00:00Z", "tasks": [{"task_id": "t1", "state": "RUNNING"}]}
+    write_json(status_path, status)
+    old_ns = time.time_ns() - 10_000_000_000  # outside the racy mtime window
+    for p in (status_path, status_path.parent.parent):
+        os.utime(p, ns=(old_ns, old_ns))
+
+    reads: list[Path] = []
+    real_read_json = dashboard_app.read_json
+    monkeypatch.setattr(dashboard_app, "read_json", lambda p: reads.append(p) or real_read_json(p))
+
+    client = TestClient(dashboard_app.create_app(system_runtime=system_runtime, cache_ttl_seconds=60))
+    first = client.get("/api/plans")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.json()[0]["stats"]["RUNNING"] == 1
+    for _ in range(5):
+        assert client.get("/api/plans").headers["etag"] == etag
+    assert client.get("/api/plans", headers={"If-None-Match": etag}).status_code == 304
+    assert len(reads) == 1  # polling within the TTL collapses into one read
+
+    # without a TTL every request re-stats: unchanged sources are still served from the cache ...
+    client = TestClient(dashboard_app.create_app(system_runtime=system_runtime, cache_ttl_seconds=0))
+    reads.clear()
+    assert client.get("/api/plans").headers["etag"] == etag
+    not_modified = client.get("/api/plans", headers={"If-None-Match": f'"other", {etag}'})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert len(reads) == 1
+
+    # ... and a rewrite (new inode/mtime/size) is picked up with a new ETag
+    write_json(status_path, {**status, "tasks": [{"task_id": "t1", "state": "COMPLETED"}]})
+    changed = client.get("/api/plans", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json()[0]["stats"]["COMPLETED"] == 1
+
+    # failing builds leave neither an entry nor a per-key lock behind
+    cache = client.app.state.response_cache
+    for n in range(20):
+        assert client.get(f"/api/plans/plan_x{n}/status").status_code == 404
+    assert not [k for k in cache._key_locks if "plan_x" in k]
+    assert set(cache._key_locks) <= set(cache.entries)
+
+
+def test_dashboard_stream_pushes_status_diffs_deliveries_acks_and_alerts(tmp_path: Path):
+    import threading
+    import time
+
+    from fastapi.testclient import TestClient
+
+    from agenttalk.dashboard.app import create_app
+    from agenttalk.router.delivery_log import DeliveryLogWriter
+
+    system_runtime = tmp_path / "system_runtime"
+    plan_id = "plan_1"
+    plan_dir = system_runtime / "plans" / plan_id
+    status = {
+        "plan_id": plan_id,
+        "updated_at": "2026-01-01T00:00:00Z",
+        "tasks": [{"task_id": "t1", "state": "RUNNING"}, {"task_id": "t2", "state": "PENDING"}],
+    }
+    write_json(plan_dir / "plan_status.json", status)
+    write_json(plan_dir / "acks" / "ack_old.json", {"message_id": "old", "status": "CONSUMED"})
+    writer = DeliveryLogWriter(plan_dir / "deliveries.jsonl", segment_bytes=150)
+    writer.append({"message_id": "m_old", "status": "DELIVERED"})
+    writer.flush()
+    with (plan_dir / "deliveries.jsonl").open("ab") as f:
+        f.write(b'{"message_id": "m_torn"')  # history and a half-written line are not replayed as new
+
+    def produce() -> None:
+        time.sleep(0.3)
+        with (plan_dir / "deliveries.jsonl").open("ab") as f:
+            f.write(b', "status": "DELIVERED"}\n')
+        for n in range(3):  # rotates mid-stream
+            writer.append({"message_id": f"m{n}", "status": "DELIVERED", "payload": {"files": []}})
+            writer.flush()
+        write_json(plan_dir / "acks" / "ack_m0.json", {"message_id": "m0", "status": "CONSUMED"})
+        write_json(system_runtime / "alerts" / plan_id / "alert_1.json", {"alert_id": "alert_1", "type": "X"})
+        write_json(
+            plan_dir / "plan_status.json",
+            {**status, "updated_at": "2026-01-01T00:00:05Z", "tasks": [{"task_id": "t1", "state": "COMPLETED"}]},
+        )
+
+    client = TestClient(create_app(system_runtime=system_runtime, stream_poll_interval_seconds=0.05))
+    producer = threading.Thread(target=produce)
+    producer.start()
+
+    def read_stream(url: str, headers: dict | None = None) -> list[tuple[str, dict, str]]:
+        events = []
+        with client.stream("GET", url, headers=headers) as resp:
+            assert resp.status_code == 200 and resp.headers["content-type"].startswith("text/event-stream")
+            event_id = event = None
+            for line in resp.iter_lines():
+                if line.startswith("id: "):
+                    event_id = line[len("id: ") :]
+                elif line.startswith("event: "):
+                    event = line[len("event: ") :]
+                elif line.startswith("data: "):
+                    events.append((str(event), json.loads(line[len("data: ") :]), str(event_id)))
+        return events
+
+    streamed = read_stream(f"/api/plans/{plan_id}/stream?max_events=8&timeout_seconds=10")
+    events = [(e, d) for e, d, _ in streamed]
+    producer.join()
+    assert writer.rotations >= 1
+
+    assert events[0] == ("status", status)
+    deliveries = [d["message_id"] for e, d in events if e == "delivery"]
+    assert deliveries == ["m_torn", "m0", "m1", "m2"]
+    assert [d["message_id"] for e, d in events if e == "ack"] == ["m0"]
+    assert [d["alert_id"] for e, d in events if e == "alert"] == ["alert_1"]
+    (diff,) = [d for e, d in events if e == "status_diff"]
+    assert diff == {
+        "changed": {"updated_at": "2026-01-01T00:00:05Z"},
+        "removed_fields": [],
+        "tasks": [{"task_id": "t1", "state": "COMPLETED"}],
+        "removed_tasks": ["t2"],
+    }
+
+    # reconnecting with Last-Event-ID resumes the delivery log after that event, across the rotation
+    (m0_id,) = [i for e, d, i in streamed if e == "delivery" and d["message_id"] == "m0"]
+    for n in range(3, 5):
+        writer.append({"message_id": f"m{n}", "status": "DELIVERED"})
+        writer.flush()
+    resumed = read_stream(f"/api/plans/{plan_id}/stream?max_events=5&timeout_seconds=5", {"Last-Event-ID": m0_id})
+    assert [(e, d.get("message_id")) for e, d, _ in resumed] == [("status", None)] + [
+        ("delivery", f"m{n}") for n in range(1, 5)
+    ]
+    # a stale or foreign id starts from the end, like a fresh connection
+    for bad_id in ["99:0", "0:7", "garbage"]:
+        fresh = read_stream(f"/api/plans/{plan_id}/stream?timeout_seconds=0.2", {"Last-Event-ID": bad_id})
+        assert [e for e, _, _ in fresh] == ["status"]
+
+    # bounded by time when nothing happens
+    with client.stream("GET", f"/api/plans/{plan_id}/stream?timeout_seconds=0.2") as resp:
+        assert sum(1 for line in resp.iter_lines() if line.startswith("event: ")) == 1
+    assert client.get("/api/plans/plan_missing/stream?timeout_seconds=0.1").status_code == 404
+
+
+def test_dashboard_stream_connections_share_one_watcher_per_plan(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    import threading
+    import time
+
+    from fastapi.testclient import TestClient
+
+    import agenttalk.dashboard.stream as stream
+    from agenttalk.dashboard.app import create_app
+    from agenttalk.router.delivery_log import DeliveryLogWriter
+
+    system_runtime = tmp_path / "system_runtime"
+    plan_id = "plan_1"
+    plan_dir = system_runtime / "plans" / plan_id
+    write_json(plan_dir / "plan_status.json", {"plan_id": plan_id, "tasks": []})
+    writer = DeliveryLogWriter(plan_dir / "deliveries.jsonl")
+    writer.append({"message_id": "m_old", "status": "DELIVERED"})
+    writer.flush()
+
+    created: list[str] = []
+
+    class CountingWatcher(stream.PlanWatcher):
+        def __init__(self, paths, plan_id: str) -> None:
+            created.append(plan_id)
+            super().__init__(paths, plan_id)
+
+    monkeypatch.setattr(stream, "PlanWatcher", CountingWatcher)
+    app = create_app(system_runtime=system_runtime, stream_poll_interval_seconds=0.05)
+    client = TestClient(app)
+    streams = app.state.plan_streams
+    received: dict[int, list[tuple[str, str | None]]] = {}
+
+    def viewer(n: int) -> None:
+        events = []
+        with client.stream("GET", f"/api/plans/{plan_id}/stream?max_events=4&timeout_seconds=10") as resp:
+            event = None
+            for line in resp.iter_lines():
+                if line.startswith("event: "):
+                    event = line[len("event: ") :]
+                elif line.startswith("data: "):
+                    events.append((str(event), json.loads(line[len("data: ") :]).get("message_id")))
+        received[n] = events
+
+    viewers = [threading.Thread(target=viewer, args=(n,)) for n in range(3)]
+    for t in viewers:
+        t.start()
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and len(getattr(streams.feeds.get(plan_id), "subscribers", [])) < 3:
+        time.sleep(0.01)
+    for n in range(3):
+        writer.append({"message_id": f"m{n}", "status": "DELIVERED"})
+        writer.flush()
+    for t in viewers:
+        t.join()
+
+    expected = [("status", None), ("delivery", "m0"), ("delivery", "m1"), ("delivery", "m2")]
+    assert received == {0: expected, 1: expected, 2: expected}
+    assert created == [plan_id]  # one watcher polled the plan for all three connections
+    deadline = time.monotonic() + 5
+    while streams.feeds and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert streams.feeds == {}  # the last subscriber leaving stops the feed
+
+
+def test_delivery_tail_skips_to_end_when_log_is_rewritten(tmp_path: Path):
+    from agenttalk.dashboard.stream import DeliveryTail
+    from agenttalk.router.delivery_log import DeliveryLogWriter
+
+    log_path = tmp_path / "deliveries.jsonl"
+    writer = DeliveryLogWriter(log_path)
+    writer.append_many([{"message_id": f"m{n}", "status": "DELIVERED"} for n in range(3)])
+    writer.flush()
+    tail = DeliveryTail(log_path)
+    writer.append({"message_id": "m3", "status": "DELIVERED"})
+    writer.flush()
+    assert [row["message_id"] for _, row in tail.take()] == ["m3"]
+
+    # rewritten in place (same inode, different bytes): no replay of the history, only later appends
+    log_path.write_bytes(b"".join(json.dumps({"message_id": f"r{n}"}).encode("utf-8") + b"\n" for n in range(5)))
+    assert tail.take() == []
+    writer.append({"message_id": "m4", "status": "DELIVERED"})
+    writer.flush()
+    ((position, row),) = tail.take()
+    assert row["message_id"] == "m4" and position == tail.position
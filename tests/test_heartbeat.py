@@ -430,3 +430,220 @@ def test_schema_validation_invalid_envelope_deadletters(tmp_path: Path):
     assert list((inbox_plan / ".deadletter").glob("bad.msg.json")), "expected bad envelope in deadletter"
     alerts = list(outbox_plan.glob("alert_*.json"))
     assert alerts, "expected an alert to be written"
+
+
+def test_watch_step_ticks_only_plans_that_received_envelopes(tmp_path: Path):
+    import dataclasses
+
+    from agenttalk.heartbeat.app import watch_step
+    from agenttalk.heartbeat.watch import InboxWatcher, inotify_available
+
+    if not inotify_available():
+        pytest.skip("inotify not available")
+
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    ctx = base_ctx(tmp_path, now)
+    ctx = dataclasses.replace(ctx, config=dataclasses.replace(ctx.config, max_new_messages_per_tick=1))
+    inbox = ctx.agent_paths.inbox
+    (inbox / "plan_idle").mkdir(parents=True)
+    (inbox / "plan_busy").mkdir(parents=True)
+
+    def deliver(plan_id: str, message_id: str) -> None:
+        # router-style delivery: tmp write then rename
+        atomic_write_json(
+            inbox / plan_id / f"{message_id}.msg.json",
+            {
+                "schema_version": "1.0",
+                "message_id": message_id,
+                "plan_id": plan_id,
+                "producer_agent_id": "agent_x",
+                "type": "artifact",
+                "created_at": iso_z(now),
+                "task_id": "task_1",
+                "output_name": message_id,
+                "payload": {"files": []},
+            },
+        )
+
+    with InboxWatcher(inbox) as watcher:
+        assert watcher.sync() == {"plan_idle", "plan_busy"}
+
+        deliver("plan_busy", "msg_1")
+        deliver("plan_busy", "msg_2")
+        assert watch_step(ctx, watcher, timeout_seconds=5) == {"plan_busy"}
+        # max_new_messages_per_tick=1 left a backlog: the plan is re-queued without a new event
+        assert watch_step(ctx, watcher, timeout_seconds=5) == {"plan_busy"}
+        assert not list((inbox / "plan_busy").glob("*.msg.json"))
+
+        # a plan inbox created later is watched and ticked right away
+        deliver("plan_new", "msg_3")
+        assert watch_step(ctx, watcher, timeout_seconds=5) == {"plan_new"}
+        assert not list((inbox / "plan_new").glob("*.msg.json"))
+
+        assert watch_step(ctx, watcher, timeout_seconds=0) == set()
+
+
+def test_link_payload_delivery_mode_ingests_inputs_without_copying(tmp_path: Path):
+    import dataclasses
+    import hashlib
+
+    from agenttalk.heartbeat.io import file_sha256
+
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    ctx = base_ctx(tmp_path, now)
+    ctx = dataclasses.replace(ctx, config=dataclasses.replace(ctx.config, payload_delivery_mode="link"))
+    plan_id = "plan_link"
+    inbox_plan = ctx.agent_paths.inbox / plan_id
+    inbox_plan.mkdir(parents=True, exist_ok=True)
+    data = b"x" * 4096
+    (inbox_plan / "design.md").write_bytes(data)
+    sha = "sha256:" + hashlib.sha256(data).hexdigest()
+    write_envelope(
+        inbox_plan / "design.msg.json",
+        {
+            "schema_version": "1.0",
+            "message_id": "msg_design",
+            "plan_id": plan_id,
+            "producer_agent_id": "agent_x",
+            "type": "artifact",
+            "created_at": iso_z(now),
+            "task_id": "task_1",
+            "output_name": "design",
+            "payload": {"files": [{"path": "design.md", "sha256": sha}]},
+        },
+    )
+    ino = (inbox_plan / "design.md").stat().st_ino
+
+    tick_plan(ctx, plan_id)
+
+    stored = ctx.agent_paths.workspace / plan_id / "inputs" / "task_1" / "design" / "design.md"
+    assert file_sha256(stored) == sha
+    assert stored.stat().st_ino == ino
+    # the inbox copy is finalized (moved) as usual; the linked input survives
+    assert file_sha256(inbox_plan / ".processed" / "_payload" / "msg_design" / "design.md") == sha
+
+    # a payload that no longer matches its declared sha256 is never linked into the workspace
+    (inbox_plan / "notes.md").write_bytes(b"edited in place")
+    write_envelope(
+        inbox_plan / "notes.msg.json",
+        {
+            "schema_version": "1.0",
+            "message_id": "msg_notes",
+            "plan_id": plan_id,
+            "producer_agent_id": "agent_x",
+            "type": "artifact",
+            "created_at": iso_z(now),
+            "task_id": "task_1",
+            "output_name": "notes",
+            "payload": {"files": [{"path": "notes.md", "sha256": sha}]},
+        },
+    )
+    tick_plan(ctx, plan_id)
+    assert not (ctx.agent_paths.workspace / plan_id / "inputs" / "task_1" / "notes" / "notes.md").exists()
+    assert [p.name for p in (inbox_plan / ".deadletter").glob("*.msg.json")] == ["msg_notes__notes.msg.json"]
+
+
+def test_ingest_artifact_links_inputs_from_blob_store(tmp_path: Path):
+    import dataclasses
+    import hashlib
+
+    from agenttalk.heartbeat.blobs import BlobStore
+
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    ctx = base_ctx(tmp_path, now)
+    store = BlobStore(tmp_path / "system_runtime" / "blobs")
+    ctx = dataclasses.replace(ctx, config=dataclasses.replace(ctx.config, blob_store_dir=store.root))
+    data = b"design" * 512
+    src = tmp_path / "design.md"
+    src.write_bytes(data)
+    digest = store.ingest(src, "sha256:" + hashlib.sha256(data).hexdigest())
+
+    plan_id = "plan_blob"
+    inbox_plan = ctx.agent_paths.inbox / plan_id
+    store.materialize(digest, inbox_plan / "design.md")
+    write_envelope(
+        inbox_plan / "design.msg.json",
+        {
+            "schema_version": "1.0",
+            "message_id": "msg_design",
+            "plan_id": plan_id,
+            "producer_agent_id": "agent_x",
+            "type": "artifact",
+            "created_at": iso_z(now),
+            "task_id": "task_1",
+            "output_name": "design",
+            "payload": {"files": [{"path": "design.md", "sha256": digest}]},
+        },
+    )
+
+    tick_plan(ctx, plan_id)
+
+    stored = ctx.agent_paths.workspace / plan_id / "inputs" / "task_1" / "design" / "design.md"
+    assert stored.read_bytes() == data
+    assert stored.stat().st_ino == store.path_for(digest).stat().st_ino
+
+
+def test_jsonl_reader_streams_lines_in_chunks_and_resumes_from_offsets(tmp_path: Path):
+    from agenttalk.heartbeat.jsonl import iter_jsonl, iter_lines
+
+    path = tmp_path / "log.jsonl"
+    rows = [{"n": n, "pad": "x" * (n % 7)} for n in range(40)]
+    path.write_bytes(b"".join(json.dumps(r).encode("utf-8") + b"\n" for r in rows[:20]) + b"not json\n\n[1]\n")
+    with path.open("ab") as f:
+        f.write(b"".join(json.dumps(r).encode("utf-8") + b"\n" for r in rows[20:]))
+        f.write(b'{"n": 40}')  # unterminated: still being appended
+
+    assert list(iter_jsonl(path)) == rows + [{"n": 40}]
+    assert list(iter_jsonl(tmp_path / "missing.jsonl")) == []
+
+    # complete lines only (tiny chunks), resumable from the end of the last one
+    with path.open("rb") as f:
+        lines = list(iter_lines(f, chunk_bytes=7))
+    assert [json.loads(line) for _, line in lines if line.startswith(b'{"n"')] == rows
+    offset = lines[-1][0] + len(lines[-1][1]) + 1
+    with path.open("ab") as f:
+        f.write(b"\n" + json.dumps({"n": 41}).encode("utf-8") + b"\n")
+    assert list(iter_jsonl(path, offset=offset)) == [{"n": 40}, {"n": 41}]
+
+
+def test_watch_mode_resumes_pending_work_of_quiet_plans_every_poll(tmp_path: Path):
+    from agenttalk.heartbeat.app import resume_pending_plans
+
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    ctx = base_ctx(tmp_path, now)
+    inbox = ctx.agent_paths.inbox
+    (inbox / "plan_quiet").mkdir(parents=True)
+    (inbox / "plan_empty" / ".pending").mkdir(parents=True)
+    env = {
+        "schema_version": "1.0",
+        "message_id": "msg_q",
+        "plan_id": "plan_quiet",
+        "producer_agent_id": "agent_planner",
+        "type": "command",
+        "created_at": iso_z(now),
+        "task_id": "task_q",
+        "command_id": "cmd_task_q_001",
+        "payload": {
+            "command": {
+                "schema_version": "1.0",
+                "command_id": "cmd_task_q_001",
+                "plan_id": "plan_quiet",
+                "task_id": "task_q",
+                "command_seq": 1,
+                "dag_ref": {"sha256": "sha256:dag"},
+                "prompt": "do it",
+                "required_inputs": [],
+                "resolved_inputs": None,
+                "wait_for_inputs": False,
+                "score_required": False,
+                "timeout": 60,
+            }
+        },
+    }
+    # claimed before a crash; no inbox event will ever wake this plan again
+    write_envelope(inbox / "plan_quiet" / ".pending" / "msg_q__cmd.msg.json", env)
+
+    assert resume_pending_plans(ctx, ["plan_empty", "plan_quiet"]) == ["plan_quiet"]
+    ack = json.loads((ctx.agent_paths.outbox / "plan_quiet" / "ack_msg_q.json").read_text(encoding="utf-8"))
+    assert ack["status"] == "SUCCEEDED"
+    assert resume_pending_plans(ctx, ["plan_empty", "plan_quiet"]) == []
@@ -7,6 +7,7 @@ from pathlib import Path
 import pytest
 
 import agenttalk_heartbeat
+import agenttalk_monitor
 import agenttalk_router
 import agenttalk_dashboard
 from agenttalk.heartbeat.app import AppContext, load_handler, run_once
@@ -41,6 +42,22 @@ def test_cli_parses_args_and_invokes_runner(tmp_path: Path):
     assert Path(called["schemas_base_dir"]).as_posix().endswith("doc/rule/templates/schemas")
 
 
+def test_monitor_cli_parses_executor_flags(tmp_path: Path):
+    called = {}
+
+    def runner(**kwargs):
+        called.update(kwargs)
+
+    base = ["--agents-root", str(tmp_path / "agents"), "--system-runtime", str(tmp_path / "system_runtime")]
+    agenttalk_monitor.main(base, runner=runner)
+    assert called["config"].executor == "serial"
+
+    agenttalk_monitor.main(base + ["--executor", "process", "--max-workers", "8"], runner=runner)
+    assert (called["config"].executor, called["config"].max_workers) == ("process", 8)
+    with pytest.raises(SystemExit):
+        agenttalk_monitor.main(base + ["--executor", "fibers"], runner=runner)
+
+
 def test_router_cli_parses_args_and_invokes_runner(tmp_path: Path):
     called = {}
 
@@ -55,6 +72,45 @@ def test_router_cli_parses_args_and_invokes_runner(tmp_path: Path):
     )
     assert called["agents_root"] == agents_root
     assert called["system_runtime"] == system_runtime
+    assert called["config"].event_mode is False
+
+    agenttalk_router.main(
+        [
+            "--agents-root",
+            str(agents_root),
+            "--system-runtime",
+            str(system_runtime),
+            "--event-mode",
+            "--full-tick-interval-seconds",
+            "30",
+            "--max-workers",
+            "4",
+        ],
+        runner=runner,
+    )
+    assert called["config"].event_mode is True
+    assert called["config"].full_tick_interval_seconds == 30
+    assert called["config"].max_workers == 4
+    assert called["config"].delivery_log_fsync == "per_tick"
+
+    agenttalk_router.main(
+        [
+            "--agents-root",
+            str(agents_root),
+            "--system-runtime",
+            str(system_runtime),
+            "--delivery-log-fsync",
+            "interval_ms",
+            "--delivery-log-fsync-interval-ms",
+            "250",
+            "--delivery-log-segment-bytes",
+            "0",
+        ],
+        runner=runner,
+    )
+    assert called["config"].delivery_log_fsync == "interval_ms"
+    assert called["config"].delivery_log_fsync_interval_ms == 250
+    assert called["config"].delivery_log_segment_bytes == 0
 
 
 def test_dashboard_app_factory(tmp_path: Path):
@@ -131,3 +187,40 @@ def test_run_once_writes_status_heartbeat(tmp_path: Path):
     heartbeat = __import__("json").loads(paths.status_heartbeat.read_text(encoding="utf-8"))
     assert heartbeat["agent_id"] == "agent_a"
     assert heartbeat["last_heartbeat"] == iso_z(now)
+
+
+def test_sha256_cache_hits_on_unchanged_stat_and_persists(tmp_path: Path):
+    import hashlib
+    import os
+
+    from agenttalk.heartbeat.hashing import Sha256Cache
+
+    p = tmp_path / "payload.bin"
+    p.write_bytes(b"v1")
+    old = 1_700_000_000_000_000_000
+    os.utime(p, ns=(old, old))
+
+    cache = Sha256Cache(persist_path=tmp_path / "sha256_cache.json")
+    expected = "sha256:" + hashlib.sha256(b"v1").hexdigest()
+    assert cache.file_sha256(p) == expected
+    assert cache.file_sha256(p) == expected
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    # atomic replace -> new inode -> miss
+    tmp = tmp_path / "payload.bin.tmp"
+    tmp.write_bytes(b"v2")
+    os.utime(tmp, ns=(old, old))
+    tmp.replace(p)
+    assert cache.file_sha256(p) == "sha256:" + hashlib.sha256(b"v2").hexdigest()
+
+    # files modified just now are hashed but not cached (same-size rewrites inside mtime granularity)
+    fresh = tmp_path / "fresh.bin"
+    fresh.write_bytes(b"aa")
+    cache.file_sha256(fresh)
+    fresh.write_bytes(b"bb")
+    assert cache.file_sha256(fresh) == "sha256:" + hashlib.sha256(b"bb").hexdigest()
+
+    cache.save()
+    reloaded = Sha256Cache(persist_path=tmp_path / "sha256_cache.json")
+    assert reloaded.file_sha256(p) == "sha256:" + hashlib.sha256(b"v2").hexdigest()
+    assert reloaded.stats()["hit_rate"] == 1.0
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 import json
+import os
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 
+import pytest
+
 from agenttalk.monitor.app import MonitorConfig, MonitorContext, run_once
 from agenttalk.monitor.io import file_sha256
 from agenttalk.heartbeat.schema import SchemaRegistry
@@ -734,3 +738,327 @@ def test_monitor_marks_running_timeout_when_consumed_too_long(tmp_path: Path):
     alert_dir = system_runtime / "alerts" / plan_id
     alerts = [json.loads(p.read_text(encoding="utf-8")) for p in alert_dir.glob("alert_*.json")]
     assert any(a.get("type") == "COMMAND_ACK_TIMEOUT" for a in alerts)
+
+
+def test_monitor_aggregates_incrementally_and_skips_unchanged_writes(tmp_path: Path):
+    agents_root = tmp_path / "agents"
+    system_runtime = tmp_path / "system_runtime"
+    plan_id = "plan_inc"
+    (agents_root / "agent_exec" / "outbox" / plan_id).mkdir(parents=True, exist_ok=True)
+    plan_dir = system_runtime / "plans" / plan_id
+    dag = {
+        "schema_version": "1.1",
+        "plan_id": plan_id,
+        "nodes": [
+            {"task_id": "task_1", "assigned_agent_id": "agent_exec", "depends_on": [], "outputs": []},
+            {"task_id": "task_2", "assigned_agent_id": "agent_exec", "depends_on": [], "required_inputs": ["a.md"]},
+        ],
+    }
+    write_json(plan_dir / "task_dag.json", dag)
+    dag_sha = file_sha256(plan_dir / "task_dag.json")
+    write_json(
+        plan_dir / "active_dag_ref.json",
+        {"schema_version": "1.0", "plan_id": plan_id, "task_dag_sha256": dag_sha, "updated_at": None},
+    )
+
+    def delivery(message_id: str, task_id: str, files: list[str]) -> dict:
+        return {
+            "message_id": message_id,
+            "task_id": task_id,
+            "command_id": None,
+            "output_name": None,
+            "status": "DELIVERED",
+            "payload": {"files": [{"path": f, "sha256": "sha256:x"} for f in files]},
+        }
+
+    write_jsonl(plan_dir / "deliveries.jsonl", [delivery("msg_cmd_1", "task_1", [])])
+    write_json(
+        plan_dir / "acks" / "ack_msg_cmd_1.json",
+        {"message_id": "msg_cmd_1", "status": "SUCCEEDED", "finished_at": "2026-01-01T00:00:02Z"},
+    )
+    old = time.time() - 60
+    for p in plan_dir.rglob("*.json*"):
+        os.utime(p, (old, old))
+
+    ctx = MonitorContext(
+        agents_root=agents_root,
+        system_runtime=system_runtime,
+        schemas=SchemaRegistry(Path("doc/rule/templates/schemas")),
+        config=MonitorConfig(schema_validation_enabled=False),
+    )
+    run_once(ctx)
+    status_path = plan_dir / "plan_status.json"
+    first = status_path.stat()
+    cache = ctx.state.plans[plan_id]
+    assert cache.deliveries.lines_parsed == 1 and cache.acks.misses == 1
+
+    # nothing changed: ack served from cache, no delivery line re-parsed, plan_status.json not rewritten
+    run_once(ctx)
+    assert cache.deliveries.lines_parsed == 1 and (cache.acks.hits, cache.acks.misses) == (1, 1)
+    assert (status_path.stat().st_ino, status_path.stat().st_mtime_ns) == (first.st_ino, first.st_mtime_ns)
+
+    # an appended delivery is folded in alone and the changed status is written
+    with (plan_dir / "deliveries.jsonl").open("a", encoding="utf-8") as f:
+        f.write(json.dumps(delivery("msg_art_1", "task_1", ["a.md"])) + "\n")
+    run_once(ctx)
+    assert cache.deliveries.lines_parsed == 2
+    status = json.loads(status_path.read_text(encoding="utf-8"))
+    assert {t["task_id"]: t["state"] for t in status["tasks"]} == {"task_1": "COMPLETED", "task_2": "READY"}
+    assert status_path.stat().st_ino != first.st_ino
+
+
+def test_monitor_picks_terminal_ack_among_task_messages(tmp_path: Path):
+    system_runtime = tmp_path / "system_runtime"
+    plan_id = "plan_multi"
+    plan_dir = system_runtime / "plans" / plan_id
+    dag = {
+        "schema_version": "1.1",
+        "plan_id": plan_id,
+        "nodes": [
+            {"task_id": f"task_{i}", "assigned_agent_id": "agent_exec", "depends_on": [], "outputs": []}
+            for i in (1, 2, 3)
+        ],
+    }
+    write_json(plan_dir / "task_dag.json", dag)
+    write_json(
+        plan_dir / "active_dag_ref.json",
+        {"schema_version": "1.0", "plan_id": plan_id, "task_dag_sha256": file_sha256(plan_dir / "task_dag.json")},
+    )
+    routes = [("msg_a", "task_1"), ("msg_b", "task_2"), ("msg_c", "task_1"), ("msg_d", "task_2")]
+    write_jsonl(
+        plan_dir / "deliveries.jsonl",
+        [{"message_id": m, "task_id": t, "status": "DELIVERED", "payload": {"files": []}} for m, t in routes],
+    )
+    for mid, status in [("msg_a", "CONSUMED"), ("msg_c", "SUCCEEDED"), ("msg_d", "CONSUMED")]:
+        write_json(plan_dir / "acks" / f"ack_{mid}.json", {"message_id": mid, "status": status})
+
+    ctx = MonitorContext(
+        agents_root=tmp_path / "agents",
+        system_runtime=system_runtime,
+        schemas=SchemaRegistry(Path("doc/rule/templates/schemas")),
+        config=MonitorConfig(schema_validation_enabled=False),
+    )
+    run_once(ctx)
+    status = json.loads((plan_dir / "plan_status.json").read_text(encoding="utf-8"))
+    states = {t["task_id"]: t["state"] for t in status["tasks"]}
+    assert states == {"task_1": "COMPLETED", "task_2": "RUNNING", "task_3": "READY"}
+
+
+def test_delivered_artifact_index_selectors_match_linear_scan():
+    import fnmatch
+
+    from agenttalk.monitor.app import _command_inputs_missing, _inputs_satisfied
+    from agenttalk.monitor.cache import DeliveredArtifactIndex
+
+    idx = DeliveredArtifactIndex()
+    idx.add_output("requirements")
+    for p in ["docs/a.md", "src/main.py", "docs/a.md"]:
+        idx.add_path(p)
+    paths = ["docs/a.md", "src/main.py"]
+
+    for pattern in ["docs/*.md", "*.py", "*.txt", "docs/[ab].md", "src/?ain.py"]:
+        assert idx.matches_glob(pattern) == any(fnmatch.fnmatch(p, pattern) for p in paths)
+    # a pattern that did not match is re-checked against paths delivered later only
+    assert not idx.matches_glob("*.txt")
+    idx.add_path("notes.txt")
+    assert idx.matches_glob("*.txt")
+
+    node = {
+        "inputs": [
+            {"required": True, "selector": {"type": "by_output_name", "value": "requirements"}},
+            {"required": True, "selector": {"type": "by_file_name", "value": "src/main.py"}},
+            {"required": True, "selector": {"type": "by_glob", "value": "docs/*.md"}},
+            {"required": False, "selector": {"type": "by_glob", "value": "*.pdf"}},
+        ]
+    }
+    assert _inputs_satisfied(node, delivered=idx)
+    assert not _inputs_satisfied({"inputs": [{"required": True, "selector": {"type": "by_glob", "value": "*.pdf"}}]}, delivered=idx)
+    assert _command_inputs_missing({"required_inputs": ["docs/a.md", "b.md"]}, idx) == ["b.md"]
+    # malformed selector values (unhashable) are simply not delivered
+    assert not idx.has_path(["docs/a.md"]) and not idx.has_output_name({"name": "requirements"})
+    assert not _inputs_satisfied({"inputs": [{"required": True, "selector": {"type": "by_file_name", "value": []}}]}, delivered=idx)
+
+
+def test_monitor_derives_ready_in_one_pass_when_dependency_listed_later(tmp_path: Path):
+    from agenttalk.router.dag import parse_dag
+
+    agents_root = tmp_path / "agents"
+    system_runtime = tmp_path / "system_runtime"
+    plan_id = "plan_topo"
+    plan_dir = system_runtime / "plans" / plan_id
+    nodes = [
+        {"task_id": "task_3", "assigned_agent_id": "agent_b", "depends_on": ["task_2"]},
+        {"task_id": "task_2", "assigned_agent_id": "agent_b", "depends_on": ["task_1"]},
+        {"task_id": "task_1", "assigned_agent_id": "agent_a", "depends_on": []},
+    ]
+    dag = {"schema_version": "1.1", "plan_id": plan_id, "nodes": nodes}
+    assert parse_dag(dag).topo_order == (2, 1, 0)
+    cyclic = [{"task_id": "x", "depends_on": ["y"]}, {"task_id": "y", "depends_on": ["x"]}, {"task_id": "z"}]
+    assert parse_dag({**dag, "nodes": cyclic}).topo_order == (2, 0, 1)
+
+    write_json(plan_dir / "task_dag.json", dag)
+    write_json(
+        plan_dir / "active_dag_ref.json",
+        {"schema_version": "1.0", "plan_id": plan_id, "task_dag_sha256": file_sha256(plan_dir / "task_dag.json")},
+    )
+    write_json(
+        agents_root / "agent_a" / "outbox" / plan_id / "task_state_task_1.json",
+        {"task_id": "task_1", "state": "COMPLETED", "updated_at": "2026-01-01T00:00:00Z", "blocking": None},
+    )
+
+    ctx = MonitorContext(
+        agents_root=agents_root,
+        system_runtime=system_runtime,
+        schemas=SchemaRegistry(Path("doc/rule/templates/schemas")),
+        config=MonitorConfig(schema_validation_enabled=False),
+    )
+    run_once(ctx)
+    status = json.loads((plan_dir / "plan_status.json").read_text(encoding="utf-8"))
+    assert [(t["task_id"], t["state"]) for t in status["tasks"]] == [
+        ("task_3", "PENDING"),
+        ("task_2", "READY"),
+        ("task_1", "COMPLETED"),
+    ]
+
+
+def test_monitor_propagates_readiness_along_dependents_across_cycles(tmp_path: Path):
+    agents_root = tmp_path / "agents"
+    system_runtime = tmp_path / "system_runtime"
+    plan_id = "plan_incremental"
+    plan_dir = system_runtime / "plans" / plan_id
+    nodes = [
+        {"task_id": "task_1", "assigned_agent_id": "agent_a", "depends_on": []},
+        {"task_id": "task_2", "assigned_agent_id": "agent_b", "depends_on": ["task_1"]},
+        {"task_id": "task_3", "assigned_agent_id": "agent_b", "depends_on": ["task_1", "task_1"]},
+        {"task_id": "task_4", "assigned_agent_id": "agent_b", "depends_on": ["task_2", "task_3"]},
+    ]
+    write_json(plan_dir / "task_dag.json", {"schema_version": "1.1", "plan_id": plan_id, "nodes": nodes})
+    write_json(
+        plan_dir / "active_dag_ref.json",
+        {"schema_version": "1.0", "plan_id": plan_id, "task_dag_sha256": file_sha256(plan_dir / "task_dag.json")},
+    )
+    ctx = MonitorContext(
+        agents_root=agents_root,
+        system_runtime=system_runtime,
+        schemas=SchemaRegistry(Path("doc/rule/templates/schemas")),
+        config=MonitorConfig(schema_validation_enabled=False),
+    )
+
+    def states() -> list[str]:
+        run_once(ctx)
+        status = json.loads((plan_dir / "plan_status.json").read_text(encoding="utf-8"))
+        return [t["state"] for t in status["tasks"]]
+
+    def task_state(task_id: str, agent_id: str, state: str) -> None:
+        write_json(
+            agents_root / agent_id / "outbox" / plan_id / f"task_state_{task_id}.json",
+            {"task_id": task_id, "state": state, "updated_at": "2026-01-01T00:00:00Z", "blocking": None},
+        )
+
+    assert states() == ["READY", "PENDING", "PENDING", "PENDING"]
+    readiness = ctx.state.plans[plan_id].readiness
+    assert readiness.unmet == [0, 1, 1, 2] and readiness.propagated == 0
+    pending = readiness.derived[3][1]
+    assert states() == ["READY", "PENDING", "PENDING", "PENDING"]
+    assert readiness.derived[3][1] is pending  # nothing changed: derived rows are reused
+
+    # task_1 completing only touches its two dependents
+    task_state("task_1", "agent_a", "COMPLETED")
+    assert states() == ["COMPLETED", "READY", "READY", "PENDING"]
+    assert readiness.propagated == 2 and readiness.unmet == [0, 0, 0, 2]
+
+    task_state("task_2", "agent_b", "COMPLETED")
+    task_state("task_3", "agent_b", "COMPLETED")
+    assert states() == ["COMPLETED", "COMPLETED", "COMPLETED", "READY"]
+    assert readiness.propagated == 4
+
+    # a dependency leaving COMPLETED is propagated back
+    task_state("task_1", "agent_a", "RUNNING")
+    assert states() == ["RUNNING", "COMPLETED", "COMPLETED", "READY"]
+    assert readiness.unmet == [0, 1, 1, 0] and readiness.propagated == 6
+
+
+def test_monitor_reads_dags_leniently_while_the_router_stays_strict(tmp_path: Path):
+    from agenttalk.monitor.app import _aggregate_plan
+    from agenttalk.router.dag import load_dag
+    from agenttalk.router.errors import DagInvalid
+
+    agents_root = tmp_path / "agents"
+    system_runtime = tmp_path / "system_runtime"
+    plan_id = "plan_legacy"
+    plan_dir = system_runtime / "plans" / plan_id
+    dag = {
+        "schema_version": "1.0",
+        "plan_id": plan_id,
+        "nodes": [{"task_id": "task_1", "assigned_agent_id": "agent_a", "depends_on": []}],
+    }
+    write_json(plan_dir / "task_dag.json", dag)
+    dag_sha = file_sha256(plan_dir / "task_dag.json")
+    write_json(plan_dir / "active_dag_ref.json", {"schema_version": "1.0", "plan_id": plan_id, "task_dag_sha256": dag_sha})
+    ctx = MonitorContext(
+        agents_root=agents_root,
+        system_runtime=system_runtime,
+        schemas=SchemaRegistry(Path("doc/rule/templates/schemas")),
+        config=MonitorConfig(schema_validation_enabled=False),
+    )
+
+    # a DAG the router rejects is still reported on by the monitor
+    with pytest.raises(DagInvalid):
+        load_dag(plan_dir / "task_dag.json")
+    result = _aggregate_plan(ctx, plan_id)
+    assert result.error is None
+    assert [(t["task_id"], t["state"]) for t in result.status["tasks"]] == [("task_1", "READY")]
+
+    # a ref without task_dag_sha256 is a sha mismatch, not ACTIVE_DAG_REF_INVALID
+    write_json(plan_dir / "active_dag_ref.json", {"schema_version": "1.0", "plan_id": plan_id})
+    result = _aggregate_plan(ctx, plan_id)
+    assert result.status is None
+    assert result.error == f"active_dag_ref mismatch: None != {dag_sha}"
+
+
+def test_monitor_parallel_executors_match_serial_with_single_writer(tmp_path: Path):
+    import dataclasses
+
+    system_runtime = tmp_path / "system_runtime"
+    for n in range(4):
+        plan_id = f"plan_{n}"
+        plan_dir = system_runtime / "plans" / plan_id
+        dag = {
+            "schema_version": "1.1",
+            "plan_id": plan_id,
+            "nodes": [{"task_id": "task_1", "assigned_agent_id": "agent_a", "depends_on": [], "outputs": []}],
+        }
+        write_json(plan_dir / "task_dag.json", dag)
+        write_json(
+            plan_dir / "active_dag_ref.json",
+            {"schema_version": "1.0", "plan_id": plan_id, "task_dag_sha256": file_sha256(plan_dir / "task_dag.json")},
+        )
+    (system_runtime / "plans" / "plan_broken").mkdir(parents=True)
+
+    base = MonitorContext(
+        agents_root=tmp_path / "agents",
+        system_runtime=system_runtime,
+        schemas=SchemaRegistry(Path("doc/rule/templates/schemas")),
+        config=MonitorConfig(schema_validation_enabled=False),
+    )
+    results = {}
+    for executor in ("serial", "thread", "process"):
+        ctx = dataclasses.replace(base, config=dataclasses.replace(base.config, executor=executor, max_workers=3))
+        for p in system_runtime.glob("plans/*/plan_status.json"):
+            p.unlink()
+        try:
+            assert run_once(ctx) == ["plan_0", "plan_1", "plan_2", "plan_3", "plan_broken"]
+        finally:
+            ctx.state.shutdown()
+        results[executor] = {
+            p.parent.name: json.loads(p.read_text(encoding="utf-8"))["tasks"]
+            for p in system_runtime.glob("plans/*/plan_status.json")
+        }
+        alerts = list((system_runtime / "alerts" / "plan_broken").glob("alert_*.json"))
+        assert len(alerts) == 1  # exactly one failure alert per cycle, written by run_once
+        alerts[0].unlink()
+    assert results["serial"] == results["thread"] == results["process"]
+    assert sorted(results["serial"]) == ["plan_0", "plan_1", "plan_2", "plan_3"]
+
+    with pytest.raises(ValueError):
+        run_once(dataclasses.replace(base, config=dataclasses.replace(base.config, executor="fibers")))
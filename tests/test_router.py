@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import json
+import os
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -523,3 +525,1081 @@ def test_router_refreshes_latest_release_manifest_pointer(tmp_path: Path):
     assert ptr.exists()
     obj = json.loads(ptr.read_text(encoding="utf-8"))
     assert obj["release_id"] == "release_2"
+
+
+def test_delivery_log_index_parses_only_appended_lines_and_resumes_from_checkpoint(tmp_path: Path):
+    from agenttalk.router.delivery_log import DeliveryLog, DeliveryLogIndex
+
+    log_path = tmp_path / "deliveries.jsonl"
+    ckpt_path = tmp_path / "deliveries.checkpoint.json"
+    log = DeliveryLog(log_path)
+
+    def entry(mid: str, sha: str, status: str = "DELIVERED") -> dict:
+        return {"message_id": mid, "envelope_sha256": sha, "status": status}
+
+    log.append(entry("m1", "sha256:a"))
+    log.append(entry("m2", "sha256:b", status="SKIPPED_DUPLICATE"))
+    index = DeliveryLogIndex(log_path, ckpt_path, checkpoint_every_bytes=1, checkpoint_growth=0)
+    index.refresh()
+    assert set(index.delivered) == {("m1", "sha256:a")}
+    assert index.lines_parsed == 2
+
+    log.append(entry("m3", "sha256:c"))
+    index.refresh()
+    assert index.lines_parsed == 3
+    assert index.delivered.shas_by_message_id == {"m1": {"sha256:a"}, "m3": {"sha256:c"}}
+    assert ckpt_path.exists()
+
+    # restart: the checkpoint restores state and only the new tail is parsed
+    log.append(entry("m4", "sha256:d"))
+    restarted = DeliveryLogIndex(log_path, ckpt_path)
+    restarted.refresh()
+    assert restarted.lines_parsed == 1
+    assert ("m4", "sha256:d") in restarted.delivered and ("m1", "sha256:a") in restarted.delivered
+
+    # rewritten log (different content) forces a full rescan
+    log_path.write_text(json.dumps(entry("m9", "sha256:z")) + "\n", encoding="utf-8")
+    restarted.refresh()
+    assert set(restarted.delivered) == {("m9", "sha256:z")}
+
+
+def test_delivery_log_index_checkpoints_less_often_as_the_log_grows(tmp_path: Path):
+    from agenttalk.router.delivery_log import DeliveryLogIndex, DeliveryLogWriter
+
+    log_path = tmp_path / "deliveries.jsonl"
+    ckpt_path = tmp_path / "deliveries.checkpoint.json"
+    writer = DeliveryLogWriter(log_path)
+    index = DeliveryLogIndex(log_path, ckpt_path, checkpoint_every_bytes=1, checkpoint_growth=1.0)
+    for n in range(64):
+        writer.append({"message_id": f"m{n}", "envelope_sha256": f"sha256:{n:04d}", "status": "DELIVERED"})
+        writer.flush()
+        index.refresh()
+
+    # saves happen each time the log doubles past the last checkpoint, not on every refresh
+    assert index.checkpoints_saved == 7
+    obj = json.loads(ckpt_path.read_text(encoding="utf-8"))
+    assert obj["log_bytes"] == index._saved_log_bytes <= log_path.stat().st_size
+
+    restarted = DeliveryLogIndex(log_path, ckpt_path, checkpoint_every_bytes=1, checkpoint_growth=1.0)
+    restarted.refresh()
+    assert restarted.lines_parsed == 64 - len(obj["delivered"])
+    assert len(restarted.delivered.shas_by_message_id) == 64
+    assert restarted.checkpoints_saved == 0  # the resumed tail is below the grown interval
+
+
+def test_router_deadletters_message_id_reused_with_different_payload(tmp_path: Path):
+    ctx, agents_root, system_runtime = make_ctx(tmp_path)
+    ensure_agent(agents_root, "agent_prod")
+    ensure_agent(agents_root, "agent_consumer")
+
+    plan_id = "plan_reuse"
+    dag = {
+        "schema_version": "1.1",
+        "plan_id": plan_id,
+        "nodes": [
+            {
+                "task_id": "task_src",
+                "assigned_agent_id": "agent_prod",
+                "depends_on": [],
+                "outputs": [{"name": "o", "deliver_to": ["agent_consumer"], "idempotency_key": "k"}],
+            }
+        ],
+    }
+    write_plan_dag(system_runtime, plan_id, dag)
+
+    outbox_plan = agents_root / "agent_prod" / "outbox" / plan_id
+    outbox_plan.mkdir(parents=True, exist_ok=True)
+    env = {
+        "schema_version": "1.0",
+        "message_id": "msg_reused",
+        "plan_id": plan_id,
+        "producer_agent_id": "agent_prod",
+        "type": "artifact",
+        "created_at": "2026-01-01T00:00:00Z",
+        "task_id": "task_src",
+        "output_name": "o",
+        "payload": {"files": []},
+    }
+    write_json(outbox_plan / "a.msg.json", env)
+    tick(ctx)
+
+    env["created_at"] = "2026-01-02T00:00:00Z"
+    write_json(outbox_plan / "a.msg.json", env)
+    tick(ctx)
+
+    dlq = [json.loads(p.read_text(encoding="utf-8")) for p in (system_runtime / "deadletter" / plan_id).glob("*.json")]
+    assert any(d["reason"]["code"] == "MESSAGE_ID_REUSED_WITH_DIFFERENT_PAYLOAD" for d in dlq)
+
+
+def test_router_command_index_supersedes_across_ticks_and_rebuilds_when_corrupt(tmp_path: Path):
+    ctx, agents_root, system_runtime = make_ctx(tmp_path)
+    ensure_agent(agents_root, "agent_prod")
+    ensure_agent(agents_root, "agent_exec")
+
+    plan_id = "plan_cmd_index"
+    dag = {
+        "schema_version": "1.1",
+        "plan_id": plan_id,
+        "nodes": [{"task_id": "task_exec", "assigned_agent_id": "agent_exec", "depends_on": [], "outputs": []}],
+    }
+    dag_sha = write_plan_dag(system_runtime, plan_id, dag)
+    outbox_plan = agents_root / "agent_prod" / "outbox" / plan_id
+
+    def cmd_env(message_id: str, seq: int) -> dict:
+        command_id = f"cmd_task_exec_{seq:03d}"
+        return {
+            "schema_version": "1.0",
+            "message_id": message_id,
+            "plan_id": plan_id,
+            "producer_agent_id": "agent_prod",
+            "type": "command",
+            "created_at": "2026-01-01T00:00:00Z",
+            "task_id": "task_exec",
+            "command_id": command_id,
+            "payload": {
+                "command": {
+                    "schema_version": "1.0",
+                    "command_id": command_id,
+                    "plan_id": plan_id,
+                    "task_id": "task_exec",
+                    "command_seq": seq,
+                    "dag_ref": {"sha256": dag_sha},
+                    "prompt": "do it",
+                    "required_inputs": [],
+                    "resolved_inputs": None,
+                    "wait_for_inputs": False,
+                    "score_required": False,
+                    "timeout": 60,
+                }
+            },
+        }
+
+    write_json(outbox_plan / "c2.msg.json", cmd_env("msg_c2", 2))
+    tick(ctx)
+    index_path = system_runtime / "plans" / plan_id / "command_index.json"
+    index_obj = json.loads(index_path.read_text(encoding="utf-8"))
+    assert index_obj["entries"]["task_exec"][dag_sha]["max_seq"] == 2
+
+    # corrupt index + a fresh router process: the index is rebuilt from the archive
+    index_path.write_text("{", encoding="utf-8")
+    ctx2, _, _ = make_ctx(tmp_path)
+    (outbox_plan / "c2.msg.json").unlink()
+    write_json(outbox_plan / "c1.msg.json", cmd_env("msg_c1", 1))
+    tick(ctx2)
+
+    inbox_plan = agents_root / "agent_exec" / "inbox" / plan_id
+    assert not (inbox_plan / "c1.msg.json").exists()
+    deliveries = read_jsonl(system_runtime / "plans" / plan_id / "deliveries.jsonl")
+    skipped = [d for d in deliveries if d["message_id"] == "msg_c1" and d["status"] == "SKIPPED_SUPERSEDED"]
+    assert skipped and skipped[0]["superseded_by_message_id"] == "msg_c2"
+    index_obj = json.loads(index_path.read_text(encoding="utf-8"))
+    assert index_obj["entries"]["task_exec"][dag_sha]["message_id"] == "msg_c2"
+
+    # an archived command without a task_id is not indexed under a literal "None" key
+    from agenttalk.heartbeat.command_index import CommandSeqIndex
+
+    no_task = cmd_env("msg_c9", 9)
+    del no_task["payload"]["command"]["task_id"]
+    write_json(system_runtime / "plans" / plan_id / "commands" / "msg_c9__c9.msg.json", no_task)
+    rebuilt = CommandSeqIndex(system_runtime / "plans" / plan_id / "commands", index_path, writable=False)
+    assert set(rebuilt.latest_for_dag(dag_sha)) == {"task_exec"}
+
+
+def test_command_index_rescans_archive_written_in_the_same_mtime_tick(tmp_path: Path):
+    from agenttalk.heartbeat.command_index import CommandSeqIndex
+
+    commands_dir = tmp_path / "commands"
+
+    def archive(seq: int) -> None:
+        cmd = {"task_id": "t1", "command_seq": seq, "command_id": f"c{seq}", "dag_ref": {"sha256": "d"}}
+        env = {"message_id": f"msg_c{seq}", "type": "command", "payload": {"command": cmd}}
+        write_json(commands_dir / f"msg_c{seq}.msg.json", env)
+
+    archive(1)
+    tick_ns = commands_dir.stat().st_mtime_ns
+    reader = CommandSeqIndex(commands_dir, tmp_path / "index.json", writable=False)
+    assert reader.get("t1", "d").max_seq == 1
+
+    # a second archive lands within the same mtime tick: the directory mtime looks unchanged
+    archive(2)
+    os.utime(commands_dir, ns=(tick_ns, tick_ns))
+    assert reader.get("t1", "d").max_seq == 2
+
+    # once the mtime is out of the racy window it is trusted again (no rescan per lookup)
+    old_ns = time.time_ns() - 10_000_000_000
+    os.utime(commands_dir, ns=(old_ns, old_ns))
+    reader.refresh()
+    rebuilds = reader.rebuilds
+    assert reader.get("t1", "d").max_seq == 2 and reader.rebuilds == rebuilds
+
+
+def test_scan_outbox_plan_classifies_entries_in_one_listing(tmp_path: Path):
+    from agenttalk.router.outbox import list_subdirs, scan_outbox_plan
+
+    plan_dir = tmp_path / "outbox" / "p1"
+    plan_dir.mkdir(parents=True)
+    for name in [
+        "m2.msg.json",
+        "m1.msg.json",
+        "m3.msg.json.tmp",
+        "ack_m1.json",
+        "human_intervention_request_r1.json",
+        "human_intervention_response_r1.json",
+        "decision_record_d1.json",
+        "release_manifest_v1.json",
+        "notes.txt",
+    ]:
+        (plan_dir / name).write_text("{}", encoding="utf-8")
+    (plan_dir / "ack_dir.json").mkdir()
+    (tmp_path / "outbox" / ".hidden").mkdir()
+
+    snap = scan_outbox_plan("agent_a", plan_dir)
+    assert [p.name for p in snap.envelopes] == ["m1.msg.json", "m2.msg.json"]
+    assert [p.name for p in snap.acks] == ["ack_m1.json"]
+    assert [p.name for p in snap.human_requests] == ["human_intervention_request_r1.json"]
+    assert [p.name for p in snap.human_responses] == ["human_intervention_response_r1.json"]
+    assert [p.name for p in snap.decision_records] == ["decision_record_d1.json"]
+    assert [p.name for p in snap.release_manifests] == ["release_manifest_v1.json"]
+
+    assert scan_outbox_plan("agent_a", tmp_path / "missing").envelopes == []
+    assert list_subdirs(tmp_path / "outbox") == ["p1"]
+
+
+def test_router_reads_each_outbox_envelope_once_per_tick(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    ctx, agents_root, system_runtime = make_ctx(tmp_path)
+    ensure_agent(agents_root, "agent_prod")
+    ensure_agent(agents_root, "agent_exec")
+
+    plan_id = "plan_parse_once"
+    dag = {
+        "schema_version": "1.1",
+        "plan_id": plan_id,
+        "nodes": [{"task_id": "task_exec", "assigned_agent_id": "agent_exec", "depends_on": [], "outputs": []}],
+    }
+    dag_sha = write_plan_dag(system_runtime, plan_id, dag)
+    outbox_plan = agents_root / "agent_prod" / "outbox" / plan_id
+    for name, seq in [("c1.msg.json", 1), ("c2.msg.json", 2), ("c3.msg.json", 3)]:
+        command_id = f"cmd_task_exec_{seq:03d}"
+        write_json(
+            outbox_plan / name,
+            {
+                "schema_version": "1.0",
+                "message_id": f"msg_c{seq}",
+                "plan_id": plan_id,
+                "producer_agent_id": "agent_prod",
+                "type": "command",
+                "created_at": "2026-01-01T00:00:00Z",
+                "task_id": "task_exec",
+                "command_id": command_id,
+                "payload": {
+                    "command": {
+                        "command_id": command_id,
+                        "task_id": "task_exec",
+                        "command_seq": seq,
+                        "dag_ref": {"sha256": dag_sha},
+                    }
+                },
+            },
+        )
+
+    # Path.read_bytes/read_text/file_sha256 all go through Path.open
+    opened: list[str] = []
+    real_open = Path.open
+
+    def tracking_open(self: Path, *args, **kwargs):
+        if self.parent == outbox_plan:
+            opened.append(self.name)
+        return real_open(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "open", tracking_open)
+    tick(ctx)
+    monkeypatch.undo()
+
+    assert sorted(opened) == ["c1.msg.json", "c2.msg.json", "c3.msg.json"]
+    deliveries = read_jsonl(system_runtime / "plans" / plan_id / "deliveries.jsonl")
+    skipped = {d["message_id"]: d for d in deliveries if d["status"] == "SKIPPED_SUPERSEDED"}
+    assert set(skipped) == {"msg_c1", "msg_c2"}
+    assert skipped["msg_c1"]["superseded_by_message_id"] == "msg_c3"
+    assert skipped["msg_c1"]["envelope_sha256"] == file_sha256(outbox_plan / "c1.msg.json")
+    assert [d["message_id"] for d in deliveries if d["status"] == "DELIVERED"] == ["msg_c3"]
+
+
+def test_router_event_step_routes_only_changed_outbox(tmp_path: Path):
+    from agenttalk.heartbeat.watch import inotify_available
+    from agenttalk.router.app import event_step
+    from agenttalk.router.events import OutboxWatcher
+
+    if not inotify_available():
+        pytest.skip("inotify not available")
+
+    ctx, agents_root, system_runtime = make_ctx(tmp_path)
+    ensure_agent(agents_root, "agent_prod")
+    ensure_agent(agents_root, "agent_consumer")
+    for plan_id in ["plan_ev_1", "plan_ev_2"]:
+        write_plan_dag(
+            system_runtime,
+            plan_id,
+            {
+                "schema_version": "1.1",
+                "plan_id": plan_id,
+                "nodes": [
+                    {
+                        "task_id": "task_src",
+                        "assigned_agent_id": "agent_prod",
+                        "depends_on": [],
+                        "outputs": [{"name": "notes", "deliver_to": ["agent_consumer"], "idempotency_key": "k1"}],
+                    }
+                ],
+            },
+        )
+
+    def write_artifact(plan_id: str) -> None:
+        write_json(
+            agents_root / "agent_prod" / "outbox" / plan_id / "notes.msg.json",
+            {
+                "schema_version": "1.0",
+                "message_id": f"msg_{plan_id}",
+                "plan_id": plan_id,
+                "producer_agent_id": "agent_prod",
+                "type": "artifact",
+                "created_at": "2026-01-01T00:00:00Z",
+                "task_id": "task_src",
+                "output_name": "notes",
+                "payload": {"files": []},
+            },
+        )
+
+    (agents_root / "agent_prod" / "outbox" / "plan_ev_1").mkdir(parents=True)
+    with OutboxWatcher(ctx.agents) as watcher:
+        assert watcher.sync() == {"plan_ev_1": {"agent_prod"}}
+
+        write_artifact("plan_ev_1")
+        assert event_step(ctx, watcher, timeout_seconds=5) == {"plan_ev_1": {"agent_prod"}}
+        assert (agents_root / "agent_consumer" / "inbox" / "plan_ev_1" / "notes.msg.json").exists()
+
+        # a plan directory that appears later is picked up (and scanned) via the outbox directory watch
+        write_artifact("plan_ev_2")
+        routed = event_step(ctx, watcher, timeout_seconds=5)
+        assert routed is not None and routed.get("plan_ev_2") == {"agent_prod"}
+        assert (agents_root / "agent_consumer" / "inbox" / "plan_ev_2" / "notes.msg.json").exists()
+
+        assert event_step(ctx, watcher, timeout_seconds=0) == {}
+
+
+def test_router_routes_plans_concurrently_and_skips_locked_plan(tmp_path: Path):
+    import dataclasses
+
+    from agenttalk.router.plan_lock import plan_lock
+
+    ctx, agents_root, system_runtime = make_ctx(tmp_path)
+    ctx = dataclasses.replace(ctx, config=dataclasses.replace(ctx.config, max_workers=4))
+    ensure_agent(agents_root, "agent_prod")
+    ensure_agent(agents_root, "agent_consumer")
+    plan_ids = [f"plan_par_{i}" for i in range(6)]
+    for plan_id in plan_ids:
+        write_plan_dag(
+            system_runtime,
+            plan_id,
+            {
+                "schema_version": "1.1",
+                "plan_id": plan_id,
+                "nodes": [
+                    {
+                        "task_id": "task_src",
+                        "assigned_agent_id": "agent_prod",
+                        "depends_on": [],
+                        "outputs": [{"name": "notes", "deliver_to": ["agent_consumer"], "idempotency_key": "k1"}],
+                    }
+                ],
+            },
+        )
+        for i in range(3):
+            write_json(
+                agents_root / "agent_prod" / "outbox" / plan_id / f"notes_{i}.msg.json",
+                {
+                    "schema_version": "1.0",
+                    "message_id": f"msg_{plan_id}_{i}",
+                    "plan_id": plan_id,
+                    "producer_agent_id": "agent_prod",
+                    "type": "artifact",
+                    "created_at": "2026-01-01T00:00:00Z",
+                    "task_id": "task_src",
+                    "output_name": "notes",
+                    "payload": {"files": []},
+                },
+            )
+
+    locked_plan = plan_ids[0]
+    with plan_lock(system_runtime / "plans" / locked_plan / ".router.lock") as held:
+        assert held
+        tick(ctx)
+        assert read_jsonl(system_runtime / "plans" / locked_plan / "deliveries.jsonl") == []
+
+    for plan_id in plan_ids[1:]:
+        deliveries = read_jsonl(system_runtime / "plans" / plan_id / "deliveries.jsonl")
+        # per-plan order is preserved: envelopes are routed in file-name order
+        assert [d["message_id"] for d in deliveries] == [f"msg_{plan_id}_{i}" for i in range(3)]
+
+    tick(ctx)
+    deliveries = read_jsonl(system_runtime / "plans" / locked_plan / "deliveries.jsonl")
+    assert [d["status"] for d in deliveries] == ["DELIVERED"] * 3
+
+
+def test_router_artifact_fanout_copies_concurrently_keeping_envelope_last(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    import threading
+    import time
+
+    import agenttalk.router.app as router_app
+
+    ctx, agents_root, system_runtime = make_ctx(tmp_path)
+    ensure_agent(agents_root, "agent_prod")
+    reviewers = [f"agent_rev_{i:02d}" for i in range(8)]
+    for agent_id in reviewers:
+        ensure_agent(agents_root, agent_id)
+
+    plan_id = "plan_fanout"
+    write_plan_dag(
+        system_runtime,
+        plan_id,
+        {
+            "schema_version": "1.1",
+            "plan_id": plan_id,
+            "nodes": [
+                {
+                    "task_id": "task_src",
+                    "assigned_agent_id": "agent_prod",
+                    "depends_on": [],
+                    "outputs": [
+                        {"name": "design", "deliver_to": reviewers + ["agent_missing"], "idempotency_key": "k1"}
+                    ],
+                }
+            ],
+        },
+    )
+    outbox_plan = agents_root / "agent_prod" / "outbox" / plan_id
+    outbox_plan.mkdir(parents=True)
+    (outbox_plan / "a.md").write_text("a", encoding="utf-8")
+    (outbox_plan / "b.md").write_text("b", encoding="utf-8")
+    write_json(
+        outbox_plan / "design.msg.json",
+        {
+            "schema_version": "1.0",
+            "message_id": "msg_design",
+            "plan_id": plan_id,
+            "producer_agent_id": "agent_prod",
+            "type": "artifact",
+            "created_at": "2026-01-01T00:00:00Z",
+            "task_id": "task_src",
+            "output_name": "design",
+            "payload": {"files": [{"path": "a.md", "sha256": "x"}, {"path": "b.md", "sha256": "y"}]},
+        },
+    )
+
+    copies: list[tuple[str, str, str]] = []
+    real_copy = router_app.atomic_copy
+
+    def slow_copy(src: Path, dst: Path, **kwargs) -> None:
+        time.sleep(0.01)
+        real_copy(src, dst, **kwargs)
+        copies.append((threading.current_thread().name, dst.parent.parent.parent.name, dst.name))
+
+    monkeypatch.setattr(router_app, "atomic_copy", slow_copy)
+    tick(ctx)
+
+    for agent_id in reviewers:
+        per_target = [name for _, target, name in copies if target == agent_id]
+        # the envelope is staged last and published (renamed) only after its DELIVERED entry is written
+        assert per_target == ["a.md", "b.md", "design.msg.json.staged"]
+        assert (agents_root / agent_id / "inbox" / plan_id / "design.msg.json").exists()
+        assert not (agents_root / agent_id / "inbox" / plan_id / "design.msg.json.staged").exists()
+    assert len({thread for thread, _, _ in copies}) > 1
+
+    deliveries = read_jsonl(system_runtime / "plans" / plan_id / "deliveries.jsonl")
+    # delivered targets are logged in deliver_to order, then the missing target deadletters the envelope
+    assert [d["to_agent_id"] for d in deliveries if d["status"] == "DELIVERED"] == reviewers
+    assert deliveries[-1]["status"] == "DEADLETTERED"
+    assert deliveries[-1]["error"]["code"] == "TARGET_AGENT_NOT_FOUND"
+
+
+def test_router_fanout_logs_every_copied_target_before_raising(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    import agenttalk.router.app as router_app
+
+    ctx, agents_root, system_runtime = make_ctx(tmp_path)
+    reviewers = ["agent_a", "agent_b", "agent_c", "agent_d"]
+    for agent_id in ["agent_prod", *reviewers]:
+        ensure_agent(agents_root, agent_id)
+    plan_id = "plan_fanout_error"
+    outputs = {
+        "design": reviewers,
+        "no_target": ["agent_missing", "agent_a"],
+        "no_payload": ["agent_a", "agent_missing"],
+    }
+    write_plan_dag(
+        system_runtime,
+        plan_id,
+        {
+            "schema_version": "1.1",
+            "plan_id": plan_id,
+            "nodes": [
+                {
+                    "task_id": "task_src",
+                    "assigned_agent_id": "agent_prod",
+                    "depends_on": [],
+                    "outputs": [
+                        {"name": name, "deliver_to": deliver_to, "idempotency_key": name}
+                        for name, deliver_to in outputs.items()
+                    ],
+                }
+            ],
+        },
+    )
+    outbox_plan = agents_root / "agent_prod" / "outbox" / plan_id
+    outbox_plan.mkdir(parents=True)
+    (outbox_plan / "a.md").write_text("a", encoding="utf-8")
+    for name in outputs:
+        write_json(
+            outbox_plan / f"{name}.msg.json",
+            {
+                "schema_version": "1.0",
+                "message_id": f"msg_{name}",
+                "plan_id": plan_id,
+                "producer_agent_id": "agent_prod",
+                "type": "artifact",
+                "created_at": "2026-01-01T00:00:00Z",
+                "task_id": "task_src",
+                "output_name": name,
+                "payload": {"files": [{"path": "a.md" if name == "design" else "missing.md", "sha256": "x"}]},
+            },
+        )
+
+    real_copy = router_app.atomic_copy
+
+    def failing_copy(src: Path, dst: Path, **kwargs) -> None:
+        if dst.parent.parent.parent.name == "agent_b":
+            raise OSError("disk full")
+        real_copy(src, dst, **kwargs)
+
+    monkeypatch.setattr(router_app, "atomic_copy", failing_copy)
+    tick(ctx)
+
+    deliveries = read_jsonl(system_runtime / "plans" / plan_id / "deliveries.jsonl")
+    # every target copied concurrently is logged (and published) in deliver_to order, not only those before agent_b
+    delivered = [d["to_agent_id"] for d in deliveries if d["status"] == "DELIVERED"]
+    assert delivered == ["agent_a", "agent_c", "agent_d"]
+    for agent_id in delivered:
+        assert (agents_root / agent_id / "inbox" / plan_id / "design.msg.json").exists()
+    assert not list((agents_root / "agent_b" / "inbox" / plan_id).glob("design.msg.json*"))
+
+    # a missing first target is reported before a missing payload (as before); with a live target the payload wins
+    codes = {d["message_id"]: d["error"]["code"] for d in deliveries if d["status"] == "DEADLETTERED"}
+    assert codes == {
+        "msg_no_target": "TARGET_AGENT_NOT_FOUND",
+        "msg_no_payload": "MISSING_PAYLOAD",
+    }
+    dlq = [json.loads(p.read_text(encoding="utf-8")) for p in (system_runtime / "deadletter" / plan_id).glob("*.json")]
+    assert sorted(d["reason"]["code"] for d in dlq) == ["MISSING_PAYLOAD", "TARGET_AGENT_NOT_FOUND", "UNHANDLED_EXCEPTION"]
+
+
+def test_router_link_delivery_mode_shares_payload_inode_and_preserves_sha256(tmp_path: Path):
+    import dataclasses
+    import hashlib
+
+    from agenttalk.router.io import atomic_copy
+
+    ctx, agents_root, system_runtime = make_ctx(tmp_path)
+    ctx = dataclasses.replace(ctx, config=dataclasses.replace(ctx.config, delivery_mode="link"))
+    ensure_agent(agents_root, "agent_prod")
+    ensure_agent(agents_root, "agent_a")
+    ensure_agent(agents_root, "agent_b")
+    plan_id = "plan_link"
+    write_plan_dag(
+        system_runtime,
+        plan_id,
+        {
+            "schema_version": "1.1",
+            "plan_id": plan_id,
+            "nodes": [
+                {
+                    "task_id": "task_src",
+                    "assigned_agent_id": "agent_prod",
+                    "depends_on": [],
+                    "outputs": [{"name": "blob", "deliver_to": ["agent_a", "agent_b"], "idempotency_key": "k1"}],
+                }
+            ],
+        },
+    )
+    outbox_plan = agents_root / "agent_prod" / "outbox" / plan_id
+    outbox_plan.mkdir(parents=True)
+    data = b"payload-bytes" * 1000
+    (outbox_plan / "blob.bin").write_bytes(data)
+    sha = "sha256:" + hashlib.sha256(data).hexdigest()
+    write_json(
+        outbox_plan / "blob.msg.json",
+        {
+            "schema_version": "1.0",
+            "message_id": "msg_blob",
+            "plan_id": plan_id,
+            "producer_agent_id": "agent_prod",
+            "type": "artifact",
+            "created_at": "2026-01-01T00:00:00Z",
+            "task_id": "task_src",
+            "output_name": "blob",
+            "payload": {"files": [{"path": "blob.bin", "sha256": sha}]},
+        },
+    )
+
+    tick(ctx)
+
+    src_ino = (outbox_plan / "blob.bin").stat().st_ino
+    for agent_id in ["agent_a", "agent_b"]:
+        inbox_plan = agents_root / agent_id / "inbox" / plan_id
+        assert file_sha256(inbox_plan / "blob.bin") == sha
+        assert (inbox_plan / "blob.bin").stat().st_ino == src_ino
+        # envelopes are always byte-copied
+        assert (inbox_plan / "blob.msg.json").stat().st_ino != (outbox_plan / "blob.msg.json").stat().st_ino
+
+    # re-placing onto an existing link of the same inode must not leave the .tmp behind
+    dst = agents_root / "agent_a" / "inbox" / plan_id / "blob.bin"
+    atomic_copy(outbox_plan / "blob.bin", dst, mode="link")
+    assert not dst.with_name("blob.bin.tmp").exists()
+
+    for mode in ["reflink", "copy"]:
+        other = tmp_path / f"copy_{mode}.bin"
+        atomic_copy(outbox_plan / "blob.bin", other, mode=mode)
+        assert file_sha256(other) == sha
+        assert other.stat().st_ino != src_ino
+
+    # link mode verifies the declared sha256 before sharing the inode with any inbox
+    (outbox_plan / "bad.bin").write_bytes(b"edited in place")
+    write_json(
+        outbox_plan / "bad.msg.json",
+        {
+            "schema_version": "1.0",
+            "message_id": "msg_bad",
+            "plan_id": plan_id,
+            "producer_agent_id": "agent_prod",
+            "type": "artifact",
+            "created_at": "2026-01-01T00:00:00Z",
+            "task_id": "task_src",
+            "output_name": "blob",
+            "payload": {"files": [{"path": "bad.bin", "sha256": sha}]},
+        },
+    )
+    tick(ctx)
+    deliveries = read_jsonl(system_runtime / "plans" / plan_id / "deliveries.jsonl")
+    bad = [d for d in deliveries if d["message_id"] == "msg_bad"]
+    assert [(d["status"], d["error"]["code"]) for d in bad] == [("DEADLETTERED", "PAYLOAD_SHA256_MISMATCH")]
+    assert not (agents_root / "agent_a" / "inbox" / plan_id / "bad.bin").exists()
+
+
+def test_router_blob_store_ingests_payload_once_and_links_into_inboxes(tmp_path: Path):
+    import dataclasses
+    import hashlib
+
+    from agenttalk.heartbeat.blobs import BlobStore
+
+    ctx, agents_root, system_runtime = make_ctx(tmp_path)
+    ctx = dataclasses.replace(ctx, config=dataclasses.replace(ctx.config, blob_store_enabled=True))
+    ensure_agent(agents_root, "agent_prod")
+    reviewers = ["agent_r1", "agent_r2", "agent_r3"]
+    for agent_id in reviewers:
+        ensure_agent(agents_root, agent_id)
+    plan_id = "plan_blobs"
+    write_plan_dag(
+        system_runtime,
+        plan_id,
+        {
+            "schema_version": "1.1",
+            "plan_id": plan_id,
+            "nodes": [
+                {
+                    "task_id": "task_src",
+                    "assigned_agent_id": "agent_prod",
+                    "depends_on": [],
+                    "outputs": [{"name": "spec", "deliver_to": reviewers, "idempotency_key": "k1"}],
+                }
+            ],
+        },
+    )
+    outbox_plan = agents_root / "agent_prod" / "outbox" / plan_id
+    outbox_plan.mkdir(parents=True)
+    data = b"spec" * 2048
+    digest = hashlib.sha256(data).hexdigest()
+    (outbox_plan / "spec.md").write_bytes(data)
+    (outbox_plan / "bad.md").write_bytes(b"tampered")
+
+    def artifact(message_id: str, name: str) -> dict:
+        return {
+            "schema_version": "1.0",
+            "message_id": message_id,
+            "plan_id": plan_id,
+            "producer_agent_id": "agent_prod",
+            "type": "artifact",
+            "created_at": "2026-01-01T00:00:00Z",
+            "task_id": "task_src",
+            "output_name": "spec",
+            "payload": {"files": [{"path": name, "sha256": "sha256:" + digest}]},
+        }
+
+    write_json(outbox_plan / "a_spec.msg.json", artifact("msg_spec", "spec.md"))
+    write_json(outbox_plan / "b_bad.msg.json", artifact("msg_bad", "bad.md"))
+
+    tick(ctx)
+
+    blob = system_runtime / "blobs" / "sha256" / digest[:2] / digest
+    assert blob.read_bytes() == data
+    assert not blob.stat().st_mode & 0o222
+    for agent_id in reviewers:
+        delivered = agents_root / agent_id / "inbox" / plan_id / "spec.md"
+        assert delivered.stat().st_ino == blob.stat().st_ino
+        # the declared blob already exists: bad.md is not re-hashed, the inbox gets the stored (declared) content
+        assert (agents_root / agent_id / "inbox" / plan_id / "bad.md").stat().st_ino == blob.stat().st_ino
+    assert blob.stat().st_nlink == 1 + 2 * len(reviewers)
+    assert not list((system_runtime / "blobs" / "tmp").iterdir())
+
+    # a digest nobody stored yet is hashed and verified
+    env = artifact("msg_bad_new", "bad.md")
+    env["payload"]["files"][0]["sha256"] = "sha256:" + "0" * 64
+    write_json(outbox_plan / "c_bad.msg.json", env)
+    tick(ctx)
+    deliveries = read_jsonl(system_runtime / "plans" / plan_id / "deliveries.jsonl")
+    bad = [d for d in deliveries if d["message_id"] == "msg_bad_new"]
+    assert [(d["status"], d["error"]["code"]) for d in bad] == [("DEADLETTERED", "PAYLOAD_SHA256_MISMATCH")]
+
+    # gc keeps linked and recent blobs; once every inbox link is gone the blob is reclaimed
+    store = BlobStore(system_runtime / "blobs")
+    assert store.gc(min_age_seconds=0) == []
+    for agent_id in reviewers:
+        for name in ["spec.md", "bad.md"]:
+            (agents_root / agent_id / "inbox" / plan_id / name).unlink()
+    assert store.gc() == []
+    assert store.gc(min_age_seconds=0) == [blob]
+    assert not blob.exists()
+
+
+def test_compiled_dag_lookups_and_cache_by_sha(tmp_path: Path):
+    from agenttalk.router.dag import DagCache, parse_dag
+    from agenttalk.router.errors import DagInvalid
+
+    dag_obj = {
+        "schema_version": "1.1",
+        "plan_id": "p",
+        "nodes": [
+            {"task_id": "t1", "assigned_agent_id": "a1", "outputs": [{"name": "o", "deliver_to": ["x", "y"]}]},
+            {"task_id": "t1", "assigned_agent_id": "shadowed", "outputs": []},
+            {"task_id": "t2", "outputs": [{"name": "o", "deliver_to": []}, {"name": "o", "deliver_to": ["z"]}]},
+        ],
+    }
+    dag = parse_dag(dag_obj)
+    assert dag.assigned_agent_for_task("t1") == "a1"
+    assert dag.deliver_to_for_output("t1", "o") == ["x", "y"]
+    assert dag.deliver_to_for_output("t2", "o") == []
+    assert dag.nodes is dag.nodes and len(dag.nodes) == 3
+    for call, code in [
+        (lambda: dag.assigned_agent_for_task("t2"), "DAG_TASK_NO_ASSIGNEE"),
+        (lambda: dag.assigned_agent_for_task("nope"), "DAG_TASK_NOT_FOUND"),
+        (lambda: dag.deliver_to_for_output("t1", "nope"), "DAG_OUTPUT_NOT_FOUND"),
+    ]:
+        with pytest.raises(DagInvalid) as ei:
+            call()
+        assert ei.value.code == code
+
+    path = tmp_path / "task_dag.json"
+    write_json(path, dag_obj)
+    cache = DagCache()
+    dag1, sha1 = cache.load(path)
+    dag2, sha2 = cache.load(path)
+    assert dag2 is dag1 and sha2 == sha1 == file_sha256(path)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    write_json(path, {**dag_obj, "nodes": dag_obj["nodes"][:1]})
+    dag3, sha3 = cache.load(path)
+    assert sha3 != sha1 and len(dag3.nodes) == 1
+
+
+def test_active_dag_cache_invalidated_by_stat_and_mismatch_kept(tmp_path: Path):
+    from agenttalk.router.dag import ActiveDagCache
+
+    dag_obj = {"schema_version": "1.1", "plan_id": "p", "nodes": [{"task_id": "t1", "assigned_agent_id": "a1"}]}
+    dag_path = tmp_path / "task_dag.json"
+    ref_path = tmp_path / "active_dag_ref.json"
+    calls: list[str] = []
+
+    def age(*paths: Path) -> None:
+        old = time.time() - 60
+        for p in paths:
+            os.utime(p, (old, old))
+
+    def load():
+        return cache.load(
+            "p",
+            dag_path=dag_path,
+            ref_path=ref_path,
+            validate_dag=lambda obj: calls.append("dag"),
+            validate_ref=lambda obj: calls.append("ref"),
+        )
+
+    write_json(dag_path, dag_obj)
+    write_json(ref_path, {"plan_id": "p", "task_dag_sha256": file_sha256(dag_path)})
+    age(dag_path, ref_path)
+    cache = ActiveDagCache()
+    first = load()
+    assert load() is first and calls == ["dag", "ref"]
+    assert first.ref_sha == first.dag_sha
+
+    # a stale ref is returned on every load, so callers keep raising ACTIVE_DAG_REF_MISMATCH
+    write_json(ref_path, {"plan_id": "p", "task_dag_sha256": "sha256:" + "0" * 64})
+    age(ref_path)
+    stale = load()
+    assert stale.ref_sha != stale.dag_sha and load() is stale
+    assert calls == ["dag", "ref", "ref"]  # same task_dag sha: the compiled DAG comes from DagCache
+
+    # freshly written files are never cached (racy mtime window)
+    write_json(dag_path, {**dag_obj, "nodes": []})
+    assert load() is not load() and len(load().dag.nodes) == 0
+
+
+def test_delivery_log_writer_group_commits_per_fsync_policy(tmp_path: Path):
+    from agenttalk.router.delivery_log import DeliveryLogWriter
+
+    log_path = tmp_path / "deliveries.jsonl"
+    writer = DeliveryLogWriter(log_path, fsync_policy="per_tick")
+    staged, final = tmp_path / "m.msg.json.staged", tmp_path / "m.msg.json"
+    staged.write_text("{}", encoding="utf-8")
+    writer.append({"n": 0})
+    writer.append_many([{"n": 1}, {"n": 2}], publish=[(staged, final)])
+    assert not log_path.exists() and staged.exists()  # buffered until the end of the tick
+    writer.flush()
+    assert [e["n"] for e in read_jsonl(log_path)] == [0, 1, 2]
+    assert final.exists() and not staged.exists()
+    assert (writer.flushes, writer.fsyncs) == (1, 1)
+
+    # a torn last line (crash mid-append) is terminated instead of being glued to the next entry
+    with log_path.open("ab") as f:
+        f.write(b'{"n": 3')
+    writer.append({"n": 4})
+    writer.flush()
+    assert log_path.read_bytes().endswith(b'{"n": 3\n{"n": 4}\n')
+
+    always = DeliveryLogWriter(log_path, fsync_policy="always")
+    always.append({"n": 5})
+    always.append({"n": 6})
+    assert (always.flushes, always.fsyncs) == (2, 2) and log_path.read_bytes().endswith(b'{"n": 6}\n')
+
+    interval = DeliveryLogWriter(log_path, fsync_policy="interval_ms", fsync_interval_ms=60_000)
+    for n in (7, 8):
+        interval.append({"n": n})
+        interval.flush()
+    assert (interval.flushes, interval.fsyncs) == (2, 1)
+
+    # interval_ms: an envelope is published only by a flush that fsynced the entries describing it
+    staged.write_text("{}", encoding="utf-8")
+    final.unlink()
+    interval.append({"n": 9}, publish=[(staged, final)])
+    interval.flush()
+    assert staged.exists() and not final.exists() and interval.fsyncs == 1
+    interval.flush()  # nothing new to write, interval not elapsed yet
+    assert staged.exists() and interval.fsyncs == 1
+    interval.fsync_interval_ms = 0
+    interval.flush()  # the next interval fsync publishes it, without writing anything
+    assert final.exists() and not staged.exists()
+    assert (interval.flushes, interval.fsyncs) == (3, 2)
+
+    with pytest.raises(ValueError):
+        DeliveryLogWriter(log_path, fsync_policy="never")
+
+
+def test_delivery_log_rotates_segments_without_losing_dedupe_history(tmp_path: Path):
+    from agenttalk.router.delivery_log import DeliveryLog, DeliveryLogIndex, DeliveryLogWriter
+    from agenttalk.router.delivery_segments import load_segment_index, sealed_segments, segment_index_path
+
+    log_path = tmp_path / "deliveries.jsonl"
+    ckpt_path = tmp_path / "deliveries.checkpoint.json"
+    writer = DeliveryLogWriter(log_path, segment_bytes=200)
+    index = DeliveryLogIndex(log_path, ckpt_path, checkpoint_every_bytes=1, checkpoint_growth=0)
+
+    def entry(n: int) -> dict:
+        status = "SKIPPED_DUPLICATE" if n % 3 == 0 else "DELIVERED"
+        return {"message_id": f"m{n}", "task_id": f"t{n % 2}", "envelope_sha256": f"sha256:{n}", "status": status}
+
+    for n in range(12):
+        writer.append(entry(n))
+        if n % 2:
+            writer.flush()
+        if n % 4 == 1:
+            index.refresh()  # part way through the active file when it gets sealed
+    index.refresh()
+
+    segments = sealed_segments(log_path)
+    assert writer.rotations == len(segments) >= 2
+    assert all(segment_index_path(p).exists() for p in segments)
+    assert [e["message_id"] for e in DeliveryLog(log_path).read_entries()] == [f"m{n}" for n in range(12)]
+    expected = {(f"m{n}", f"sha256:{n}") for n in range(12) if n % 3}
+    assert set(index.delivered) == expected
+    assert index.lines_parsed == 12
+
+    # the sidecar matches an index built from the segment bytes
+    first = load_segment_index(segments[0])
+    assert first.rows == sum(1 for _ in segments[0].open("rb")) and first.message_ids["m0"] == [(0, True)]
+
+    # restart after another rotation: resumes from the checkpoint and finishes the sealed file from its offset
+    writer.append_many([entry(n) for n in range(12, 20)])
+    writer.flush()
+    restarted = DeliveryLogIndex(log_path, ckpt_path)
+    restarted.refresh()
+    assert restarted.lines_parsed == 8
+    assert set(restarted.delivered) == expected | {(f"m{n}", f"sha256:{n}") for n in range(12, 20) if n % 3}
+
+
+_CRASHING_ROUTER = """
+import os, sys
+from pathlib import Path
+from agenttalk.router import delivery_log
+from agenttalk.router.app import RouterConfig, RouterContext, tick
+from agenttalk.router.io import AgentsPaths, SystemPaths
+from agenttalk.router.schema import SchemaRegistry
+
+crash_point, root = sys.argv[1], Path(sys.argv[2])
+real_write = delivery_log.DeliveryLogWriter._write
+
+def crashing_write(self, data):
+    if crash_point == "after_log_write":
+        real_write(self, data)
+    os._exit(17)
+
+delivery_log.DeliveryLogWriter._write = crashing_write
+tick(RouterContext(
+    agents=AgentsPaths(agents_root=root / "agents"),
+    system=SystemPaths(system_runtime=root / "system_runtime"),
+    schemas=SchemaRegistry(schemas_base_dir=Path("doc/rule/templates/schemas")),
+    config=RouterConfig(schema_validation_enabled=False),
+))
+"""
+
+
+@pytest.mark.parametrize("crash_point", ["before_log_write", "after_log_write"])
+def test_router_crash_never_leaves_inbox_envelope_without_delivered_entry(tmp_path: Path, crash_point: str):
+    import subprocess
+    import sys
+
+    ctx, agents_root, system_runtime = make_ctx(tmp_path)
+    consumers = ["agent_c1", "agent_c2"]
+    for agent_id in ["agent_prod"] + consumers:
+        ensure_agent(agents_root, agent_id)
+    plan_id = "plan_crash"
+    write_plan_dag(
+        system_runtime,
+        plan_id,
+        {
+            "schema_version": "1.1",
+            "plan_id": plan_id,
+            "nodes": [
+                {
+                    "task_id": "task_src",
+                    "assigned_agent_id": "agent_prod",
+                    "depends_on": [],
+                    "outputs": [{"name": "design", "deliver_to": consumers, "idempotency_key": "k1"}],
+                }
+            ],
+        },
+    )
+    outbox_plan = agents_root / "agent_prod" / "outbox" / plan_id
+    (outbox_plan / "a.md").parent.mkdir(parents=True, exist_ok=True)
+    (outbox_plan / "a.md").write_text("a", encoding="utf-8")
+    write_json(
+        outbox_plan / "design.msg.json",
+        {
+            "schema_version": "1.0",
+            "message_id": "msg_design",
+            "plan_id": plan_id,
+            "producer_agent_id": "agent_prod",
+            "type": "artifact",
+            "created_at": "2026-01-01T00:00:00Z",
+            "task_id": "task_src",
+            "output_name": "design",
+            "payload": {"files": [{"path": "a.md", "sha256": "x"}]},
+        },
+    )
+    log_path = system_runtime / "plans" / plan_id / "deliveries.jsonl"
+
+    def delivered_to() -> list[str]:
+        return sorted(d["to_agent_id"] for d in read_jsonl(log_path) if d["status"] == "DELIVERED")
+
+    def visible() -> list[str]:
+        return sorted(a for a in consumers if (agents_root / a / "inbox" / plan_id / "design.msg.json").exists())
+
+    env = {**os.environ, "PYTHONPATH": str(Path.cwd())}
+    proc = subprocess.run([sys.executable, "-c", _CRASHING_ROUTER, crash_point, str(tmp_path)], env=env)
+    assert proc.returncode == 17
+
+    # invariant at the crash: every envelope visible in an inbox has its DELIVERED entry
+    assert set(visible()) <= set(delivered_to())
+    assert delivered_to() == (consumers if crash_point == "after_log_write" else [])
+
+    # restart: staged envelopes are published (logged) or dropped and re-routed (not logged); nothing is doubled
+    tick(ctx)
+    assert visible() == delivered_to() == consumers
+    assert not list(agents_root.glob(f"*/inbox/{plan_id}/*.staged"))
+
+
+def test_router_failed_log_write_keeps_entries_and_delivers_next_tick(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    from agenttalk.router.delivery_log import DeliveryLogWriter
+
+    ctx, agents_root, system_runtime = make_ctx(tmp_path)
+    for agent_id in ["agent_prod", "agent_c"]:
+        ensure_agent(agents_root, agent_id)
+    plan_id = "plan_enospc"
+    write_plan_dag(
+        system_runtime,
+        plan_id,
+        {
+            "schema_version": "1.1",
+            "plan_id": plan_id,
+            "nodes": [
+                {
+                    "task_id": "task_src",
+                    "assigned_agent_id": "agent_prod",
+                    "depends_on": [],
+                    "outputs": [{"name": "design", "deliver_to": ["agent_c"], "idempotency_key": "k1"}],
+                }
+            ],
+        },
+    )
+    outbox_plan = agents_root / "agent_prod" / "outbox" / plan_id
+    outbox_plan.mkdir(parents=True)
+    (outbox_plan / "a.md").write_text("a", encoding="utf-8")
+    write_json(
+        outbox_plan / "design.msg.json",
+        {
+            "schema_version": "1.0",
+            "message_id": "msg_design",
+            "plan_id": plan_id,
+            "producer_agent_id": "agent_prod",
+            "type": "artifact",
+            "created_at": "2026-01-01T00:00:00Z",
+            "task_id": "task_src",
+            "output_name": "design",
+            "payload": {"files": [{"path": "a.md", "sha256": "x"}]},
+        },
+    )
+    inbox_plan = agents_root / "agent_c" / "inbox" / plan_id
+    log_path = system_runtime / "plans" / plan_id / "deliveries.jsonl"
+    real_write = DeliveryLogWriter._write
+
+    def failing_write(self, data: bytes) -> int:
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(DeliveryLogWriter, "_write", failing_write)
+    with pytest.raises(OSError):
+        tick(ctx)
+    assert not (inbox_plan / "design.msg.json").exists()
+    assert plan_id not in ctx.state.recovered_plans and plan_id not in ctx.state.delivery_indexes
+
+    # the disk recovers: the buffered entry is written and its envelope published exactly once
+    monkeypatch.setattr(DeliveryLogWriter, "_write", real_write)
+    tick(ctx)
+    tick(ctx)
+    assert (inbox_plan / "design.msg.json").exists()
+    assert not list(inbox_plan.glob("*.staged"))
+    deliveries = read_jsonl(log_path)
+    assert [(d["status"], d["to_agent_id"]) for d in deliveries if d["status"] == "DELIVERED"] == [("DELIVERED", "agent_c")]
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import json
+import os
+import shutil
 from pathlib import Path
 
 import pytest
 
+from agenttalk.heartbeat.errors import SchemaInvalid
 from agenttalk.heartbeat.schema import SchemaRegistry
 
 
@@ -41,3 +44,27 @@ def test_templates_match_schemas(template_path: str, schema_name: str):
     schemas = SchemaRegistry(Path("doc/rule/templates/schemas"))
     schemas.validate(_read(template_path), schema_name)
 
+
+
+def test_schema_registry_reuses_compiled_validators_and_reloads_on_dir_change(tmp_path: Path):
+    schemas_dir = tmp_path / "schemas"
+    shutil.copytree("doc/rule/templates/schemas", schemas_dir)
+    ack = _read("doc/rule/templates/ack.json")
+
+    SchemaRegistry(schemas_dir).validate(ack, "ack.schema.json")
+    SchemaRegistry(schemas_dir).validate(ack, "ack.schema.json")
+    stats = SchemaRegistry(schemas_dir).cache_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+    # a new schema file changes the directory mtime -> compiled validators are dropped
+    (schemas_dir / "extra.schema.json").write_text('{"type": "object"}', encoding="utf-8")
+    st = schemas_dir.stat()
+    os.utime(schemas_dir, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    SchemaRegistry(schemas_dir).validate(ack, "ack.schema.json")
+    stats = SchemaRegistry(schemas_dir).cache_stats()
+    assert stats["reloads"] == 1
+    assert stats["misses"] == 2
+
+    with pytest.raises(SchemaInvalid):
+        SchemaRegistry(schemas_dir).validate({"schema_version": "1.0"}, "ack.schema.json")